@@ -0,0 +1,235 @@
+"""Benchmark converting Solidserver address records into adapter models
+
+Times the per-record work of SolidserverAdapter.load() three ways: "legacy",
+a copy of the conversion used before the fast path (the class parameters
+decoded with parse_qsl, the model built before the zero address check, which
+made two netaddr addresses per record); "record", _process_ipv4_addr() and
+_process_ipv6_addr() reading each record on their own; and "page", as
+load() does it, with prefix lengths and zero hosts converted a page at a
+time by vectorized.AddressPage, with numpy if it is installed.  Records come
+from the fake Solidserver
+dataset, a share of them made free or zero, and are converted in chunks
+with a new adapter per chunk so that a million records fit in memory.
+
+    python benchmarks/bench_convert.py --records 100k,1m --profile
+"""
+import argparse
+import cProfile
+import pstats
+import time
+import urllib.parse
+from typing import Any, Callable
+
+import netaddr  # type: ignore
+
+from common import NullJob, parse_sizes, print_table, setup_nautobot, write_report
+from fake_solidserver import FakeDataset
+
+PATHS = ("legacy", "record", "page")
+COLUMNS = ["records", "path", "seconds", "us_per_record", "speedup", "models"]
+
+
+def make_rows(dataset: FakeDataset, start: int, stop: int, args) -> list[dict]:
+    """address rows start to stop, every free_every'th one free and every
+    zero_every'th one the zero address"""
+    rows = []
+    for index in range(start, stop):
+        if index < dataset.ip6_count:
+            row = dataset.ip6_address(index)
+        else:
+            row = dataset.ip4_address(index - dataset.ip6_count)
+        if args.free_every and index % args.free_every == 0:
+            row.update({"ip6_id" if "ip6_id" in row else "ip_id": "0", "type": "free"})
+        if args.zero_every and index % args.zero_every == 1:
+            if "ip6_id" in row:
+                row.update({"hostaddr": "::", "ip6_addr": "0" * 32})
+            else:
+                row.update({"hostaddr": "0.0.0.0", "ip_addr": "0" * 8})
+        rows.append(row)
+    return rows
+
+
+def legacy_convert(adapter: Any, rows: list[dict[str, str]]) -> None:
+    """the conversion before the fast path, for comparison"""
+    # pylint: disable=import-outside-toplevel
+    from nautobot_plugin_ssot_eip_solidserver.constants import IPV4_SUBNET_SIZE_MAP
+
+    for row in rows:
+        legacy_convert_record(adapter, row, IPV4_SUBNET_SIZE_MAP)
+
+
+def legacy_convert_record(
+    adapter: Any, row: dict[str, str], size_map: dict[int, int]
+) -> None:
+    """convert one record as before the fast path"""
+    ip6 = "ip6_id" in row
+    if ip6:
+        cidr_size = int(row.get("subnet6_prefix", 128))
+    else:
+        cidr_size = size_map.get(int(row.get("subnet_size", 1)), 32)
+    params = row["ip6_class_parameters" if ip6 else "ip_class_parameters"]
+    descr = dict(urllib.parse.parse_qsl(params, keep_blank_values=True)).get(
+        "__eip_description"
+    )
+    addr = adapter.ipaddress(
+        dns_name=row.get("ip6_name" if ip6 else "name"),
+        description=descr or " ",
+        host=str(row.get("hostaddr")),
+        solidserver_addr_id=row.get("ip6_id" if ip6 else "ip_id", "not found"),
+        prefix_length=cidr_size,
+    )
+    if addr.solidserver_addr_id == "0" and row.get("type", "free") == "free":
+        addr.status__name = "Unassigned"
+        addr.solidserver_addr_id = "unassigned"
+    else:
+        addr.status__name = "Active"
+    # str hosts never equal netaddr addresses, so this never skipped anything
+    if addr.host == netaddr.IPAddress("::0") or addr.host == netaddr.IPAddress(
+        "0.0.0.0"
+    ):
+        return
+    adapter._add_object_to_diffsync(addr)  # pylint: disable=protected-access
+    # the per-record log message was formatted even when it was dropped
+    adapter.job.log_record(f"SS Adapter added {addr}")
+
+
+def record_convert(adapter: Any, rows: list[dict[str, str]]) -> None:
+    """the per-record conversion, each record read on its own"""
+    # pylint: disable=protected-access
+    for row in rows:
+        if "ip6_id" in row:
+            adapter._process_ipv6_addr(row)
+        else:
+            adapter._process_ipv4_addr(row)
+
+
+def page_convert(adapter: Any, rows: list[dict[str, str]]) -> None:
+    """the conversion SolidserverAdapter.load() uses, prefix lengths and
+    zero hosts converted a page at a time"""
+    # pylint: disable=import-outside-toplevel,protected-access
+    from nautobot_plugin_ssot_eip_solidserver.constants import LIMIT
+    from nautobot_plugin_ssot_eip_solidserver.utils import ssutils, vectorized
+
+    for page in ssutils.batched(rows, LIMIT):
+        for row, cidr_size, zero_host, _ in vectorized.AddressPage(page).rows():
+            if "ip6_id" in row:
+                adapter._process_ipv6_addr(row, cidr_size, zero_host)
+            else:
+                adapter._process_ipv4_addr(row, cidr_size, zero_host)
+
+
+def time_path(
+    convert: Callable[[Any, list], None],
+    dataset: FakeDataset,
+    records: int,
+    args: argparse.Namespace,
+    profiler: cProfile.Profile | None = None,
+) -> tuple[float, int]:
+    """convert records in chunks, timing only the conversion
+
+    Returns:
+        tuple[float, int]: the seconds taken and the models added
+    """
+    # pylint: disable=import-outside-toplevel
+    from nautobot_plugin_ssot_eip_solidserver.diffsync.adapters.solidserver import (
+        SolidserverAdapter,
+    )
+
+    seconds = 0.0
+    models = 0
+    for start in range(0, records, args.chunk):
+        rows = make_rows(dataset, start, min(start + args.chunk, records), args)
+        adapter = SolidserverAdapter(job=NullJob(), conn=None, sync=None)
+        if profiler is not None:
+            profiler.enable()
+        started = time.perf_counter()
+        convert(adapter, rows)
+        seconds += time.perf_counter() - started
+        if profiler is not None:
+            profiler.disable()
+        models += len(adapter.get_all("ipaddress"))
+    return seconds, models
+
+
+def run(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """run every size and path"""
+    converters = {
+        "legacy": legacy_convert,
+        "record": record_convert,
+        "page": page_convert,
+    }
+    rows: list[dict[str, Any]] = []
+    for records in parse_sizes(args.records):
+        dataset = FakeDataset(records, args.ipv6_share)
+        baseline = 0.0
+        for path in args.paths.split(","):
+            profiler = cProfile.Profile() if args.profile else None
+            seconds, models = time_path(
+                converters[path], dataset, records, args, profiler
+            )
+            baseline = baseline or seconds
+            row = {
+                "records": records,
+                "path": path,
+                "seconds": round(seconds, 3),
+                "us_per_record": round(seconds / records * 1e6, 2),
+                "speedup": round(baseline / seconds, 2),
+                "models": models,
+            }
+            rows.append(row)
+            if args.verbose:
+                print_table([row], COLUMNS)
+            if profiler is not None:
+                print(f"\n{path}, {records} records")
+                pstats.Stats(profiler).sort_stats("tottime").print_stats(args.profile)
+    return rows
+
+
+def main() -> None:
+    """parse arguments, run the benchmark and report"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument(
+        "--records",
+        default="100k,1m",
+        help="comma separated numbers of addresses, k and m suffixes allowed",
+    )
+    parser.add_argument("--ipv6-share", type=float, default=0.1)
+    parser.add_argument(
+        "--free-every", type=int, default=10, help="make every nth record free"
+    )
+    parser.add_argument(
+        "--zero-every",
+        type=int,
+        default=1000,
+        help="make every nth record the zero address",
+    )
+    parser.add_argument("--chunk", type=int, default=100000)
+    parser.add_argument("--paths", default=",".join(PATHS), help=str(PATHS))
+    parser.add_argument(
+        "--profile",
+        type=int,
+        nargs="?",
+        const=15,
+        default=0,
+        help="print the n functions with the most own time for each path",
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    setup_nautobot()
+    rows = run(args)
+    print_table(rows, COLUMNS)
+    if args.json:
+        write_report(
+            args.json,
+            "convert",
+            rows,
+            ipv6_share=args.ipv6_share,
+            free_every=args.free_every,
+            zero_every=args.zero_every,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Benchmark the diff work in sync_data over in-memory adapters
+
+Fills a SolidserverAdapter and a store shaped like SSoTNautobotAdapter (the
+same models, without the ORM) directly from synthetic records, then times
+status normalization, diff_to(), the diff summary and the diff dict that is
+stored on the Sync, the same steps sync_data runs.  No Solidserver or
+database is needed.
+
+    python benchmarks/bench_diff.py --records 10k,100k,1m --overlap 0.9 \\
+        --churn 0.05 --status-churn 0.05 --json diff-report.json
+
+"vs_linear" compares each size with the one before: 1.0 means the diff time
+grew in proportion to the number of objects.
+"""
+import argparse
+import random
+from typing import Any
+
+from common import (
+    NullJob,
+    measure,
+    parse_sizes,
+    print_table,
+    setup_nautobot,
+    write_report,
+)
+
+# addresses per prefix, as in the fake Solidserver
+PER_SUBNET = 250
+COLUMNS = [
+    "objects",
+    "build_s",
+    "normalize_s",
+    "diff_s",
+    "summary_s",
+    "dict_s",
+    "diff_us_per_object",
+    "vs_linear",
+    "changes",
+    "status_only",
+    "diff_peak_mib",
+]
+
+
+def make_adapters(records: int, args: argparse.Namespace) -> tuple[Any, Any]:
+    """build a loaded source adapter and target store
+
+    Each source record is in the target with probability overlap.  Shared
+    records have a changed field with probability churn, or else only a
+    changed status with probability status_churn.  The target also gets as
+    many records of its own as the source has, so there are deletes.
+    """
+    # pylint: disable=import-outside-toplevel
+    from diffsync import DiffSync
+
+    from nautobot_plugin_ssot_eip_solidserver.diffsync.adapters.solidserver import (
+        SolidserverAdapter,
+    )
+    from nautobot_plugin_ssot_eip_solidserver.diffsync.models.base import (
+        SSoTIPAddress,
+        SSoTIPPrefix,
+    )
+
+    class NautobotStore(DiffSync):
+        """The models and layout of SSoTNautobotAdapter, without the ORM"""
+
+        ipaddress = SSoTIPAddress
+        prefix = SSoTIPPrefix
+        top_level = ["ipaddress", "prefix"]
+
+    rng = random.Random(args.seed)
+    source = SolidserverAdapter(job=NullJob(), conn=None, sync=None)
+    target = NautobotStore()
+
+    def add_pair(model: str, fields: dict[str, Any], changed: str) -> None:
+        source.add(getattr(source, model)(status__name="Active", **fields))
+        if rng.random() >= args.overlap:
+            # only in the source, and one in 172/8 only in the target
+            fields = dict(fields, solidserver_addr_id="target-only")
+            fields[changed] = "172" + fields[changed][2:]
+            target.add(getattr(target, model)(status__name="Active", **fields))
+            return
+        status = "Active"
+        roll = rng.random()
+        if roll < args.churn:
+            fields = dict(fields, description="changed")
+        elif roll < args.churn + args.status_churn:
+            status = "Reserved"
+        target.add(getattr(target, model)(status__name=status, **fields))
+
+    for index in range(records):
+        subnet, host = divmod(index, PER_SUBNET)
+        network = f"10.{subnet >> 8 & 255}.{subnet & 255}"
+        if host == 0:
+            add_pair(
+                "prefix",
+                {
+                    "network": f"{network}.0",
+                    "prefix_length": 24,
+                    "description": f"subnet {subnet}",
+                    "solidserver_addr_id": str(subnet + 1),
+                },
+                "network",
+            )
+        add_pair(
+            "ipaddress",
+            {
+                "host": f"{network}.{host + 1}",
+                "prefix_length": 24,
+                "dns_name": f"host{index}.example.com",
+                "description": f"host {index}",
+                "solidserver_addr_id": str(index + 1),
+            },
+            "host",
+        )
+    return source, target
+
+
+def run(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """run every size"""
+    # pylint: disable=import-outside-toplevel
+    from nautobot_plugin_ssot_eip_solidserver.utils import ssutils
+
+    rows: list[dict[str, Any]] = []
+    for records in parse_sizes(args.records):
+        built = measure(lambda: make_adapters(records, args), False)
+        source, target = built["result"]
+        normalized = measure(lambda: ssutils.normalize_status(source, target), False)
+        diffed = measure(lambda: source.diff_to(target), args.memory)
+        diff = diffed["result"]
+        summarized = measure(diff.summary, False)
+        as_dict = measure(diff.dict, False)
+        summary = summarized["result"]
+        objects = len(source) + len(target)
+        row = {
+            "objects": objects,
+            "build_s": built["seconds"],
+            "normalize_s": normalized["seconds"],
+            "diff_s": diffed["seconds"],
+            "summary_s": summarized["seconds"],
+            "dict_s": as_dict["seconds"],
+            "diff_us_per_object": round(diffed["seconds"] / objects * 1e6, 2),
+            "vs_linear": "",
+            "changes": summary["create"] + summary["update"] + summary["delete"],
+            "status_only": normalized["result"],
+            "diff_peak_mib": diffed["peak_mib"] if args.memory else "",
+        }
+        if rows and rows[-1]["diff_s"]:
+            growth = row["diff_s"] / rows[-1]["diff_s"]
+            row["vs_linear"] = round(growth / (objects / rows[-1]["objects"]), 2)
+        rows.append(row)
+        if args.verbose:
+            print_table([row], COLUMNS)
+    return rows
+
+
+def main() -> None:
+    """parse arguments, run the benchmark and report"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument(
+        "--records",
+        default="10k,100k",
+        help="comma separated numbers of source addresses, k and m suffixes allowed",
+    )
+    parser.add_argument(
+        "--overlap",
+        type=float,
+        default=0.9,
+        help="share of source records that are also in the target",
+    )
+    parser.add_argument(
+        "--churn",
+        type=float,
+        default=0.05,
+        help="share of shared records with a changed description",
+    )
+    parser.add_argument(
+        "--status-churn",
+        type=float,
+        default=0.05,
+        help="share of shared records with only a changed status",
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--memory", action="store_true", help="trace peak memory of the diff"
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    setup_nautobot()
+    rows = run(args)
+    print_table(rows, COLUMNS)
+    if args.json:
+        write_report(
+            args.json,
+            "diff",
+            rows,
+            overlap=args.overlap,
+            churn=args.churn,
+            status_churn=args.status_churn,
+            seed=args.seed,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Benchmark Solidserver fetches and SolidserverAdapter.load() end to end
+
+Starts the fake Solidserver for each dataset size, then times fetching every
+address and prefix with SolidServerAPI, and loading them with
+SolidserverAdapter, for each pagination mode.  Reports throughput and peak
+traced memory, and optionally writes them to a json file so that versions
+can be compared.
+
+    python benchmarks/bench_fetch.py --records 10k,100k,1m --latency 0.005 \\
+        --json fetch-report.json
+"""
+import argparse
+from typing import Any
+
+from common import (
+    NullJob,
+    measure,
+    parse_sizes,
+    print_table,
+    setup_nautobot,
+    write_report,
+)
+from fake_solidserver import FakeSolidServer
+
+MODES = ("offset", "keyset", "concurrent", "async")
+SCENARIOS = ("fetch", "load")
+COLUMNS = [
+    "records",
+    "scenario",
+    "mode",
+    "seconds",
+    "records_per_s",
+    "peak_mib",
+    "requests",
+    "mib_received",
+]
+
+
+def make_client(url: str, mode: str, workers: int) -> Any:
+    """a Solidserver client for the fake server, set up for a mode"""
+    # pylint: disable=import-outside-toplevel
+    from nautobot_plugin_ssot_eip_solidserver.utils import aiossapi, ssapi
+
+    client_class: Any = ssapi.SolidServerAPI
+    if mode == "async":
+        client_class = aiossapi.SolidServerAsyncFacade
+    return client_class(
+        job=NullJob(),
+        username="benchmark",
+        password="benchmark",
+        base_url=url,
+        sslverify=False,
+        concurrent=mode in ("concurrent", "async"),
+        keyset_pagination=mode == "keyset",
+        max_workers=workers,
+    )
+
+
+def fetch(client: Any) -> int:
+    """fetch every address and prefix, returning the record count"""
+    count = 0
+    for _ in client.iter_all_addresses():
+        count += 1
+    for _ in client.iter_all_prefixes():
+        count += 1
+    return count
+
+
+def load(client: Any) -> int:
+    """load every address and prefix into an adapter, returning the number of
+    models loaded"""
+    # pylint: disable=import-outside-toplevel
+    from nautobot_plugin_ssot_eip_solidserver.diffsync.adapters import solidserver
+
+    adapter = solidserver.SolidserverAdapter(job=NullJob(), conn=client, sync=None)
+    adapter.load()
+    return adapter.stats["ipaddress"] + adapter.stats["prefix"]
+
+
+def run(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """run every size, scenario and mode"""
+    rows = []
+    for records in parse_sizes(args.records):
+        with FakeSolidServer(records, args.latency, args.ipv6_share) as server:
+            for scenario in args.scenarios.split(","):
+                for mode in args.modes.split(","):
+                    client = make_client(server.url, mode, args.workers)
+                    func = fetch if scenario == "fetch" else load
+                    try:
+                        result = measure(lambda: func(client), not args.no_memory)
+                    finally:
+                        if hasattr(client, "close"):
+                            client.close()
+                    row = {
+                        "records": records,
+                        "scenario": scenario,
+                        "mode": mode,
+                        "seconds": result["seconds"],
+                        "records_per_s": int(
+                            result["result"] / max(result["seconds"], 1e-9)
+                        ),
+                        "peak_mib": result["peak_mib"],
+                        # the async facade keeps its stats on the wrapped client
+                        "requests": getattr(client, "api", client).retry_stats[
+                            "requests"
+                        ],
+                        "mib_received": round(
+                            sum(client.bytes_received.values()) / 1048576, 1
+                        ),
+                    }
+                    rows.append(row)
+                    if args.verbose:
+                        print_table([row], COLUMNS)
+    return rows
+
+
+def main() -> None:
+    """parse arguments, run the benchmark and report"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument(
+        "--records",
+        default="10k,100k",
+        help="comma separated dataset sizes, k and m suffixes allowed",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to every reply"
+    )
+    parser.add_argument("--ipv6-share", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", default=",".join(MODES[:3]), help=str(MODES))
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip tracemalloc, which is slow"
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    setup_nautobot()
+    rows = run(args)
+    print_table(rows, COLUMNS)
+    if args.json:
+        write_report(
+            args.json,
+            "fetch",
+            rows,
+            latency=args.latency,
+            ipv6_share=args.ipv6_share,
+            workers=args.workers,
+            memory_traced=not args.no_memory,
+        )
+
+
+if __name__ == "__main__":
+    main()
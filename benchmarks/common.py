@@ -0,0 +1,129 @@
+"""Helpers shared by the benchmarks
+
+The plugin modules import Nautobot, so Django is configured with
+nautobot.setup() before they are imported, using NAUTOBOT_CONFIG the same way
+nautobot-server does.  Nothing here touches the database.
+"""
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+# so the benchmarks run against this checkout
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def setup_nautobot() -> None:
+    """configure Django so that the plugin modules can be imported"""
+    import nautobot  # type: ignore  # pylint: disable=import-outside-toplevel
+
+    nautobot.setup()
+
+
+class NullJob:
+    """Stands in for a Nautobot job, discarding log messages"""
+
+    def __init__(self) -> None:
+        self.kwargs: dict[str, Any] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("log"):
+            return lambda *args, **kwargs: None
+        raise AttributeError(name)
+
+
+def parse_sizes(value: str) -> list[int]:
+    """parse a comma separated list of sizes, accepting k and m suffixes"""
+    sizes = []
+    for each in value.split(","):
+        each = each.strip().lower()
+        scale = {"k": 1000, "m": 1000000}.get(each[-1:], 1)
+        sizes.append(int(float(each.rstrip("km")) * scale))
+    return sizes
+
+
+def measure(func: Callable[[], Any], trace_memory: bool = True) -> dict[str, Any]:
+    """run a function once, timing it and tracing its peak memory
+
+    Args:
+        func (callable): the function to run
+        trace_memory (bool, optional): trace Python allocations, which slows
+          the run down. Defaults to True.
+
+    Returns:
+        dict: the result, the seconds taken and the peak traced memory in MiB
+    """
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = func()
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return {
+        "result": result,
+        "seconds": round(seconds, 3),
+        "peak_mib": round(peak / 1048576, 1),
+    }
+
+
+def print_table(rows: list[dict[str, Any]], columns: list[str]) -> None:
+    """print results as an aligned text table"""
+    widths = {
+        column: max(len(column), *(len(str(row.get(column, ""))) for row in rows))
+        for column in columns
+    }
+    print("  ".join(column.rjust(widths[column]) for column in columns))
+    for row in rows:
+        print(
+            "  ".join(
+                str(row.get(column, "")).rjust(widths[column]) for column in columns
+            )
+        )
+
+
+def write_report(path: str, name: str, rows: list[dict[str, Any]], **settings) -> None:
+    """write results as json, with enough context to compare runs of
+    different versions
+
+    Args:
+        path (str): the file to write
+        name (str): the benchmark name
+        rows (list): the results
+        settings: the benchmark settings
+    """
+    from nautobot_plugin_ssot_eip_solidserver import (  # pylint: disable=import-outside-toplevel
+        get_version,
+    )
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    report = {
+        "benchmark": name,
+        "version": get_version(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "run_at": datetime.now(timezone.utc).isoformat(),
+        "settings": settings,
+        "results": rows,
+    }
+    Path(path).write_text(json.dumps(report, indent=2), encoding="utf-8")
@@ -0,0 +1,301 @@
+"""A local stand-in for the Solidserver REST API, for benchmarks
+
+Serves the list, count and info actions the plugin uses for IPv4 and IPv6
+addresses and subnets, from a synthetic dataset that is generated row by row
+from the record id, so a million records cost no memory up front.  Every
+request can be delayed to simulate appliance latency.
+
+Supported parameters: limit/LIMIT, offset, SELECT, ORDERBY (records are
+always returned in id order) and WHERE clauses of the forms the client sends
+for keyset pagination ("id > N", with or without the tiebreak) and for
+lookups by id ("id IN (...)").  Other WHERE clauses, and SELECTs of
+columns the dataset does not have, get HTTP 400.
+
+Run it on its own with
+    python benchmarks/fake_solidserver.py --records 100000 --port 8080
+"""
+import argparse
+import ipaddress
+import json
+import multiprocessing
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+# addresses per subnet, subnets are /24 for IPv4 and /64 for IPv6
+PER_SUBNET = 250
+KEYSET_WHERE = re.compile(r"^\(?\s*(\w+)\s*>\s*(\d+)")
+IN_WHERE = re.compile(r"^\s*(\w+)\s+IN\s+\(([^)]*)\)\s*$", re.IGNORECASE)
+
+
+def _params(description: str) -> str:
+    """class parameters like Solidserver returns them"""
+    return (
+        "use_ipam_name=1&__eip_description="
+        + urllib.parse.quote(description)
+        + "&domain=example.com"
+    )
+
+
+class FakeDataset:
+    """Synthetic Solidserver tables, generated from the row index
+
+    Args:
+        records (int): the number of addresses, split between IPv4 and IPv6
+        ipv6_share (float): the share of addresses that are IPv6
+    """
+
+    def __init__(self, records: int, ipv6_share: float = 0.1) -> None:
+        self.ip6_count = int(records * ipv6_share)
+        self.ip4_count = records - self.ip6_count
+        self.tables: dict[str, tuple[str, int, Callable[[int], dict[str, Any]]]] = {
+            "ip_address": ("ip_id", self.ip4_count, self.ip4_address),
+            "ip6_address6": ("ip6_id", self.ip6_count, self.ip6_address),
+            "ip_block_subnet": (
+                "subnet_id",
+                -(-self.ip4_count // PER_SUBNET),
+                self.ip4_subnet,
+            ),
+            "ip6_block6_subnet6": (
+                "subnet6_id",
+                -(-self.ip6_count // PER_SUBNET),
+                self.ip6_subnet,
+            ),
+        }
+
+    @staticmethod
+    def _ip4_network(subnet: int) -> int:
+        return int(ipaddress.IPv4Address("10.0.0.0")) + subnet * 256
+
+    @staticmethod
+    def _ip6_network(subnet: int) -> int:
+        return int(ipaddress.IPv6Address("2001:db8::")) + (subnet << 64)
+
+    def ip4_address(self, index: int) -> dict[str, Any]:
+        """the IPv4 address row at index"""
+        subnet, host = divmod(index, PER_SUBNET)
+        addr = self._ip4_network(subnet) + host + 1
+        return {
+            "ip_id": str(index + 1),
+            "ip_addr": f"{addr:08x}",
+            "hostaddr": str(ipaddress.IPv4Address(addr)),
+            "name": f"host{index}.example.com",
+            "type": "ip",
+            "subnet_id": str(subnet + 1),
+            "subnet_size": "256",
+            "ip_class_parameters": _params(f"host {index}"),
+        }
+
+    def ip6_address(self, index: int) -> dict[str, Any]:
+        """the IPv6 address row at index"""
+        subnet, host = divmod(index, PER_SUBNET)
+        addr = self._ip6_network(subnet) + host + 1
+        return {
+            "ip6_id": str(index + 1),
+            "ip6_addr": f"{addr:032x}",
+            "hostaddr": str(ipaddress.IPv6Address(addr)),
+            "ip6_name": f"host{index}.v6.example.com",
+            "type": "ip6",
+            "subnet6_id": str(subnet + 1),
+            "subnet6_prefix": "64",
+            "ip6_class_parameters": _params(f"v6 host {index}"),
+        }
+
+    def ip4_subnet(self, index: int) -> dict[str, Any]:
+        """the IPv4 subnet row at index"""
+        start = self._ip4_network(index)
+        return {
+            "subnet_id": str(index + 1),
+            "subnet_name": f"subnet {index}",
+            "start_hostaddr": str(ipaddress.IPv4Address(start)),
+            "start_ip_addr": f"{start:08x}",
+            "end_ip_addr": f"{start + 255:08x}",
+            "subnet_size": "256",
+            "is_terminal": "1",
+            "ip_class_parameters": _params(f"subnet {index}"),
+        }
+
+    def ip6_subnet(self, index: int) -> dict[str, Any]:
+        """the IPv6 subnet row at index"""
+        start = self._ip6_network(index)
+        return {
+            "subnet6_id": str(index + 1),
+            "subnet6_name": f"v6 subnet {index}",
+            "start_hostaddr": str(ipaddress.IPv6Address(start)),
+            "start_ip6_addr": f"{start:032x}",
+            "end_ip6_addr": f"{start + (1 << 64) - 1:032x}",
+            "subnet6_prefix": "64",
+            "is_terminal": "1",
+            "ip6_class_parameters": _params(f"v6 subnet {index}"),
+        }
+
+    def _indexes(self, id_field: str, count: int, where: str | None) -> range | list:
+        """the row indexes selected by a WHERE clause"""
+        if not where:
+            return range(count)
+        keyset = KEYSET_WHERE.match(where)
+        if keyset and keyset.group(1) == id_field:
+            return range(min(int(keyset.group(2)), count), count)
+        in_list = IN_WHERE.match(where)
+        if in_list and in_list.group(1) == id_field:
+            ids = (int(value.strip(" '")) for value in in_list.group(2).split(","))
+            return sorted(each - 1 for each in ids if 0 < each <= count)
+        raise ValueError(f"unsupported WHERE clause {where}")
+
+    def handle(self, action: str, params: dict[str, str]) -> Any:
+        """answer one API call
+
+        Args:
+            action (str): the API action, eg ip_address_list
+            params (dict): the query parameters
+
+        Returns:
+            Any: the decoded response body, None for an unknown action
+        """
+        table, _, kind = action.rpartition("_")
+        if table not in self.tables or kind not in ("list", "count", "info"):
+            return None
+        id_field, count, row = self.tables[table]
+        if kind == "info":
+            index = int(params.get(id_field, 0)) - 1
+            return [row(index)] if 0 <= index < count else []
+        indexes = self._indexes(id_field, count, params.get("WHERE"))
+        if kind == "count":
+            return [{"total": str(len(indexes))}]
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit") or params.get("LIMIT") or 1000)
+        end = offset + limit
+        rows = [row(index) for index in indexes[offset:end]]
+        if params.get("SELECT"):
+            columns = params["SELECT"].split(",")
+            if rows and not set(columns) <= rows[0].keys():
+                unknown = sorted(set(columns) - rows[0].keys())
+                raise ValueError(f"unknown SELECT columns {unknown}")
+            rows = [{column: each[column] for column in columns} for each in rows]
+        return rows
+
+
+def make_handler(
+    dataset: FakeDataset, latency: float, stats: dict[str, int]
+) -> type[BaseHTTPRequestHandler]:
+    """build a request handler class serving a dataset"""
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        """Solidserver REST API stand-in"""
+
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+        def _reply(self, status: int, body: bytes = b"") -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            """serve list, count and info actions"""
+            url = urllib.parse.urlsplit(self.path)
+            params = dict(urllib.parse.parse_qsl(url.query))
+            with lock:
+                stats["requests"] += 1
+            if latency:
+                time.sleep(latency)
+            try:
+                result = dataset.handle(url.path.rsplit("/", 1)[-1], params)
+            except ValueError as err:
+                self._reply(400, json.dumps({"errmsg": str(err)}).encode())
+                return
+            if result is None:
+                self._reply(404)
+            elif not result:
+                self._reply(204)
+            else:
+                self._reply(200, json.dumps(result).encode())
+
+    return Handler
+
+
+def serve(
+    records: int,
+    latency: float = 0.0,
+    ipv6_share: float = 0.1,
+    port: int = 0,
+    ready: Any = None,
+) -> None:
+    """serve a synthetic dataset until killed
+
+    Args:
+        records (int): the number of addresses
+        latency (float, optional): seconds to wait before every reply.
+          Defaults to 0.
+        ipv6_share (float, optional): the share of IPv6 addresses. Defaults
+          to 0.1.
+        port (int, optional): the port, 0 picks a free one. Defaults to 0.
+        ready (Queue, optional): the chosen port is put here once serving.
+    """
+    dataset = FakeDataset(records, ipv6_share)
+    stats = {"requests": 0}
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", port), make_handler(dataset, latency, stats)
+    )
+    server.daemon_threads = True
+    if ready is not None:
+        ready.put(server.server_port)
+    server.serve_forever()
+
+
+class FakeSolidServer:
+    """Run the stand-in in a child process, so it does not share the GIL or
+    the traced memory of the code being benchmarked.  Use as a context
+    manager.
+
+    Args:
+        records (int): the number of addresses
+        latency (float, optional): seconds to wait before every reply
+        ipv6_share (float, optional): the share of IPv6 addresses
+    """
+
+    def __init__(
+        self, records: int, latency: float = 0.0, ipv6_share: float = 0.1
+    ) -> None:
+        self.records = records
+        self.latency = latency
+        self.ipv6_share = ipv6_share
+        self.url = ""
+        self._process: multiprocessing.Process | None = None
+
+    def __enter__(self) -> "FakeSolidServer":
+        ready: Any = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=serve,
+            args=(self.records, self.latency, self.ipv6_share, 0, ready),
+            daemon=True,
+        )
+        self._process.start()
+        self.url = f"http://127.0.0.1:{ready.get(timeout=30)}"
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--ipv6-share", type=float, default=0.1)
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    print(f"serving {args.records} records on http://127.0.0.1:{args.port}")
+    serve(args.records, args.latency, args.ipv6_share, args.port)
@@ -33,6 +33,8 @@ class SSoTEIPSolidServerConfig(NautobotAppConfig):
         "nnn_user": "nautobot_nnn",
         "nnn_url": "https://nnn.upenn.edu",
         "nnn_credential": "Credential not found!",
+        "solidserver_async": False,
+        "solidserver_modified_columns": {},
     }
 
 
@@ -41,3 +41,129 @@ LIMIT = 1000
 
 # default URL for Solidserver if something went wrong loading the configuration
 SOLIDSERVER_URL = "https://solidserver.example.com"
+
+# Map each Solidserver list action to the action that returns its record count
+COUNT_ACTIONS = {
+    "ip_address_list": "ip_address_count",
+    "ip6_address6_list": "ip6_address6_count",
+    "ip_block_subnet_list": "ip_block_subnet_count",
+    "ip6_block6_subnet6_list": "ip6_block6_subnet6_count",
+}
+
+# Default number of worker threads used when fetching pages concurrently
+MAX_WORKERS = 4
+
+# Longest url encoded WHERE clause to send in a single query, keeps the full
+# request url under common proxy and server limits
+MAX_WHERE_LENGTH = 1800
+
+# Columns used to order and seek through each list action when keyset pagination
+# is enabled.  The second column breaks ties for free addresses, which all share
+# an id of 0.
+KEYSET_COLUMNS = {
+    "ip_address_list": ("ip_id", "ip_addr"),
+    "ip6_address6_list": ("ip6_id", "ip6_addr"),
+    "ip_block_subnet_list": ("subnet_id", None),
+    "ip6_block6_subnet6_list": ("subnet6_id", None),
+}
+
+# Columns the adapters read from each list action.  Only these are requested
+# from Solidserver unless a query asks for other columns.
+DEFAULT_FIELDS = {
+    "ip_address_list": (
+        "ip_id",
+        "ip_addr",
+        "hostaddr",
+        "name",
+        "type",
+        "subnet_id",
+        "subnet_size",
+        "ip_class_parameters",
+    ),
+    "ip6_address6_list": (
+        "ip6_id",
+        "ip6_addr",
+        "hostaddr",
+        "ip6_name",
+        "type",
+        "subnet6_id",
+        "subnet6_prefix",
+        "ip6_class_parameters",
+    ),
+    "ip_block_subnet_list": (
+        "subnet_id",
+        "subnet_name",
+        "start_hostaddr",
+        "start_ip_addr",
+        "end_ip_addr",
+        "subnet_size",
+        "is_terminal",
+        "ip_class_parameters",
+    ),
+    "ip6_block6_subnet6_list": (
+        "subnet6_id",
+        "subnet6_name",
+        "start_hostaddr",
+        "start_ip6_addr",
+        "end_ip6_addr",
+        "subnet6_prefix",
+        "is_terminal",
+        "ip6_class_parameters",
+    ),
+}
+
+# Retry idempotent (GET) requests that fail with these status codes or with a
+# connection error or timeout, waiting BACKOFF_FACTOR * 2 ** attempt seconds
+# (at most MAX_BACKOFF) between attempts
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+MAX_BACKOFF = 30
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Adaptive request limiting.  Requests in flight grow by one per window of
+# healthy responses, up to the worker count, and are cut by RATE_DECREASE when
+# a response is slower than LATENCY_TARGET seconds or is a 429/5xx
+LATENCY_TARGET = 5.0
+RATE_DECREASE = 0.5
+
+# Incremental syncs only fetch records modified since the last successful sync,
+# using these columns, which hold a unix timestamp.  The column names have not
+# been checked against every Solidserver release, so a record of each action is
+# fetched first and the sync falls back to a full one if its column is missing
+# or not a timestamp.  The solidserver_modified_columns plugin setting
+# overrides them
+MODIFIED_TIME_COLUMNS = {
+    "ip_address_list": "ip_mod_time",
+    "ip6_address6_list": "ip6_mod_time",
+    "ip_block_subnet_list": "subnet_mod_time",
+    "ip6_block6_subnet6_list": "subnet6_mod_time",
+}
+# seconds subtracted from the last sync start time, to allow for clock skew
+# between Nautobot and Solidserver
+INCREMENTAL_OVERLAP = 300
+
+# rows fetched per database round trip when loading Nautobot objects
+ORM_CHUNK_SIZE = 2000
+
+# objects written per query by the bulk apply mode
+BULK_BATCH_SIZE = 1000
+
+# changes applied to Nautobot per savepoint, with a checkpoint after each
+COMMIT_CHUNK_SIZE = 5000
+
+# Job logging.  "quiet" drops debug output, "normal" drops per-record debug
+# output and "verbose" keeps it.  Debug messages are joined LOG_BATCH_SIZE at
+# a time and repeated warnings are summarized with LOG_SAMPLE_KEYS examples
+LOG_VERBOSITY_LEVELS = ("quiet", "normal", "verbose")
+LOG_VERBOSITY = "normal"
+LOG_BATCH_SIZE = 100
+LOG_SAMPLE_KEYS = 5
+
+# Sync duration fields, where nautobot_ssot has them, and the timed job phase
+# that fills each one
+SYNC_DURATION_PHASES = {
+    "source_load_time": "load_solidserver",
+    "target_load_time": "load_nautobot",
+    "diff_time": "diff",
+    "sync_time": "apply",
+}
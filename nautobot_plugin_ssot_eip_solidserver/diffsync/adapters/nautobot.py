@@ -1,7 +1,15 @@
 """Adapt Nautobot ORM objects into diffsync models
 """
+import functools
+import operator
+import time
+from collections import Counter
+from typing import Any
+
 import netaddr  # type: ignore
+from diffsync import DiffSync
 from diffsync.exceptions import ObjectAlreadyExists
+from django.db.models import Q, QuerySet  # type: ignore
 from nautobot.extras.jobs import Job  # type: ignore
 from nautobot.ipam.models import IPAddress  # type: ignore
 from nautobot.ipam.models import Prefix
@@ -9,10 +17,30 @@ from nautobot_ssot.contrib import NautobotAdapter  # type: ignore
 from nautobot_ssot.models import Sync  # type: ignore
 from netaddr import AddrFormatError
 
+from nautobot_plugin_ssot_eip_solidserver.constants import LIMIT, ORM_CHUNK_SIZE
 from nautobot_plugin_ssot_eip_solidserver.diffsync.models.base import (
     SSoTIPAddress,
     SSoTIPPrefix,
 )
+from nautobot_plugin_ssot_eip_solidserver.utils import joblog, ssutils, timing
+
+
+# the columns the diffsync models are built from, in _load_one_* argument order
+ADDRESS_COLUMNS = (
+    "host",
+    "prefix_length",
+    "dns_name",
+    "description",
+    "status__name",
+    "_custom_field_data",
+)
+PREFIX_COLUMNS = (
+    "network",
+    "prefix_length",
+    "description",
+    "status__name",
+    "_custom_field_data",
+)
 
 
 class SSoTNautobotAdapter(NautobotAdapter):
@@ -23,74 +51,189 @@ class SSoTNautobotAdapter(NautobotAdapter):
 
     top_level = ["ipaddress", "prefix"]
 
-    def __init__(self, *args, job: Job, sync: Sync, **kwargs):
-        """Initialize the Nautobot DiffSync adapter."""
+    def __init__(
+        self,
+        *args,
+        job: Job,
+        sync: Sync,
+        timer: timing.PhaseTimer | None = None,
+        **kwargs,
+    ):
+        """Initialize the Nautobot DiffSync adapter.  ORM and model building
+        times are added to timer, if given."""
         super().__init__(*args, **kwargs)
-        self.job: Job = job
+        self.job: joblog.BufferedJobLogger = joblog.as_buffered_logger(job)
         self.sync: Sync = sync
+        # filled in during load, so sizes can be logged without dict()
+        self.stats: Counter[str] = Counter()
+        self.timer = timer or timing.PhaseTimer()
 
-    def _load_one_ipaddress(self, ipaddr: IPAddress) -> None:
-        """Create a single IPAddress object and load it into the adapter model.
+    def stats_summary(self) -> str:
+        """summarize what was loaded, without serializing the adapter
+
+        Returns:
+            str: a one line summary
+        """
+        return ssutils.format_adapter_stats("Nautobot adapter", self.stats)
+
+    def _load_one_ipaddress(
+        self,
+        host: Any,
+        prefix_length: int,
+        dns_name: str,
+        description: str,
+        status_name: str,
+        custom_field_data: dict[str, Any] | None,
+    ) -> None:
+        """Create a single IPAddress model and load it into the adapter.
 
         Args:
-            ipaddr (IPAddress): The IPAddress object to load.
+            host (Any): the address, as returned by the ORM
+            prefix_length (int): the address prefix length
+            dns_name (str): the address dns name
+            description (str): the address description
+            status_name (str): the name of the address status
+            custom_field_data (dict): the address custom field data
         """
-        self.job.log_debug(f"NB adapter loading ip address {ipaddr.host}")
+        self.job.log_record(f"NB adapter loading ip address {host}")
         try:
-            addr_id: str = ipaddr._custom_field_data.get("solidserver_addr_id")
+            addr_id: str = custom_field_data.get("solidserver_addr_id")
         except (AttributeError, TypeError, ValueError):
             addr_id = "not found"
         if not addr_id:
-            self.job.log_warning(f"NB address {ipaddr.host} has no solidserver_addr_id")
+            self.job.log_grouped_warning(
+                "NB addresses without solidserver_addr_id",
+                host,
+                f"NB address {host} has no solidserver_addr_id",
+            )
             addr_id = "not found"
         new_ip = self.ipaddress(
-            host=str(ipaddr.host),
-            dns_name=ipaddr.dns_name,
-            description=ipaddr.description,
+            host=str(host),
+            dns_name=dns_name,
+            description=description,
             solidserver_addr_id=addr_id,
-            prefix_length=ipaddr.prefix_length,
-            status__name=ipaddr.status.name,
+            prefix_length=prefix_length,
+            status__name=status_name,
         )
         try:
             self.add(new_ip)
+            self.stats["ipaddress"] += 1
         except ObjectAlreadyExists as err:
-            self.job.log_warning(
-                f"NB Adapter unable to load duplicate {ipaddr.host}. {err}"
+            self.stats["duplicates"] += 1
+            self.job.log_grouped_warning(
+                "NB Adapter skipped duplicate addresses",
+                host,
+                f"NB Adapter unable to load duplicate {host}. {err}",
             )
 
-    def _load_one_prefix(self, prefix: Prefix) -> None:
-        """Create a single Prefix object and load it into the adapter model.
+    def _load_one_prefix(
+        self,
+        network: Any,
+        prefix_length: int,
+        description: str,
+        status_name: str,
+        custom_field_data: dict[str, Any] | None,
+    ) -> None:
+        """Create a single Prefix model and load it into the adapter.
 
         Args:
-            prefix (Prefix): The Prefix object to load.
+            network (Any): the network address, as returned by the ORM
+            prefix_length (int): the prefix length
+            description (str): the prefix description
+            status_name (str): the name of the prefix status
+            custom_field_data (dict): the prefix custom field data
         """
-        self.job.log_debug(f"NB adapter loading prefix {prefix.prefix}")
+        self.job.log_record(f"NB adapter loading prefix {network}/{prefix_length}")
         try:
-            addr_id: str = prefix._custom_field_data.get("solidserver_addr_id")
+            addr_id: str = custom_field_data.get("solidserver_addr_id")
         except (AttributeError, TypeError):
             addr_id = "not found"
         if not addr_id:
-            self.job.log_warning(
-                f"NB address {prefix.network} has no solidserver_addr_id"
+            self.job.log_grouped_warning(
+                "NB prefixes without solidserver_addr_id",
+                f"{network}/{prefix_length}",
+                f"NB address {network} has no solidserver_addr_id",
             )
             addr_id = "not found"
         new_prefix = self.prefix(
-            network=str(prefix.network),
-            prefix_length=prefix.prefix_length,
-            description=prefix.description,
+            network=str(network),
+            prefix_length=prefix_length,
+            description=description,
             solidserver_addr_id=addr_id,
-            status__name=prefix.status.name,
+            status__name=status_name,
         )
-        self.job.log_debug(
+        self.job.log_record(
             f"new prefix {new_prefix.network} {new_prefix.prefix_length}"
         )
         try:
             self.add(new_prefix)
+            self.stats["prefix"] += 1
         except ObjectAlreadyExists as err:
-            self.job.log_warning(
-                f"NB adapter unable to load duplicate {new_prefix.network}. {err}"
+            self.stats["duplicates"] += 1
+            self.job.log_grouped_warning(
+                "NB Adapter skipped duplicate prefixes",
+                f"{network}/{prefix_length}",
+                f"NB adapter unable to load duplicate {new_prefix.network}. {err}",
             )
 
+    def _load_ipaddress_rows(self, queryset: QuerySet) -> int:
+        """Load IP addresses from a queryset, fetching only the columns the
+        models use, in chunks, without building model instances
+
+        Args:
+            queryset (QuerySet): an IPAddress queryset
+
+        Returns:
+            int: the number of rows loaded
+        """
+        count = 0
+        model_seconds = 0.0
+        loading = time.perf_counter()
+        rows = queryset.values_list(*ADDRESS_COLUMNS).iterator(
+            chunk_size=ORM_CHUNK_SIZE
+        )
+        for row in rows:
+            started = time.perf_counter()
+            self._load_one_ipaddress(*row)
+            model_seconds += time.perf_counter() - started
+            count += 1
+        self._add_load_time(loading, model_seconds, count)
+        return count
+
+    def _load_prefix_rows(self, queryset: QuerySet) -> int:
+        """Load prefixes from a queryset, fetching only the columns the models
+        use, in chunks, without building model instances
+
+        Args:
+            queryset (QuerySet): a Prefix queryset
+
+        Returns:
+            int: the number of rows loaded
+        """
+        count = 0
+        model_seconds = 0.0
+        loading = time.perf_counter()
+        rows = queryset.values_list(*PREFIX_COLUMNS).iterator(chunk_size=ORM_CHUNK_SIZE)
+        for row in rows:
+            started = time.perf_counter()
+            self._load_one_prefix(*row)
+            model_seconds += time.perf_counter() - started
+            count += 1
+        self._add_load_time(loading, model_seconds, count)
+        return count
+
+    def _add_load_time(self, loading: float, model_seconds: float, count: int):
+        """split the time spent loading rows into ORM and model building time
+
+        Args:
+            loading (float): time.perf_counter() when loading started
+            model_seconds (float): the time spent building models
+            count (int): the number of rows loaded
+        """
+        orm_seconds = time.perf_counter() - loading - model_seconds
+        self.timer.add("nautobot_orm", orm_seconds, count)
+        self.timer.add("nautobot_models", model_seconds, count)
+
     def _load_filtered_ip_addresses(self, filter_field, this_filter):
         """Collect ip addresses from ORM, create models, load into diffsync
 
@@ -98,19 +241,30 @@ class SSoTNautobotAdapter(NautobotAdapter):
             filter_field (str): type of filter
             this_filter (str or list): the filter data for this IP load
         """
-        filtered_addrs = []
+        filtered_addrs = None
         if filter_field == "host__net_in":
             if not isinstance(this_filter, list):
                 this_filter = [this_filter]
             message = f"host__net_in={this_filter}"
             self.job.log_debug(message=message)
             filtered_addrs = IPAddress.objects.filter(host__net_in=this_filter)
-        elif filter_field == "dns_name__icontains":
-            message = f"dns_name__icontains={this_filter}"
+        elif filter_field == "dns_name__iendswith":
+            # one OR'd query returns each address once, however many domains
+            # it matches, like Solidserver's LIKE '%.domain'
+            if not isinstance(this_filter, list):
+                this_filter = [this_filter]
+            message = f"dns_name__iendswith={this_filter}"
             self.job.log_debug(message=message)
-            filtered_addrs = IPAddress.objects.filter(dns_name__icontains=this_filter)
-        for ipaddr in filtered_addrs:
-            self._load_one_ipaddress(ipaddr)
+            query = functools.reduce(
+                operator.or_,
+                (
+                    Q(dns_name__iendswith=f".{each_domain}")
+                    for each_domain in this_filter
+                ),
+            )
+            filtered_addrs = IPAddress.objects.filter(query)
+        if filtered_addrs is not None:
+            self._load_ipaddress_rows(filtered_addrs)
 
     def _load_filtered_ip_prefixes(self, filter_field, this_filter):
         """Collect ip prefixes from ORM, create models, load into diffsync
@@ -119,7 +273,7 @@ class SSoTNautobotAdapter(NautobotAdapter):
             filter_field (str): filter type
             this_filter (str): the filter to use
         """
-        filtered_prefixes = []
+        filtered_prefixes = Prefix.objects.none()
         self.job.log_debug(f"Getting prefixes in {this_filter}")
         if filter_field == "prefix__net_contained_or_equal":
             filtered_prefixes = Prefix.objects.filter(
@@ -127,9 +281,8 @@ class SSoTNautobotAdapter(NautobotAdapter):
             )
         elif filter_field == "prefix":
             filtered_prefixes = Prefix.objects.filter(network=this_filter)
-        self.job.log_debug(f"Processing {len(filtered_prefixes)} prefixes")
-        for prefix in filtered_prefixes:
-            self._load_one_prefix(prefix)
+        self.job.log_debug(f"Processing {filtered_prefixes.count()} prefixes")
+        self._load_prefix_rows(filtered_prefixes)
 
     def load_ip_addresses(self, address_filter=None, domain_filter=None):
         """Add Nautobot IPAddress objects as DiffSync IPAddress models."""
@@ -147,17 +300,17 @@ class SSoTNautobotAdapter(NautobotAdapter):
                 domain_filter = domain_filter.split(",")
             message = f"Starting domain_filter with {domain_filter}"
             self.job.log_debug(message=message)
-            for each_domain in domain_filter:
-                message = f"each_domain is {each_domain}"
-                self.job.log_debug(message=message)
-                this_filter = f"{each_domain.strip().lstrip()}"
-                # dns_name__icontains
-                self._load_filtered_ip_addresses(
-                    filter_field="dns_name__icontains", this_filter=this_filter
-                )
+            this_filter = [
+                each_domain.strip()
+                for each_domain in domain_filter
+                if each_domain.strip()
+            ]
+            self._load_filtered_ip_addresses(
+                filter_field="dns_name__iendswith", this_filter=this_filter
+            )
         if not address_filter and not domain_filter:
-            for ipaddr in IPAddress.objects.all():
-                self._load_one_ipaddress(ipaddr)
+            count = self._load_ipaddress_rows(IPAddress.objects.all())
+            self.job.log_debug(f"Processed {count} addresses")
 
     def load_ip_prefixes(self, address_filter):
         """Add Nautobot IPPrefix objects as DiffSync IPPrefix models."""
@@ -174,9 +327,8 @@ class SSoTNautobotAdapter(NautobotAdapter):
         if not address_filter:
             # for now, getting all prefixes when domain filter is present
             # there's not a good way to map domain name to prefix.
-            self.job.log_debug(f"Processing {len(Prefix.objects.all())} prefixes")
-            for prefix in Prefix.objects.all():
-                self._load_one_prefix(prefix)
+            count = self._load_prefix_rows(Prefix.objects.all())
+            self.job.log_debug(f"Processed {count} prefixes")
 
     def load(self, addrs=True, prefixes=True, address_filter=None, domain_filter=None):
         """jobs facing method, coordinates which private methods to run and
@@ -197,3 +349,30 @@ class SSoTNautobotAdapter(NautobotAdapter):
         if prefixes:
             self.job.log_info(message="Starting to load prefixes")
             self.load_ip_prefixes(address_filter)
+        self.job.flush_summaries()
+
+    def load_counterparts(self, source: DiffSync, addrs=True, prefixes=True):
+        """Load only the Nautobot objects that match models already loaded into
+        another adapter.  Used by incremental syncs, where the source adapter
+        only holds recently modified records.
+
+        Args:
+            source (DiffSync): the loaded source adapter
+            addrs (bool, optional): Load addresses? Defaults to True.
+            prefixes (bool, optional): Load prefixes? Defaults to True.
+        """
+        if addrs:
+            hosts = [each.host for each in source.get_all("ipaddress")]
+            self.job.log_info(message=f"Loading {len(hosts)} matching IP addresses")
+            for batch in ssutils.batched(hosts, LIMIT):
+                self._load_ipaddress_rows(IPAddress.objects.filter(host__in=batch))
+        if prefixes:
+            networks = [
+                Q(network=each.network, prefix_length=each.prefix_length)
+                for each in source.get_all("prefix")
+            ]
+            self.job.log_info(message=f"Loading {len(networks)} matching prefixes")
+            for batch in ssutils.batched(networks, LIMIT):
+                query = functools.reduce(operator.or_, batch)
+                self._load_prefix_rows(Prefix.objects.filter(query))
+        self.job.flush_summaries()
@@ -1,19 +1,32 @@
 """Adapter to collect IP addresses and prefixes from Solidserver
 and creates DiffSync models
 """
-from typing import Any
+import itertools
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Iterable
 
 from diffsync import DiffSync
 from diffsync.exceptions import ObjectAlreadyExists
 from nautobot.extras.jobs import Job  # type: ignore
 from nautobot_ssot.models import Sync  # type: ignore
+from netaddr import AddrFormatError  # type: ignore
 
-from nautobot_plugin_ssot_eip_solidserver.constants import IPV4_SUBNET_SIZE_MAP
+from nautobot_plugin_ssot_eip_solidserver.constants import IPV4_SUBNET_SIZE_MAP, LIMIT
 from nautobot_plugin_ssot_eip_solidserver.diffsync.models.solidserver import (
     SolidserverIPAddress,
     SolidserverIPPrefix,
 )
-from nautobot_plugin_ssot_eip_solidserver.utils import ssapi, ssutils
+from nautobot_plugin_ssot_eip_solidserver.utils import (
+    aiossapi,
+    ipindex,
+    joblog,
+    ssapi,
+    ssutils,
+    timing,
+    vectorized,
+)
 
 
 class SolidserverAdapter(DiffSync):
@@ -25,45 +38,113 @@ class SolidserverAdapter(DiffSync):
     top_level = ["ipaddress", "prefix"]
 
     def __init__(
-        self, *args, job: Job, conn: ssapi.SolidServerAPI, sync: Sync, **kwargs
+        self,
+        *args,
+        job: Job,
+        conn: ssapi.SolidServerAPI | aiossapi.SolidServerAsyncFacade,
+        sync: Sync,
+        timer: timing.PhaseTimer | None = None,
+        **kwargs,
     ) -> None:
-        """Initialize the Solidserver DiffSync adapter."""
+        """Initialize the Solidserver DiffSync adapter.  The time spent
+        building models is added to timer, if given."""
         super().__init__(*args, **kwargs)
-        self.job: Job = job
-        self.conn: ssapi.SolidServerAPI = conn
+        self.job: joblog.BufferedJobLogger = joblog.as_buffered_logger(job)
+        self.conn: ssapi.SolidServerAPI | aiossapi.SolidServerAsyncFacade = conn
         self.sync: Sync = sync
+        # filled in during load, so sizes can be logged without dict()
+        self.stats: Counter[str] = Counter()
+        self.timer = timer or timing.PhaseTimer()
+        # built from the loaded subnets when prefixes are loaded first
+        self.prefix_index: ipindex.PrefixIntervalIndex | None = None
 
     def _add_object_to_diffsync(self, obj: Any) -> None:
         try:
             self.add(obj)
-            self.job.log_debug(f"SS Adapter added {obj}")
+            self.stats[obj.get_type()] += 1
+            if self.job.logs_records:
+                self.job.log_record(f"SS Adapter added {obj}")
         except ObjectAlreadyExists as err:
+            self.stats["duplicates"] += 1
             if isinstance(obj, SolidserverIPAddress):
-                self.job.log_warning(f"SS Adapter skipping duplicate {obj.host}. {err}")
+                self.job.log_grouped_warning(
+                    "SS Adapter skipped duplicate addresses",
+                    obj.host,
+                    f"SS Adapter skipping duplicate {obj.host}. {err}",
+                )
             elif isinstance(obj, SolidserverIPPrefix):
-                self.job.log_warning(
+                self.job.log_grouped_warning(
+                    "SS Adapter skipped duplicate prefixes",
+                    f"{obj.network}/{obj.prefix_length}",
                     f"SS Adapter skipping duplicate {obj.network} "
-                    + f"/{obj.prefix_length}. {err}"
+                    + f"/{obj.prefix_length}. {err}",
                 )
 
-    def _process_ipv4_addr(self, each_addr: dict[str, str]) -> int | None:
+    def _add_address(
+        self,
+        host: str,
+        addr_id: str,
+        addr_type: str,
+        zero_host: bool | None = None,
+        **fields: Any,
+    ) -> None:
+        """Check an address before building its model, then add it.  Zero
+        addresses are counted as invalid without building a model.
+
+        Args:
+            host (str): the address
+            addr_id (str): the Solidserver address id
+            addr_type (str): the Solidserver address type, free addresses are
+              unassigned
+            zero_host (bool, optional): whether host is the zero address, if
+              already known. Defaults to None, check host.
+            fields: the other model fields
+        """
+        status, addr_id = ssutils.address_status(addr_id, addr_type)
+        if zero_host is None:
+            zero_host = ssutils.is_zero_host(host)
+        if zero_host:
+            self.stats["invalid"] += 1
+            self.job.log_grouped_warning(
+                "SS Adapter skipped invalid addresses",
+                host,
+                f"Skipping {host} as it is invalid.  addr_id {addr_id}, host {host}",
+            )
+            return
+        self._add_object_to_diffsync(
+            self.ipaddress(
+                host=host, solidserver_addr_id=addr_id, status__name=status, **fields
+            )
+        )
+
+    def _process_ipv4_addr(
+        self,
+        each_addr: dict[str, str],
+        cidr_size: int | None = None,
+        zero_host: bool | None = None,
+    ) -> int | None:
         """Convert one Solidserver IP4 record into a diffsync model
 
         Args:
             each_addr (dict): the Solidserver address record
+            cidr_size (int, optional): the prefix length, if already
+              converted. Defaults to None, read from the record.
+            zero_host (bool, optional): whether the host is the zero address,
+              if already known. Defaults to None, check the host.
 
         Returns:
             int | None: the subnet_id of the address record
         """
+        if cidr_size is None:
+            try:
+                cidr_size = IPV4_SUBNET_SIZE_MAP.get(
+                    int(each_addr.get("subnet_size", 1)), 32
+                )
+            except (ValueError, KeyError):
+                cidr_size = 32
         try:
-            cidr_size: int = IPV4_SUBNET_SIZE_MAP.get(
-                int(each_addr.get("subnet_size", 1)), 32
-            )
-        except (ValueError, KeyError):
-            cidr_size = 32
-        try:
-            descr = ssutils.unpack_class_params(each_addr["ip_class_parameters"]).get(
-                "__eip_description"
+            descr = ssutils.get_class_param(
+                each_addr["ip_class_parameters"], "__eip_description"
             )
             if not descr:
                 descr = " "
@@ -71,67 +152,65 @@ class SolidserverAdapter(DiffSync):
             descr = " "
         except AttributeError:
             message = f"ip_class params: {each_addr['ip_class_parameters']}"
-            self.job.log_debug(message=message)
+            self.job.log_record(message)
             descr = ""
-        new_addr = self.ipaddress(
+        self._add_address(
+            str(each_addr.get("hostaddr")),
+            each_addr.get("ip_id", "not found"),
+            each_addr.get("type", "free"),
+            zero_host,
             dns_name=each_addr.get("name"),
             description=descr,
-            host=str(each_addr.get("hostaddr")),
-            solidserver_addr_id=each_addr.get("ip_id", "not found"),
             prefix_length=cidr_size,
         )
-        if new_addr:
-            valid_addr, new_addr_or_err = ssutils.is_addr_valid(
-                new_addr, each_addr.get("type", "free")
-            )
-            if valid_addr:
-                self._add_object_to_diffsync(new_addr_or_err)
-            else:
-                self.job.log_warning(new_addr_or_err)
-        if new_addr and new_addr.prefix_length:
+        if cidr_size:
             return int(each_addr.get("subnet_id", 0)) or None
         return None
 
-    def _process_ipv6_addr(self, each_addr: dict[str, str]) -> int | None:
+    def _process_ipv6_addr(
+        self,
+        each_addr: dict[str, str],
+        cidr_size: int | None = None,
+        zero_host: bool | None = None,
+    ) -> int | None:
         """Convert one Solidserver IP6 record into a diffsync model
 
         Args:
             each_addr (dict): the Solidserver address record
+            cidr_size (int, optional): the prefix length, if already
+              converted. Defaults to None, read from the record.
+            zero_host (bool, optional): whether the host is the zero address,
+              if already known. Defaults to None, check the host.
 
         Returns:
             int | None: the subnet_id of the address record
         """
+        if cidr_size is None:
+            try:
+                cidr_size = int(each_addr.get("subnet6_prefix", 128))
+            except (ValueError, KeyError):
+                cidr_size = 128
         try:
-            cidr_size: int = int(each_addr.get("subnet6_prefix", 128))
-        except (ValueError, KeyError):
-            cidr_size = 128
-        try:
-            descr = ssutils.unpack_class_params(each_addr["ip6_class_parameters"]).get(
-                "__eip_description"
+            descr = ssutils.get_class_param(
+                each_addr["ip6_class_parameters"], "__eip_description"
             )
             if not descr:
                 descr = " "
         except (ValueError, KeyError):
             descr = " "
         except AttributeError:
-            self.job.log_debug(f"ip_class params: {each_addr['ip6_class_parameters']}")
+            self.job.log_record(f"ip_class params: {each_addr['ip6_class_parameters']}")
             descr = ""
-        new_addr = self.ipaddress(
+        self._add_address(
+            str(each_addr.get("hostaddr")),
+            each_addr.get("ip6_id", "not found"),
+            each_addr.get("type", "free"),
+            zero_host,
             dns_name=each_addr.get("ip6_name", ""),
             description=descr,
-            host=str(each_addr.get("hostaddr")),
-            solidserver_addr_id=each_addr.get("ip6_id", "not found"),
             prefix_length=cidr_size,
         )
-        if new_addr:
-            valid_addr, new_addr_or_err = ssutils.is_addr_valid(
-                new_addr, each_addr.get("type", "free")
-            )
-            if valid_addr:
-                self._add_object_to_diffsync(new_addr_or_err)
-            else:
-                self.job.log_warning(new_addr_or_err)
-        if new_addr and new_addr.prefix_length:
+        if cidr_size:
             return int(each_addr.get("subnet6_id", 0)) or None
         return None
 
@@ -148,14 +227,14 @@ class SolidserverAdapter(DiffSync):
         except (ValueError, KeyError):
             cidr_size = 32
         try:
-            descr = ssutils.unpack_class_params(each_prefix["ip_class_parameters"]).get(
-                "__eip_description"
+            descr = ssutils.get_class_param(
+                each_prefix["ip_class_parameters"], "__eip_description"
             )
             if not descr:
                 descr = " "
         except (ValueError, KeyError):
             descr = " "
-        self.job.log_debug(
+        self.job.log_record(
             f"About to create prefix {each_prefix.get('start_hostaddr')}/{cidr_size}"
         )
         new_prefix = self.prefix(
@@ -165,17 +244,26 @@ class SolidserverAdapter(DiffSync):
             prefix_length=cidr_size,
         )
         if new_prefix:
-            self.job.log_debug(
+            self.job.log_record(
                 f"new prefix {new_prefix.network}/{new_prefix.prefix_length}"
             )
             valid_prefix, error = ssutils.is_prefix_valid(new_prefix)
             if not valid_prefix:
-                self.job.log_warning(
+                self.stats["invalid"] += 1
+                self.job.log_grouped_warning(
+                    "SS Adapter skipped invalid prefixes",
+                    f"{new_prefix.network}/{new_prefix.prefix_length}",
                     "Invalid prefix"
-                    f" {new_prefix.network}/{new_prefix.prefix_length}, err: {error}"
+                    f" {new_prefix.network}/{new_prefix.prefix_length}, err: {error}",
                 )
                 return
             self._add_object_to_diffsync(new_prefix)
+            if self.prefix_index is not None:
+                self.prefix_index.add(
+                    new_prefix.network,
+                    new_prefix.prefix_length,
+                    new_prefix.solidserver_addr_id,
+                )
 
     def _process_ipv6_prefix(self, each_prefix: dict[str, str]) -> None:
         """Convert one Solidserver IP6 record into a diffsync model
@@ -184,14 +272,14 @@ class SolidserverAdapter(DiffSync):
             each_prefix (dict): the Solidserver prefix record
         """
         try:
-            descr = ssutils.unpack_class_params(
-                each_prefix["ip6_class_parameters"]
-            ).get("__eip_description")
+            descr = ssutils.get_class_param(
+                each_prefix["ip6_class_parameters"], "__eip_description"
+            )
             if not descr:
                 descr = " "
         except (ValueError, KeyError):
             descr = " "
-        self.job.log_debug(
+        self.job.log_record(
             f"About to create prefix {each_prefix.get('subnet6_name')}/"
             + f"{each_prefix.get('subnet6_prefix')}"
         )
@@ -204,14 +292,92 @@ class SolidserverAdapter(DiffSync):
         if new_prefix:
             valid_prefix, error = ssutils.is_prefix_valid(new_prefix)
             if not valid_prefix:
-                self.job.log_warning(
+                self.stats["invalid"] += 1
+                self.job.log_grouped_warning(
+                    "SS Adapter skipped invalid prefixes",
+                    f"{new_prefix.network}/{new_prefix.prefix_length}",
                     "Invalid prefix"
-                    f" {new_prefix.network}/{new_prefix.prefix_length}, err: {error}"
+                    f" {new_prefix.network}/{new_prefix.prefix_length}, err: {error}",
                 )
                 return
             self._add_object_to_diffsync(new_prefix)
+            if self.prefix_index is not None:
+                self.prefix_index.add(
+                    new_prefix.network,
+                    new_prefix.prefix_length,
+                    new_prefix.solidserver_addr_id,
+                )
 
-    def _load_addresses(self, address_filter=None, domain_filter=None):
+    def _index_enclosing_subnets(self, address_filter: Any) -> None:
+        """Add the subnets that contain the address filter to the prefix index
+        without loading them.  A filter narrower than its subnet loads no
+        prefixes, so without them every address would be outside.
+
+        Args:
+            address_filter (str): the CIDR filter
+        """
+        index = self.prefix_index
+        if index is None:
+            return
+        added = 0
+        for each_prefix in self.conn.iter_prefixes_enclosing(address_filter):
+            if not each_prefix.get("is_terminal"):
+                continue
+            try:
+                if each_prefix.get("subnet_id"):
+                    prefix_length = IPV4_SUBNET_SIZE_MAP.get(
+                        int(each_prefix.get("subnet_size", 1)), 32
+                    )
+                    key = each_prefix.get("subnet_id")
+                else:
+                    prefix_length = int(each_prefix.get("subnet6_prefix", 128))
+                    key = each_prefix.get("subnet6_id")
+                index.add(str(each_prefix.get("start_hostaddr")), prefix_length, key)
+            except (AddrFormatError, TypeError, ValueError):
+                continue
+            added += 1
+        self.job.log_debug(f"Indexed {added} subnets enclosing {address_filter}")
+
+    def _subnet_prefix_length(
+        self, each_addr: dict[str, str], version: int, host: int | None, cidr_size: int
+    ) -> int:
+        """The prefix length of the loaded subnet containing an address.
+        Addresses outside every loaded subnet are counted and keep the prefix
+        length of their record.
+
+        Args:
+            each_addr (dict): the Solidserver address record
+            version (int): the IP version
+            host (int | None): the host as an integer, None to parse hostaddr
+            cidr_size (int): the prefix length from the record
+
+        Returns:
+            int: the prefix length to use
+        """
+        index = self.prefix_index
+        if index is None:
+            return cidr_size
+        if host is None:
+            subnet = index.find_address(each_addr.get("hostaddr"))
+        else:
+            subnet = index.find(version, host)
+        if subnet is not None:
+            return subnet.prefix_length
+        self.stats["outside_subnets"] += 1
+        self.job.log_grouped_warning(
+            "SS Adapter found addresses outside the loaded subnets",
+            each_addr.get("hostaddr"),
+            f"{each_addr.get('hostaddr')} is not in a loaded Solidserver subnet, using"
+            f" the prefix length of its record, /{cidr_size}",
+        )
+        return cidr_size
+
+    def _load_addresses(
+        self,
+        address_filter=None,
+        domain_filter=None,
+        modified_since: datetime | None = None,
+    ):
         """Run the api queries against Solidserver, using filters if given,
         then convert results into diffsync models
 
@@ -220,103 +386,141 @@ class SolidserverAdapter(DiffSync):
             None.
             domain_filter (str or list, optional): Domain name filter. Defaults
             to None.
+            modified_since (datetime, optional): only load unfiltered addresses
+            modified since this time. Defaults to None.
 
         Returns:
-            list: a list of unique prefix IDs collected from parent network
-            attribute of addresses
+            dict: the unique parent subnet IDs of the addresses, by IP version
         """
-        all_addrs = []
-        prefix_ids = []
+        addr_streams: list[Iterable[Any]] = []
         if address_filter:
             message = f"Starting to filter addresses with {address_filter}"
             self.job.log_debug(message=message)
-            filter_addrs = self.conn.get_addresses_by_network(address_filter)
-            message = f"Got {len(filter_addrs)} back"
-            self.job.log_debug(message=message)
-            if filter_addrs:
-                message = f"address filter {len(filter_addrs)} addrs"
-                self.job.log_debug(message=message)
-                all_addrs.extend(filter_addrs)
+            addr_streams.append(self.conn.iter_addresses_by_network(address_filter))
         if domain_filter:
             message = f"Starting to filter addresses with {domain_filter}"
             self.job.log_debug(message=message)
-            filter_names = self.conn.get_addresses_by_name(domain_filter)
-            message = f"Got {len(filter_names)} back"
+            addr_streams.append(self.conn.iter_addresses_by_name(domain_filter))
+        if not address_filter and not domain_filter and modified_since:
+            message = f"Starting to gather addresses modified since {modified_since}"
             self.job.log_debug(message=message)
-            if filter_names:
-                message = f"name filter {len(filter_names)} addrs"
-                self.job.log_debug(message=message)
-                all_addrs.extend(filter_names)
-        if not address_filter and not domain_filter:
+            addr_streams.append(self.conn.iter_addresses_modified_since(modified_since))
+        elif not address_filter and not domain_filter:
             message = "Starting to gather unfiltered addresses"
             self.job.log_debug(message=message)
-            all_addrs = self.conn.get_all_addresses()
-            message = f"no filter {len(all_addrs)}"
-            self.job.log_debug(message=message)
+            addr_streams.append(self.conn.iter_all_addresses())
 
-        for each_addr in all_addrs:
-            if each_addr.get("hostaddr"):
-                subnet_id = None
+        # records are converted a page at a time as they stream in, so raw
+        # pages can be freed as soon as they have been processed
+        prefix_ids: dict[int, dict[int, None]] = {4: {}, 6: {}}
+        addr_count = 0
+        # time spent between pages is spent fetching, not building models
+        model_seconds = 0.0
+        records = itertools.chain.from_iterable(addr_streams)
+        for page in ssutils.iter_batches(records, LIMIT):
+            started = time.perf_counter()
+            addr_count += len(page)
+            for each_addr, cidr_size, zero_host, host in vectorized.AddressPage(
+                page
+            ).rows():
+                if not each_addr.get("hostaddr"):
+                    continue
+                if self.prefix_index is not None and not zero_host:
+                    cidr_size = self._subnet_prefix_length(
+                        each_addr, 4 if each_addr.get("ip_id") else 6, host, cidr_size
+                    )
+                subnet_id, version = None, 4
                 if each_addr.get("ip_id"):
                     # ipv4
-                    subnet_id = self._process_ipv4_addr(each_addr)
+                    subnet_id = self._process_ipv4_addr(each_addr, cidr_size, zero_host)
                 elif each_addr.get("ip6_id"):
                     # ipv6
-                    subnet_id = self._process_ipv6_addr(each_addr)
-                if subnet_id and subnet_id not in prefix_ids:
-                    prefix_ids.append(subnet_id)
-        return prefix_ids
+                    version = 6
+                    subnet_id = self._process_ipv6_addr(each_addr, cidr_size, zero_host)
+                if subnet_id:
+                    prefix_ids[version][subnet_id] = None
+            model_seconds += time.perf_counter() - started
+        self.timer.add("solidserver_models", model_seconds, addr_count)
+        message = f"Processed {addr_count} addresses from Solidserver"
+        self.job.log_debug(message=message)
+        return {version: list(ids) for version, ids in prefix_ids.items()}
 
-    def _load_prefixes(self, address_filter=None, subnet_list=None):
+    def _load_prefixes(
+        self,
+        address_filter=None,
+        subnet_ids: dict[int, list[int]] | None = None,
+        modified_since: datetime | None = None,
+    ):
         """Run the api queries against Solidserver, using filters if given,
         then convert results into diffsync models
 
         Args:
             address_filter (str or list, optional): CIDR filter. Defaults to
             None.
-            subnet_list (list, optional): If addresses have been loaded,
-            this will be a list of the parent network IDs for all of the
-            addresses
+            subnet_ids (dict, optional): If addresses have been loaded,
+            the parent network IDs of all of the addresses, by IP version
+            modified_since (datetime, optional): only load unfiltered prefixes
+            modified since this time, subnet_ids is ignored. Defaults to None.
         """
-        all_prefixes = []
+        prefix_streams: list[Iterable[Any]] = []
+        if not address_filter and modified_since:
+            self.job.log_debug(
+                message=f"Starting to gather prefixes modified since {modified_since}"
+            )
+            subnet_ids = None
+            prefix_streams.append(
+                self.conn.iter_prefixes_modified_since(modified_since)
+            )
         if address_filter:
             self.job.log_debug(
                 message=f"About to query for address filter {address_filter}"
             )
-            filter_prefixes = self.conn.get_prefixes_by_network(address_filter)
-            if filter_prefixes:
-                all_prefixes.extend(filter_prefixes)
-                self.job.log_debug(
-                    message=f"Address filter prefixes has {len(filter_prefixes)} items"
+            prefix_streams.append(self.conn.iter_prefixes_by_network(address_filter))
+        subnet_list = (subnet_ids or {}).get(4) or []
+        subnet6_list = (subnet_ids or {}).get(6) or []
+        if subnet_list or subnet6_list:
+            self.job.log_debug(
+                message=(
+                    f"Subnet lists have {len(subnet_list)} IPv4 and"
+                    f" {len(subnet6_list)} IPv6 items"
                 )
-        if subnet_list:
-            self.job.log_debug(message=f"Subnet list has {len(subnet_list)} items")
+            )
             filter_name_prefixes = self.conn.get_prefixes_by_id(
-                subnet_list=subnet_list, address_filter=address_filter
+                subnet_list=subnet_list,
+                address_filter=address_filter,
+                subnet6_list=subnet6_list,
             )
             self.job.log_debug(
                 message=(
                     f"Filter name prefixes has {len(filter_name_prefixes)} items with"
                 )
-                + f" filters {address_filter} and subnet_list {subnet_list}"
+                + f" filters {address_filter} and subnet lists {subnet_list}"
+                + f" {subnet6_list}"
             )
-            self.job.log_debug(message=f"Subnet list has {len(subnet_list)} items")
             if filter_name_prefixes:
                 self.job.log_debug(message="Adding filter name prefixes")
-                all_prefixes.extend(filter_name_prefixes)
-        if not address_filter and not subnet_list:
-            all_prefixes = self.conn.get_all_prefixes()
-            message = f"No filter total {len(all_prefixes)} prefixes"
-            self.job.log_debug(message=message)
+                prefix_streams.append(filter_name_prefixes)
+        if (
+            not address_filter
+            and not subnet_list
+            and not subnet6_list
+            and not modified_since
+        ):
+            self.job.log_debug(message="Starting to gather unfiltered prefixes")
+            prefix_streams.append(self.conn.iter_all_prefixes())
 
-        self.job.log_debug(f"Processing {len(all_prefixes)} prefixes")
-        for each_prefix in all_prefixes:
+        prefix_count = 0
+        model_seconds = 0.0
+        for each_prefix in itertools.chain.from_iterable(prefix_streams):
+            started = time.perf_counter()
+            prefix_count += 1
             if isinstance(each_prefix, list):
                 if len(each_prefix) != 1:
                     self.job.log_warning(message=f"Too many prefixes! {each_prefix}")
+                    model_seconds += time.perf_counter() - started
                     continue
                 each_prefix = each_prefix[0]
-            self.job.log_debug(f"Processing {each_prefix.get('subnet_name')}")
+            self.job.log_record(f"Processing {each_prefix.get('subnet_name')}")
             if each_prefix.get("is_terminal"):
                 if each_prefix.get("subnet_id"):
                     # ipv4
@@ -326,27 +530,66 @@ class SolidserverAdapter(DiffSync):
                         )
                     except (ValueError, KeyError):
                         cidr_size = 32
-                    self.job.log_debug(
-                        message=f"Range {each_prefix.get('start_hostaddr')}/{cidr_size}"
+                    self.job.log_record(
+                        f"Range {each_prefix.get('start_hostaddr')}/{cidr_size}"
                     )
                     self._process_ipv4_prefix(each_prefix)
                 elif each_prefix.get("subnet6_id"):
                     # ipv6
-                    self.job.log_debug(
-                        message=(
-                            "Range"
-                            f" {each_prefix.get('start_hostaddr')}/{each_prefix.get('subnet_size')}"
-                        )
+                    self.job.log_record(
+                        "Range"
+                        f" {each_prefix.get('start_hostaddr')}/{each_prefix.get('subnet_size')}"
                     )
                     self._process_ipv6_prefix(each_prefix)
+            model_seconds += time.perf_counter() - started
+        self.timer.add("solidserver_models", model_seconds, prefix_count)
+        self.job.log_debug(f"Processed {prefix_count} prefixes from Solidserver")
 
-    def load(self, addrs=True, prefixes=True, address_filter=None, domain_filter=None):
+    def load(
+        self,
+        addrs=True,
+        prefixes=True,
+        address_filter=None,
+        domain_filter=None,
+        modified_since: datetime | None = None,
+    ):
         """Load data sets and return the populated DiffSync adapter
-        objects."""
+        objects.  modified_since switches unfiltered loads to records modified
+        since that time, for incremental syncs.
+
+        Unless only a domain filter is given, or the load is incremental, the
+        subnets do not depend on the addresses, so prefixes are loaded first
+        into an interval index that gives each address the prefix length of
+        its subnet without fetching parent subnets by id."""
         prefix_ids = None
+        index_subnets = (
+            addrs
+            and prefixes
+            and not modified_since
+            and (address_filter or not domain_filter)
+        )
+        if index_subnets:
+            self.prefix_index = ipindex.PrefixIntervalIndex()
+            self.job.log_debug("Starting to load prefixes")
+            self._load_prefixes(address_filter)
+            if address_filter:
+                self._index_enclosing_subnets(address_filter)
+            self.job.log_debug(f"Indexed {len(self.prefix_index)} subnets")
         if addrs:
             self.job.log_debug("Starting to load addresses")
-            prefix_ids = self._load_addresses(address_filter, domain_filter)
-        if prefixes:
+            prefix_ids = self._load_addresses(
+                address_filter, domain_filter, modified_since
+            )
+        if prefixes and not index_subnets:
             self.job.log_debug("Starting to load prefixes")
-            self._load_prefixes(address_filter, prefix_ids)
+            self._load_prefixes(address_filter, prefix_ids, modified_since)
+        self.stats["bytes_fetched"] = sum(self.conn.bytes_received.values())
+        self.job.flush_summaries()
+
+    def stats_summary(self) -> str:
+        """summarize what was loaded, without serializing the adapter
+
+        Returns:
+            str: a one line summary
+        """
+        return ssutils.format_adapter_stats("Solidserver adapter", self.stats)
@@ -1,6 +1,7 @@
 """Job for runnning solidserver to nautobot data sync
 """
 # from pprint import pformat
+from datetime import datetime, timedelta
 
 import diffsync  # type: ignore  # pylint: disable=unused-import  # noqa: F401
 import netaddr  # type: ignore
@@ -12,6 +13,7 @@ from django.core.exceptions import ObjectDoesNotExist, ValidationError  # type:
 from django.urls import reverse  # type: ignore
 from nautobot.extras.jobs import (  # type: ignore
     BooleanVar,
+    ChoiceVar,
     IntegerVar,
     IPNetworkVar,
     Job,
@@ -23,8 +25,20 @@ from nautobot_ssot.models import Sync  # type: ignore
 from netaddr import AddrFormatError  # type: ignore
 
 from nautobot_plugin_ssot_eip_solidserver import SSoTEIPSolidServerConfig
+from nautobot_plugin_ssot_eip_solidserver.constants import (
+    BULK_BATCH_SIZE,
+    COMMIT_CHUNK_SIZE,
+    INCREMENTAL_OVERLAP,
+    LOG_VERBOSITY,
+    LOG_VERBOSITY_LEVELS,
+    MAX_WORKERS,
+    RETRIES,
+    SYNC_DURATION_PHASES,
+)
 from nautobot_plugin_ssot_eip_solidserver.diffsync.adapters import nautobot, solidserver
-from nautobot_plugin_ssot_eip_solidserver.utils import ssutils
+from nautobot_plugin_ssot_eip_solidserver.models import SyncRun
+from nautobot_plugin_ssot_eip_solidserver.utils import applier, joblog, ssutils, timing
+from nautobot_plugin_ssot_eip_solidserver.utils.aiossapi import SolidServerAsyncFacade
 from nautobot_plugin_ssot_eip_solidserver.utils.ssapi import SolidServerAPI
 
 PLUGINS_CONFIG = settings.PLUGINS_CONFIG["nautobot_plugin_ssot_eip_solidserver"]
@@ -54,6 +68,88 @@ class SolidserverDataSource(DataSource, Job):
     solidserver_timeout = IntegerVar(
         required=False, default=120, label="Timeout (sec) for Solidserver"
     )
+    incremental = BooleanVar(
+        required=False,
+        default=False,
+        label="Only sync records modified since the last full or incremental sync",
+        description=(
+            "Ignored for filtered runs, deletions are only found by a full sync"
+        ),
+    )
+    bulk_sync = BooleanVar(
+        required=False,
+        default=False,
+        label="Write changes to Nautobot in bulk",
+        description="Much faster for big changes, but skips the Nautobot changelog",
+    )
+    bulk_batch_size = IntegerVar(
+        required=False,
+        default=BULK_BATCH_SIZE,
+        min_value=1,
+        label="Objects written per bulk query",
+    )
+    commit_chunk_size = IntegerVar(
+        required=False,
+        default=COMMIT_CHUNK_SIZE,
+        min_value=1,
+        label="Changes applied per checkpoint",
+        description="Bulk syncs checkpoint progress after each chunk",
+    )
+    resume_sync = BooleanVar(
+        required=False,
+        default=False,
+        label="Resume the last interrupted bulk sync",
+        description=(
+            "Applies the changes it had left instead of fetching again.  Only"
+            " bulk syncs save checkpoints, other syncs can't be resumed"
+        ),
+    )
+    log_verbosity = ChoiceVar(
+        choices=[(level, level.capitalize()) for level in LOG_VERBOSITY_LEVELS],
+        required=False,
+        default=LOG_VERBOSITY,
+        label="Adapter and Solidserver log detail",
+        description="Verbose logs every record, quiet drops debug output",
+    )
+    dump_adapter_contents = BooleanVar(
+        required=False,
+        default=False,
+        label="Log every loaded address and prefix",
+        description="Slow and very verbose on large syncs, for debugging",
+    )
+    concurrent_fetch = BooleanVar(
+        required=False,
+        default=False,
+        label="Fetch unfiltered pages from Solidserver in parallel",
+    )
+    keyset_pagination = BooleanVar(
+        required=False,
+        default=False,
+        label="Page through Solidserver by id instead of offset",
+        description=(
+            "Keeps late pages of large tables fast, ignored for parallel fetches"
+        ),
+    )
+    solidserver_workers = IntegerVar(
+        required=False,
+        default=MAX_WORKERS,
+        min_value=1,
+        label="Parallel Solidserver requests",
+        description="Only used when fetching pages in parallel",
+    )
+    solidserver_retries = IntegerVar(
+        required=False,
+        default=RETRIES,
+        min_value=0,
+        label="Retries for failed Solidserver reads",
+    )
+    solidserver_max_rps = IntegerVar(
+        required=False,
+        default=0,
+        min_value=0,
+        label="Maximum Solidserver requests per second",
+        description="0 for no limit",
+    )
 
     class Meta:
         """Metadata about job"""
@@ -67,8 +163,11 @@ class SolidserverDataSource(DataSource, Job):
     def __init__(self) -> None:
         super().__init__()
         self.domain_filter: list[str] = []
-        self.client: SolidServerAPI
+        self.client: SolidServerAPI | SolidServerAsyncFacade | None = None
+        self.job_logger: joblog.BufferedJobLogger
         self.sync: Sync
+        self.modified_since: datetime | None = None
+        self.timer = timing.PhaseTimer()
         self.diffsync_flags = (
             DiffSyncFlags.CONTINUE_ON_FAILURE
             | DiffSyncFlags.LOG_UNCHANGED_RECORDS
@@ -113,6 +212,234 @@ class SolidserverDataSource(DataSource, Job):
             pass
         return obj
 
+    def get_modified_since(self) -> datetime | None:
+        """find where an incremental sync should start: the start time of the
+        last successful, committed, unfiltered sync, less INCREMENTAL_OVERLAP
+
+        Returns:
+            datetime | None: the earliest modification time to fetch, or None
+            if a full sync is needed
+        """
+        if self.kwargs.get("address_filter_from_ui") or self.domain_filter:
+            self.log_warning(message="Incremental sync ignored for a filtered run")
+            return None
+        last_run = (
+            SyncRun.objects.filter(
+                sync__source=self.data_source,
+                sync__dry_run=False,
+                sync_scope__in=["full", "incremental"],
+                high_water_mark__isnull=False,
+            )
+            .exclude(sync=self.sync)
+            .order_by("-sync__start_time")
+            .first()
+        )
+        if last_run is None:
+            self.log_warning(
+                message=(
+                    "No previous full or incremental sync found, running a full"
+                    " sync instead"
+                )
+            )
+            return None
+        high_water_mark = last_run.high_water_mark
+        self.log_info(
+            message=f"Last full or incremental sync fetched data at {high_water_mark}"
+        )
+        return high_water_mark - timedelta(seconds=INCREMENTAL_OVERLAP)
+
+    def sync_run(self) -> SyncRun:
+        """the plugin's record of this run, created on first use"""
+        run, _ = SyncRun.objects.get_or_create(sync=self.sync)
+        return run
+
+    def modified_columns_usable(self) -> bool:
+        """check that Solidserver returns a unix timestamp in each modification
+        time column, a wrong column name or type would make an incremental
+        query silently miss changes
+
+        Returns:
+            bool: False if a full sync should run instead
+        """
+        problems = self.client.check_modified_columns()
+        for problem in problems:
+            self.log_warning(message=problem)
+        if problems:
+            self.log_warning(
+                message=(
+                    "Modification time columns could not be verified, check the"
+                    " solidserver_modified_columns setting. Running a full sync"
+                    " instead"
+                )
+            )
+        return not problems
+
+    def get_sync_scope(self) -> str:
+        """describe what this run covered, recorded on its SyncRun so that
+        incremental syncs can find the last full or incremental sync"""
+        if (
+            self.kwargs.get("address_filter_from_ui")
+            or self.domain_filter
+            or not self.kwargs.get("fetch_addresses", True)
+            or not self.kwargs.get("fetch_prefixes", True)
+        ):
+            return "partial"
+        if self.modified_since is not None:
+            return "incremental"
+        return "full"
+
+    def apply_changes(
+        self,
+        changes: list[applier.Change],
+        start: int = 0,
+        scope: str = "partial",
+        fetched_at: datetime | None = None,
+    ) -> None:
+        """Apply planned changes to Nautobot in checkpointed chunks
+
+        Args:
+            changes (list): every change planned for the sync
+            start (int, optional): changes already applied by an interrupted
+              run. Defaults to 0.
+            scope (str, optional): the scope of the run that fetched the data.
+              Defaults to "partial".
+            fetched_at (datetime, optional): when that run started. Defaults to
+              the start of this run.
+        """
+        fetched_at = fetched_at or self.sync.start_time
+        diff_applier = applier.DiffApplier(
+            job=self,
+            sync=self.sync,
+            bulk=bool(self.kwargs.get("bulk_sync")),
+            batch_size=self.kwargs.get("bulk_batch_size", BULK_BATCH_SIZE),
+        )
+        try:
+            with self.timer.phase("apply"):
+                diff_applier.apply(
+                    changes,
+                    chunk_size=self.kwargs.get("commit_chunk_size", COMMIT_CHUNK_SIZE),
+                    start=start,
+                    scope=scope,
+                    fetched_at=fetched_at.isoformat(),
+                )
+        except ValidationError as valid_err:
+            self.log_failure(
+                f"Validation error {valid_err}.  If this is a name query it may be"
+                " that some addresses in Nautobot are missing FQDNs so they can't"
+                " be matched to Solidserver and this job has tried to create"
+                " duplicate addresses."
+            )
+            return
+        except SoftTimeLimitExceeded as timeout_err:
+            self.log_failure(
+                f"Query exceeded timeout! {timeout_err}"
+                " Consider re-running the job with a larger timeout"
+                " or a smaller address filter, or resuming the sync."
+            )
+            return
+        finally:
+            self.log_info(message=f"Applied changes: {diff_applier.summary()}")
+        if diff_applier.failed:
+            self.log_failure(
+                f"{diff_applier.failed} changes failed, see the sync log for details"
+            )
+            return
+        self.record_success(scope, fetched_at)
+
+    def sync_to_target(self, diff: diffsync.diff.Diff, scope: str = "partial") -> None:
+        """Apply the diff with DiffSync's sync_to(), through the models' own
+        create, update and delete.  No checkpoint is saved, so an interrupted
+        run can't be resumed.
+
+        Args:
+            diff (Diff): the diff calculated for this run
+            scope (str, optional): the scope of the run. Defaults to "partial".
+        """
+        try:
+            with self.timer.phase("apply"):
+                self.source_adapter.sync_to(self.target_adapter, diff=diff)
+        except ValidationError as valid_err:
+            self.log_failure(
+                f"Validation error {valid_err}.  If this is a name query it may be"
+                " that some addresses in Nautobot are missing FQDNs so they can't"
+                " be matched to Solidserver and this job has tried to create"
+                " duplicate addresses."
+            )
+            return
+        except ObjectNotCreated as create_err:
+            self.log_failure(f"Unable to create object {create_err}")
+            return
+        except SoftTimeLimitExceeded as timeout_err:
+            self.log_failure(
+                f"Query exceeded timeout! {timeout_err}"
+                " Consider re-running the job with a larger timeout"
+                " or a smaller address filter."
+            )
+            return
+        self.record_success(scope, self.sync.start_time)
+
+    def record_success(self, scope: str, fetched_at: datetime) -> None:
+        """log success and store the scope and data time of the sync, which
+        incremental syncs start from
+
+        Args:
+            scope (str): the scope of the run that fetched the data
+            fetched_at (datetime): when that run started
+        """
+        self.log_success(message="Sync succeeded.")
+        run = self.sync_run()
+        run.sync_scope = scope
+        run.high_water_mark = fetched_at
+        run.save()
+
+    def resume_interrupted_sync(self) -> bool:
+        """Apply the changes left by the last interrupted sync, from its stored
+        diff and checkpoint
+
+        Returns:
+            bool: whether there was a sync to resume
+        """
+        interrupted = (
+            SyncRun.objects.filter(
+                sync__source=self.data_source,
+                sync__dry_run=False,
+                checkpoint__state="running",
+            )
+            .exclude(sync=self.sync)
+            .select_related("sync")
+            .order_by("-sync__start_time")
+            .first()
+        )
+        if interrupted is None:
+            self.log_warning(
+                message=(
+                    "No interrupted bulk sync to resume, syncing normally.  Syncs"
+                    " without bulk writes save no checkpoint and can't be resumed"
+                )
+            )
+            return False
+        checkpoint = interrupted.checkpoint
+        changes = applier.plan_changes(interrupted.sync.diff)
+        self.log_info(
+            message=(
+                f"Resuming sync {interrupted.sync.pk} after {checkpoint['applied']} of"
+                f" {len(changes)} changes"
+            )
+        )
+        if self.kwargs.get("dry_run"):
+            return True
+        interrupted.checkpoint = {**checkpoint, "state": "resumed"}
+        interrupted.resumed_by = self.sync
+        interrupted.save()
+        self.sync.diff = interrupted.sync.diff
+        self.apply_changes(
+            changes,
+            start=checkpoint["applied"],
+            scope=checkpoint.get("scope", "partial"),
+            fetched_at=datetime.fromisoformat(checkpoint["fetched_at"]),
+        )
+        return True
+
     def load_source_adapter(
         self, get_addrs: bool = True, get_prefixes: bool = True
     ) -> None:
@@ -120,7 +447,7 @@ class SolidserverDataSource(DataSource, Job):
         `self.source_adapter`."""
         self.log_debug(message="Creating Solidserver adapter")
         self.source_adapter = solidserver.SolidserverAdapter(
-            job=self, conn=self.client, sync=self.sync
+            job=self.job_logger, conn=self.client, sync=self.sync, timer=self.timer
         )
         self.log_debug(message="Running Solidserver .load()")
         self.source_adapter.load(
@@ -128,6 +455,7 @@ class SolidserverDataSource(DataSource, Job):
             prefixes=get_prefixes,
             address_filter=self.kwargs.get("address_filter_from_ui"),
             domain_filter=self.domain_filter,
+            modified_since=self.modified_since,
         )
 
     def load_target_adapter(
@@ -136,7 +464,15 @@ class SolidserverDataSource(DataSource, Job):
         """Method to instantiate and load the TARGET adapter into
         `self.target_adapter`."""
         self.log_debug(message="Creating Nautobot adapter")
-        self.target_adapter = nautobot.SSoTNautobotAdapter(job=self, sync=self.sync)
+        self.target_adapter = nautobot.SSoTNautobotAdapter(
+            job=self.job_logger, sync=self.sync, timer=self.timer
+        )
+        if self.modified_since is not None:
+            self.log_debug(message="Loading nautobot counterparts of modified records")
+            self.target_adapter.load_counterparts(
+                self.source_adapter, addrs=get_addrs, prefixes=get_prefixes
+            )
+            return
         self.log_debug(message="Starting to run nautobot .load()")
         self.target_adapter.load(
             addrs=get_addrs,
@@ -145,9 +481,57 @@ class SolidserverDataSource(DataSource, Job):
             domain_filter=self.domain_filter,
         )
 
+    def dump_adapter(self, adapter: diffsync.DiffSync, name: str) -> None:
+        """log every address and prefix in an adapter, if the job asked for it.
+        This serializes the whole adapter, so it is off by default.
+
+        Args:
+            adapter (DiffSync): a loaded adapter
+            name (str): the adapter name to log
+        """
+        if not self.kwargs.get("dump_adapter_contents"):
+            return
+        contents = adapter.dict()
+        self.log_debug(f"{name} prefixes: {contents.get('prefix', '')}")
+        self.log_debug(f"{name} addresses: {contents.get('ipaddress', '')}")
+
     def sync_data(self) -> None:
         """SSoT plugin required sync_data method
-        Loads both adapters, gets data sets from both, runs diff
+        Runs the sync, then logs the Solidserver request statistics, closes
+        the client, logs how long each phase took and stores the timings with
+        the sync
+        """
+        try:
+            self.run_sync()
+        finally:
+            self.close_client()
+            self.record_timings()
+
+    def close_client(self) -> None:
+        """log the retry and request limit statistics of every Solidserver
+        request the job made, then close the client and its connections, if
+        one was made"""
+        if self.client is not None:
+            self.job_logger.flush()
+            self.log_info(message=self.client.retry_summary())
+            self.log_info(message=self.client.limiter_summary())
+            self.client.close()
+            self.client = None
+
+    def record_timings(self) -> None:
+        """log the phase timings, store them on the SyncRun and fill in the
+        sync duration fields that this version of nautobot_ssot has"""
+        self.log_info(message=self.timer.format())
+        for field, phase in SYNC_DURATION_PHASES.items():
+            if hasattr(self.sync, field) and phase in self.timer.seconds:
+                setattr(self.sync, field, timedelta(seconds=self.timer.seconds[phase]))
+        self.sync.save()
+        run = self.sync_run()
+        run.timings = self.timer.summary()
+        run.save()
+
+    def run_sync(self) -> None:
+        """Loads both adapters, gets data sets from both, runs diff
         operation and, if not dry run, sync operation
         """
         try:
@@ -171,97 +555,93 @@ class SolidserverDataSource(DataSource, Job):
                 raise ValueError("Domain filter contains invalid domains")
             message = f"Domain filter list: {self.domain_filter}"
             self.log_debug(message=message)
+        if self.kwargs.get("resume_sync") and self.resume_interrupted_sync():
+            return
+        if self.kwargs.get("incremental"):
+            self.modified_since = self.get_modified_since()
+            if self.modified_since is not None:
+                self.log_info(
+                    message=f"Syncing records modified since {self.modified_since}"
+                )
         self.log_debug(f"Fetch addresses {self.kwargs.get('fetch_addresses')}")
         self.log_debug(f"Fetch prefixes {self.kwargs.get('fetch_prefixes')}")
         self.log_debug(f"CIDR filter {self.kwargs.get('address_filter_from_ui')}")
         self.log_debug(f"Name filter {self.domain_filter}")
+        self.job_logger = joblog.BufferedJobLogger(
+            self, verbosity=self.kwargs.get("log_verbosity") or LOG_VERBOSITY
+        )
         self.log_debug(message="Creating Solidserver connection")
-        self.client = SolidServerAPI(
-            job=self,
+        client_class: type[SolidServerAPI] | type[
+            SolidServerAsyncFacade
+        ] = SolidServerAPI
+        if PLUGINS_CONFIG.get("solidserver_async"):
+            self.log_debug(message="Using the asyncio Solidserver client")
+            client_class = SolidServerAsyncFacade
+        self.client = client_class(
+            job=self.job_logger,
             username=PLUGINS_CONFIG.get("nnn_user", "username not set"),
             password=PLUGINS_CONFIG.get("nnn_credential", "password not found"),
             base_url=PLUGINS_CONFIG.get("nnn_url", "url not set"),
             timeout=self.kwargs.get("solidserver_timeout", 120),
+            timer=self.timer,
+            concurrent=self.kwargs.get("concurrent_fetch", False),
+            max_workers=self.kwargs.get("solidserver_workers", MAX_WORKERS),
+            keyset_pagination=self.kwargs.get("keyset_pagination", False),
+            retries=self.kwargs.get("solidserver_retries", RETRIES),
+            max_rps=self.kwargs.get("solidserver_max_rps") or None,
+            modified_columns=PLUGINS_CONFIG.get("solidserver_modified_columns"),
         )
 
+        if self.modified_since is not None and not self.modified_columns_usable():
+            self.modified_since = None
+
         self.log_info(message="Collecting data from EIP SOLIDServer")
-        self.load_source_adapter(
-            self.kwargs.get("fetch_addresses", True),
-            self.kwargs.get("fetch_prefixes", True),
-        )
         try:
-            self.log_debug(
-                f"Got {len(self.source_adapter.dict().get('prefix', []))} "
-                + "prefixes from SS"
-            )
-            self.log_debug(
-                f"Got {len(self.source_adapter.dict().get('ipaddress', []))} "
-                + "addresses from SS"
-            )
-            self.log_debug(f"Keys: {self.source_adapter.dict().keys()}")
-            self.log_debug(f"Prefixes: {self.source_adapter.dict().get('prefix', '')}")
-            self.log_debug(
-                f"Addresses: {self.source_adapter.dict().get('ipaddress', '')}"
-            )
-        except AttributeError:
-            self.log_debug(message="Couldn't get length from source adapter")
+            with self.timer.phase("load_solidserver"):
+                self.load_source_adapter(
+                    self.kwargs.get("fetch_addresses", True),
+                    self.kwargs.get("fetch_prefixes", True),
+                )
+        finally:
+            self.job_logger.flush()
+        self.log_info(message=self.source_adapter.stats_summary())
+        self.dump_adapter(self.source_adapter, "SS")
         self.log_info(message="Collecting data from Nautobot")
-        self.load_target_adapter(
-            self.kwargs.get("fetch_addresses", True),
-            self.kwargs.get("fetch_prefixes", True),
-        )
-        try:
-            self.log_debug(
-                f"Got {len(self.target_adapter.dict().get('prefix', []))} "
-                + "prefixes from NB"
-            )
-            self.log_debug(
-                f"Got {len(self.target_adapter.dict().get('ipaddress', []))} "
-                + "addresses from NB"
-            )
-            self.log_debug(f"Keys: {self.target_adapter.dict().keys()}")
-            self.log_debug(f"Prefixes: {self.target_adapter.dict().get('prefix', '')}")
-            self.log_debug(
-                f"Addresses: {self.target_adapter.dict().get('ipaddress', '')}"
+        with self.timer.phase("load_nautobot"):
+            self.load_target_adapter(
+                self.kwargs.get("fetch_addresses", True),
+                self.kwargs.get("fetch_prefixes", True),
             )
-        except AttributeError:
-            self.log_debug(message="Couldn't get length from target adapter")
+        self.log_info(message=self.target_adapter.stats_summary())
+        self.dump_adapter(self.target_adapter, "NB")
 
         self.log_info("Calculating diffs...")
-        diff = self.source_adapter.diff_to(self.target_adapter)
-        self.log_info(f"Found {len(diff)} differences pre-filtering")
-        self.log_info(f"{diff.summary()}")
-        # self.log_debug(pformat(diff.dict()))
-
-        # filtering the source adapter to get rid of any diffs that are solely
-        # status__name changes, and updating any diffs where status__name
-        # exists in the target_adapter to match the target_adapter
-        self.source_adapter = ssutils.filter_diff_for_status(
-            diff, self.source_adapter, self.target_adapter
+        # status__name changes are not synced, objects that exist in both
+        # keep the Nautobot status, so status only differences drop out
+        with self.timer.phase("normalize_status"):
+            status_only = ssutils.normalize_status(
+                self.source_adapter, self.target_adapter
+            )
+        with self.timer.phase("diff"):
+            diff = self.source_adapter.diff_to(self.target_adapter)
+        diff_summary = diff.summary()
+        changes = sum(diff_summary[action] for action in ("create", "update", "delete"))
+        self.log_info(f"Found {changes + status_only} differences pre-filtering")
+        self.log_info(
+            f"Found {changes} differences post-filtering, ignored {status_only} "
+            + "status only differences"
         )
-        diff = self.source_adapter.diff_to(self.target_adapter)
-        self.log_info(f"Found {len(diff)} differences post-filtering")
-        self.log_info(f"{diff.summary()}")
+        self.log_info(f"{diff_summary}")
 
         if not self.kwargs.get("dry_run"):
-            try:
-                self.source_adapter.sync_to(self.target_adapter)
-                self.log_success(message="Sync succeeded.")
-            except ValidationError as valid_err:
-                self.log_failure(
-                    f"Validation error {valid_err}.  If this is a name query it may be"
-                    " that some addresses in Nautobot are missing FQDNs so they can't"
-                    " be matched to Solidserver and this job has tried to create"
-                    " duplicate addresses."
-                )
-            except ObjectNotCreated as create_err:
-                self.log_failure(f"Unable to create object {create_err}")
-            except SoftTimeLimitExceeded as timeout_err:
-                self.log_failure(
-                    f"Query exceeded timeout! {timeout_err}"
-                    " Consider re-running the job with a larger timeout"
-                    " or a smaller address filter."
-                )
+            # the diff is kept on the sync so an interrupted apply can resume
+            self.sync.diff = diff.dict()
+            if not self.kwargs.get("bulk_sync"):
+                self.sync_to_target(diff, scope=self.get_sync_scope())
+                return
+            self.apply_changes(
+                applier.plan_changes(self.sync.diff), scope=self.get_sync_scope()
+            )
 
 
 jobs = [SolidserverDataSource]
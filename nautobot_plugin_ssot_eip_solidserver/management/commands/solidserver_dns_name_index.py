@@ -0,0 +1,49 @@
+"""Optional trigram index for the name filter
+
+The name filter matches IP address dns names by suffix, which PostgreSQL can
+only answer from an index with pg_trgm.  ipam_ipaddress belongs to Nautobot,
+so the plugin does not add the index in a migration, an administrator runs
+
+    nautobot-server solidserver_dns_name_index
+
+to create it and the same command with --drop to remove it.  The pg_trgm
+extension has to be created first by a role allowed to do so.
+"""
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+from django.db import connection  # type: ignore
+
+INDEX_NAME = "ssot_eip_ipaddress_dns_name_trgm"
+
+
+class Command(BaseCommand):
+    """Create or drop the dns name trigram index"""
+
+    help = "Create (or with --drop, drop) a pg_trgm index on IP address dns names"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--drop", action="store_true", help="drop the index instead"
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("the dns name index needs PostgreSQL")
+        # CREATE INDEX CONCURRENTLY can't run inside a transaction, management
+        # commands run in autocommit mode
+        with connection.cursor() as cursor:
+            if options["drop"]:
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+                self.stdout.write(f"dropped {INDEX_NAME}")
+                return
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            if cursor.fetchone() is None:
+                raise CommandError(
+                    "the pg_trgm extension is not installed, run CREATE EXTENSION"
+                    " pg_trgm as a role allowed to create extensions first"
+                )
+            # matches the UPPER() used by iendswith
+            cursor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} ON"
+                " ipam_ipaddress USING gin ((UPPER(dns_name::text)) gin_trgm_ops)"
+            )
+        self.stdout.write(f"created {INDEX_NAME}")
@@ -0,0 +1,34 @@
+"""Models for the SSoT plugin for EIP Solidserver"""
+from django.core.serializers.json import DjangoJSONEncoder  # type: ignore
+from django.db import models  # type: ignore
+from nautobot.core.models import BaseModel  # type: ignore
+from nautobot_ssot.models import Sync  # type: ignore
+
+
+class SyncRun(BaseModel):
+    """What a Solidserver sync covered and how far it got, kept beside the
+    nautobot_ssot Sync, whose summary only holds the diff counts
+
+    sync_scope and high_water_mark are set when a committed sync succeeds, so
+    incremental syncs know where to start.  checkpoint records how many
+    changes an apply has written, so an interrupted sync can be resumed, and
+    timings holds the seconds spent in each phase of the run.
+    """
+
+    sync = models.OneToOneField(
+        to=Sync, on_delete=models.CASCADE, related_name="solidserver_run"
+    )
+    sync_scope = models.CharField(max_length=20, blank=True)
+    high_water_mark = models.DateTimeField(null=True, blank=True)
+    checkpoint = models.JSONField(encoder=DjangoJSONEncoder, default=dict, blank=True)
+    resumed_by = models.ForeignKey(
+        to=Sync,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        null=True,
+        blank=True,
+    )
+    timings = models.JSONField(encoder=DjangoJSONEncoder, default=dict, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.sync} ({self.sync_scope or 'unfinished'})"
@@ -0,0 +1,1146 @@
+"""Asyncio wrapper for solidserver API
+
+AsyncSolidServerAPI mirrors the query methods of ssapi.SolidServerAPI as
+coroutines and async page iterators, keeping up to max_workers requests in
+flight.
+SolidServerAsyncFacade runs it on a private event loop behind the same blocking
+methods as SolidServerAPI, so the adapters can use either client.
+"""
+import asyncio
+import base64
+import json
+import ssl
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Iterable, Iterator, TypeVar
+
+import certifi
+import netaddr  # type: ignore
+from nautobot.extras.jobs import Job  # type: ignore
+from netaddr import AddrFormatError
+
+from nautobot_plugin_ssot_eip_solidserver.constants import (
+    BACKOFF_FACTOR,
+    LIMIT,
+    MAX_WORKERS,
+    MODIFIED_TIME_COLUMNS,
+    RETRIES,
+    RETRY_STATUSES,
+    SOLIDSERVER_URL,
+)
+from nautobot_plugin_ssot_eip_solidserver.utils import (
+    joblog,
+    metrics,
+    ratelimit,
+    ssutils,
+    timing,
+    vectorized,
+)
+from nautobot_plugin_ssot_eip_solidserver.utils.ssapi import (
+    SolidServerBaseError,
+    SolidServerReturnedError,
+    SolidServerUsageError,
+)
+
+try:
+    import aiohttp  # type: ignore
+except ImportError:
+    aiohttp = None  # pylint: disable=invalid-name
+
+T = TypeVar("T")
+
+
+class AsyncSolidServerAPI:
+    """A class to interact with the SolidServer API from asyncio"""
+
+    def __init__(
+        self,
+        job: Job,
+        username: str = "",
+        password: str = "",
+        base_url: str = SOLIDSERVER_URL,
+        sslverify: bool = True,
+        timer: timing.PhaseTimer | None = None,
+        **kwargs,
+    ) -> None:
+        """Constructor.  We'll just store some objects in a dictionary via
+        kwargs.  Request and decode times are added to timer, if given."""
+        if aiohttp is None:
+            raise SolidServerUsageError(
+                "AsyncSolidServerAPI needs aiohttp, install the async extra"
+            )
+        self.__attributes: dict[Any, Any] = {}
+        self.timer = timer or timing.PhaseTimer()
+        self.job = joblog.as_job_logger(job)
+        if kwargs:
+            self.__attributes.update(kwargs)
+        self.base_url = ssutils.normalize_base_url(base_url)
+        self.job.log_debug(f"base url is {self.base_url}")
+        self.__headers: dict[str, str] = {}
+        if username:
+            user64 = base64.b64encode(username.encode("ascii")).decode("ascii")
+            try:
+                pw64 = base64.b64encode(password.encode("ascii")).decode("ascii")
+            except AttributeError:
+                pw64 = ""
+            self.__headers = {"X-IPM-Username": user64, "X-IPM-Password": pw64}
+        # always hand aiohttp an explicit context, some aiohttp versions treat
+        # ssl=True as "do not verify"
+        self.__ssl: ssl.SSLContext | bool = False
+        if sslverify:
+            cafile = None
+            verify = self.__attributes.get("verify") or None
+            if verify:
+                cafile = certifi.where() if verify == "certifi" else verify
+                self.job.log_debug(f"session CA bundle is {cafile}")
+            self.__ssl = ssl.create_default_context(cafile=cafile)
+        if not self.__attributes.get("timeout"):
+            self.__attributes["timeout"] = 60
+        if not self.__attributes.get("max_workers"):
+            self.__attributes["max_workers"] = MAX_WORKERS
+        if self.__attributes.get("retries") is None:
+            self.__attributes["retries"] = RETRIES
+        if self.__attributes.get("backoff_factor") is None:
+            self.__attributes["backoff_factor"] = BACKOFF_FACTOR
+        self.bytes_received: Counter[str] = Counter()
+        self.rows_received: Counter[str] = Counter()
+        self.retry_stats: Counter[str] = Counter()
+        self.session: Any = None
+        self._retired_sessions: list[Any] = []
+        self.limiter: ratelimit.AsyncAdaptiveLimiter | None = None
+
+    async def close(self) -> None:
+        """close aiohttp session, and any retired by set_attr"""
+        if self.session is not None:
+            self._retired_sessions.append(self.session)
+            self.session = None
+        while self._retired_sessions:
+            await self._retired_sessions.pop().close()
+
+    def url(self, path: str) -> str:
+        """generate full url"""
+        if not path.startswith("/"):
+            path = "/" + path
+        if not path.startswith("/rest"):
+            path = "/rest" + path
+        return self.base_url + path
+
+    def set_attr(self, **kwargs) -> None:
+        """set arbitrary attribute.  The session and limiter are rebuilt on
+        the next request when their settings change, requests already in
+        flight finish on the old ones."""
+        for name, value in kwargs.items():
+            self.__attributes[name] = value
+        session_attrs = ("timeout", "pool_maxsize", "keep_alive", "max_workers")
+        if self.session is not None and any(name in kwargs for name in session_attrs):
+            self._retired_sessions.append(self.session)
+            self.session = None
+        limiter_attrs = ("max_workers", "max_rps", "latency_target", "rate_decrease")
+        if any(name in kwargs for name in limiter_attrs):
+            self.limiter = None
+
+    def get_attr(self, arg: Any) -> Any | None:
+        """get any one attribute, return value"""
+        return self.__attributes.get(arg)
+
+    def _get_session(self) -> Any:
+        """create the aiohttp session on first use, it has to be created while
+        the event loop is running"""
+        if self.session is None:
+            workers = int(self.__attributes.get("max_workers") or MAX_WORKERS)
+            pool_maxsize = int(self.__attributes.get("pool_maxsize") or workers)
+            self.session = aiohttp.ClientSession(
+                headers=self.__headers,
+                timeout=aiohttp.ClientTimeout(total=self.__attributes["timeout"]),
+                connector=aiohttp.TCPConnector(
+                    limit=pool_maxsize,
+                    ssl=self.__ssl,
+                    force_close=self.__attributes.get("keep_alive") is False,
+                ),
+            )
+        return self.session
+
+    def _get_limiter(self) -> ratelimit.AsyncAdaptiveLimiter:
+        """create the request limiter on first use, it has to be created while
+        the event loop is running"""
+        if self.limiter is None:
+            self.limiter = ratelimit.AsyncAdaptiveLimiter(
+                int(self.__attributes.get("max_workers") or MAX_WORKERS),
+                max_rps=self.__attributes.get("max_rps"),
+                latency_target=self.__attributes.get("latency_target"),
+                decrease=self.__attributes.get("rate_decrease"),
+            )
+        return self.limiter
+
+    async def generic_api_action(
+        self,
+        api_action: str,
+        http_action: str = "get",
+        params: dict[str, Any] | None = None,
+        data=None,
+    ) -> list[Any] | Any:
+        """Generic API action, returns json response
+
+        Args:
+            api_action (str): API action to perform
+            http_action (str, optional): HTTP action to perform. Defaults to "get".
+            params (dict, optional): Parameters to pass to API. Defaults to None.
+            data (dict, optional): Data to pass to API. Defaults to None.
+
+        Raises:
+            SolidServerBaseError: [description]
+            SolidServerReturnedError: [description]
+
+        Returns:
+            dict: json response in dict form
+        """
+        if http_action not in ("get", "post", "put", "delete", "options"):
+            raise SolidServerBaseError("Not yet implemented")
+        url = self.url(api_action)
+        self.job.log_debug(f"url {url}")
+        self.job.log_debug(f"params {params}")
+        retry = ratelimit.RequestRetries(
+            api_action,
+            http_action,
+            int(self.__attributes.get("retries") or 0),
+            float(self.__attributes.get("backoff_factor") or 0),
+            self.job,
+            self.retry_stats.update,
+        )
+        while True:
+            overloaded = False
+            # release the limiter this attempt acquired, even if set_attr
+            # replaces it meanwhile
+            limiter = self._get_limiter()
+            started = await limiter.acquire()
+            session = self._get_session()
+            try:
+                with self.timer.phase("solidserver_http"):
+                    async with session.request(
+                        http_action.upper(), url, params=params, data=data
+                    ) as response:
+                        content = await response.read()
+                overloaded = response.status in RETRY_STATUSES
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as req_err:
+                overloaded = True
+                delay = retry.failed(req_err)
+                if delay is None:
+                    raise
+            else:
+                self.bytes_received[api_action] += len(content)
+                delay = retry.answered(
+                    response.status, response.headers.get("Retry-After")
+                )
+            finally:
+                metrics.observe_request(
+                    api_action, http_action, time.monotonic() - started
+                )
+                await limiter.release(started, overloaded)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+        if response.status >= 400:
+            self.job.log_debug(f"response code {response.status}")
+            self.job.log_debug(f"response reason {response.reason}")
+            self.job.log_debug(f"response url {response.url}")
+            raise SolidServerReturnedError(content.decode(errors="replace"))
+        if response.status == 204 or content == b" ":
+            return []
+        try:
+            with self.timer.phase("json_decode"):
+                result = ssutils.decode_json(content)
+        except json.decoder.JSONDecodeError as json_err:
+            raise SolidServerBaseError(
+                f"Error decoding json {content.decode(errors='replace')}"
+            ) from json_err
+        metrics.observe_response(
+            api_action,
+            http_action,
+            len(content),
+            len(result) if isinstance(result, list) else None,
+        )
+        return result
+
+    def retry_summary(self) -> str:
+        """summarize request retry statistics for the job log"""
+        return ssutils.format_retry_stats(self.retry_stats)
+
+    def limiter_summary(self) -> str:
+        """summarize request limiter statistics for the job log"""
+        if self.limiter is None:
+            return "Solidserver request limit: no requests sent"
+        return self.limiter.summary()
+
+    async def count_records(
+        self, action: str, params: dict[str, Any] | None = None
+    ) -> int:
+        """Run the count action that matches a list action
+
+        Args:
+            action (str): a list action, eg ip_address_list
+            params (dict, optional): Parameters to pass to API, only WHERE is
+            used. Defaults to None.
+
+        Returns:
+            int: the number of records the list action will return
+        """
+        count_action, count_params = ssutils.count_request(action, params)
+        count = await self.generic_api_action(count_action, "get", count_params)
+        total = ssutils.parse_count(count)
+        if total is None:
+            self.job.log_debug(f"unable to read count for {action} from {count}")
+            return 0
+        return total
+
+    def _project(
+        self,
+        action: str,
+        params: dict[str, Any],
+        fields: Iterable[str] | None = None,
+    ) -> dict[str, Any]:
+        """Add a SELECT to list action parameters, see ssutils.project_params"""
+        return ssutils.project_params(
+            action,
+            params,
+            fields,
+            projection=self.__attributes.get("projection") is not False,
+            keyset=bool(self.__attributes.get("keyset_pagination")),
+        )
+
+    async def _fetch_page(
+        self, action: str, params: dict[str, Any], offset: int
+    ) -> list[Any]:
+        """fetch a single page of a list action"""
+        page_params = dict(params)
+        page_params["offset"] = offset
+        page = await self.generic_api_action(action, "get", page_params)
+        if isinstance(page, dict):
+            page = [page]
+        self.rows_received[action] += len(page)
+        return page
+
+    async def _iter_pages(
+        self, action: str, params: dict[str, Any]
+    ) -> AsyncIterator[list[Any]]:
+        """Fetch the pages of a list action concurrently, yielding them in
+        offset order
+
+        Page offsets are worked out up front from the count action, and up to
+        max_workers pages are fetched ahead of the one being consumed.  If the
+        count was stale and the last page is full, the remaining pages are
+        fetched one at a time.
+
+        Args:
+            action (str): a list action, eg ip_address_list
+            params (dict): Parameters to pass to API
+
+        Yields:
+            list: a page of records
+        """
+        total = await self.count_records(action, params)
+        self.job.log_debug(f"Expecting {total} records from {action}")
+        ahead = int(self.__attributes.get("max_workers") or MAX_WORKERS)
+        offsets = list(range(0, max(total, 1), LIMIT))
+        in_flight: deque[asyncio.Future[list[Any]]] = deque()
+        page: list[Any] = []
+        rows = 0
+        try:
+            for offset in offsets:
+                in_flight.append(
+                    asyncio.ensure_future(self._fetch_page(action, params, offset))
+                )
+                if len(in_flight) >= ahead:
+                    page = await in_flight.popleft()
+                    rows += len(page)
+                    yield page
+            while in_flight:
+                page = await in_flight.popleft()
+                rows += len(page)
+                yield page
+        finally:
+            for future in in_flight:
+                future.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        offset = offsets[-1]
+        while len(page) >= LIMIT:
+            offset += LIMIT
+            self.job.log_debug(f"count was stale, fetching {action} {offset}")
+            page = await self._fetch_page(action, params, offset)
+            rows += len(page)
+            yield page
+        self.job.log_debug(f"done iterating {action}, {rows} records found")
+
+    async def _fetch_all(self, action: str, params: dict[str, Any]) -> list[Any]:
+        """Fetch every page of a list action concurrently
+
+        Page offsets are worked out up front from the count action.  If the
+        count was stale and the last page is full, the remaining pages are
+        fetched one at a time.
+
+        Args:
+            action (str): a list action, eg ip_address_list
+            params (dict): Parameters to pass to API
+
+        Returns:
+            list: all records, in offset order
+        """
+        total = await self.count_records(action, params)
+        self.job.log_debug(f"Expecting {total} records from {action}")
+        offsets = list(range(0, max(total, 1), LIMIT))
+        pages = await asyncio.gather(
+            *(self._fetch_page(action, params, offset) for offset in offsets)
+        )
+        records = [record for page in pages for record in page]
+        offset, last_page = offsets[-1], pages[-1]
+        while len(last_page) >= LIMIT:
+            offset += LIMIT
+            self.job.log_debug(f"count was stale, fetching {action} {offset}")
+            last_page = await self._fetch_page(action, params, offset)
+            records.extend(last_page)
+        self.job.log_debug(f"done iterating {action}, {len(records)} records found")
+        return records
+
+    def _action_params(
+        self,
+        actions: list[str],
+        params: dict[str, Any],
+        fields: Iterable[str] | None = None,
+        where: dict[str, str] | None = None,
+    ) -> dict[str, dict[str, Any]]:
+        """the projected parameters of each list action.  where optionally
+        maps actions to their own WHERE clause."""
+        action_params = {
+            action: self._project(action, params, fields) for action in actions
+        }
+        for action, where_clause in (where or {}).items():
+            action_params[action]["WHERE"] = where_clause
+        return action_params
+
+    async def _iter_actions(
+        self,
+        actions: list[str],
+        params: dict[str, Any],
+        fields: Iterable[str] | None = None,
+        where: dict[str, str] | None = None,
+    ) -> AsyncIterator[list[Any]]:
+        """Fetch the pages of one list action after another, see _iter_pages.
+        where optionally maps actions to their own WHERE clause."""
+        action_params = self._action_params(actions, params, fields, where)
+        for action in actions:
+            self.job.log_info(f"starting to process {action}")
+            async for page in self._iter_pages(action, action_params[action]):
+                yield page
+
+    async def _fetch_actions(
+        self,
+        actions: list[str],
+        params: dict[str, Any],
+        fields: Iterable[str] | None = None,
+        where: dict[str, str] | None = None,
+    ) -> list[Any]:
+        """Fetch every page of several list actions, all at once, in action
+        order.  where optionally maps actions to their own WHERE clause."""
+        action_params = self._action_params(actions, params, fields, where)
+        results = await asyncio.gather(
+            *(self._fetch_all(action, action_params[action]) for action in actions)
+        )
+        return [record for result in results for record in result]
+
+    async def get_all_addresses(self, fields: Iterable[str] | None = None) -> list[Any]:
+        """get addresses from solidserver (by version and batched)
+
+        Args:
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            list: a list of all address resources
+        """
+        addrs = await self._fetch_actions(
+            ["ip_address_list", "ip6_address6_list"], {"limit": LIMIT}, fields
+        )
+        self.job.log_debug(f"total addr count for all addresses is {len(addrs)}")
+        return addrs
+
+    def iter_all_addresses(
+        self, fields: Iterable[str] | None = None
+    ) -> AsyncIterator[list[Any]]:
+        """Stream pages of all addresses, IPv4 then IPv6
+
+        Args:
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            AsyncIterator: pages of address records
+        """
+        return self._iter_actions(
+            ["ip_address_list", "ip6_address6_list"], {"limit": LIMIT}, fields
+        )
+
+    async def get_all_prefixes(self, fields: Iterable[str] | None = None) -> list[Any]:
+        """Get all IP prefixes from solidserver
+
+        Args:
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            list: a list of all prefix resources
+        """
+        prefixes = await self._fetch_actions(
+            ["ip_block_subnet_list", "ip6_block6_subnet6_list"],
+            {"LIMIT": LIMIT},
+            fields,
+        )
+        self.job.log_debug(f"total count for all prefixes is {len(prefixes)}")
+        return prefixes
+
+    def iter_all_prefixes(
+        self, fields: Iterable[str] | None = None
+    ) -> AsyncIterator[list[Any]]:
+        """Stream pages of all IP prefixes, IPv4 then IPv6
+
+        Args:
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            AsyncIterator: pages of prefix records
+        """
+        return self._iter_actions(
+            ["ip_block_subnet_list", "ip6_block6_subnet6_list"],
+            {"LIMIT": LIMIT},
+            fields,
+        )
+
+    def _modified_since_where(
+        self, actions: list[str], since: datetime
+    ) -> dict[str, str]:
+        """WHERE clauses selecting records of each action modified since a time,
+        using the modified_columns attribute or MODIFIED_TIME_COLUMNS"""
+        return ssutils.generate_modified_since_wheres(
+            actions, since, self.__attributes.get("modified_columns")
+        )
+
+    async def _check_modified_column(self, action: str) -> str | None:
+        """fetch a record of a list action and check its modification time
+        column, see ssutils.check_modified_time_column"""
+        column = ssutils.modified_time_column(
+            action, self.__attributes.get("modified_columns")
+        )
+        params = self._project(action, {"limit": 1}, [column])
+        try:
+            records = await self.generic_api_action(action, "get", params)
+        except SolidServerBaseError as ss_err:
+            return f"{action} could not be read with {column}: {ss_err}"
+        return ssutils.check_modified_time_column(action, column, records)
+
+    async def check_modified_columns(
+        self, actions: Iterable[str] = tuple(MODIFIED_TIME_COLUMNS)
+    ) -> list[str]:
+        """Fetch a record of each list action and check that its modification
+        time column holds a unix timestamp, before trusting incremental queries
+
+        Args:
+            actions (iterable, optional): list actions to check. Defaults to
+              every action in MODIFIED_TIME_COLUMNS.
+
+        Returns:
+            list: the problems found, empty if incremental queries can be used
+        """
+        problems = await asyncio.gather(
+            *(self._check_modified_column(action) for action in actions)
+        )
+        return [problem for problem in problems if problem]
+
+    async def get_addresses_modified_since(
+        self, since: datetime, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """Get addresses modified since a time, for incremental syncs
+
+        Args:
+            since (datetime): the earliest modification time to return
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            list: a list of address resources
+        """
+        actions = ["ip_address_list", "ip6_address6_list"]
+        where = self._modified_since_where(actions, since)
+        self.job.log_debug(f"WHERE clauses are {where}")
+        return await self._fetch_actions(actions, {"limit": LIMIT}, fields, where)
+
+    def iter_addresses_modified_since(
+        self, since: datetime, fields: Iterable[str] | None = None
+    ) -> AsyncIterator[list[Any]]:
+        """Stream pages of addresses modified since a time, IPv4 then IPv6
+
+        Args:
+            since (datetime): the earliest modification time to return
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            AsyncIterator: pages of address records
+        """
+        actions = ["ip_address_list", "ip6_address6_list"]
+        where = self._modified_since_where(actions, since)
+        self.job.log_debug(f"WHERE clauses are {where}")
+        return self._iter_actions(actions, {"limit": LIMIT}, fields, where)
+
+    async def get_prefixes_modified_since(
+        self, since: datetime, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """Get prefixes modified since a time, for incremental syncs
+
+        Args:
+            since (datetime): the earliest modification time to return
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            list: a list of prefix resources
+        """
+        actions = ["ip_block_subnet_list", "ip6_block6_subnet6_list"]
+        where = self._modified_since_where(actions, since)
+        self.job.log_debug(f"WHERE clauses are {where}")
+        return await self._fetch_actions(actions, {"LIMIT": LIMIT}, fields, where)
+
+    def iter_prefixes_modified_since(
+        self, since: datetime, fields: Iterable[str] | None = None
+    ) -> AsyncIterator[list[Any]]:
+        """Stream pages of prefixes modified since a time, IPv4 then IPv6
+
+        Args:
+            since (datetime): the earliest modification time to return
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            AsyncIterator: pages of prefix records
+        """
+        actions = ["ip_block_subnet_list", "ip6_block6_subnet6_list"]
+        where = self._modified_since_where(actions, since)
+        self.job.log_debug(f"WHERE clauses are {where}")
+        return self._iter_actions(actions, {"LIMIT": LIMIT}, fields, where)
+
+    @staticmethod
+    def _name_where(domain_name: str) -> dict[str, str]:
+        """the WHERE clause of each address list action for a domain name"""
+        return {
+            "ip_address_list": f"name LIKE '%.{domain_name}'",
+            "ip6_address6_list": f"ip6_name LIKE '%.{domain_name}'",
+        }
+
+    async def get_solidserver_batch(
+        self, domain_name: str, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """Run a query for all addresses matching a single domain name
+
+        Args:
+            domain_name (str): a domain name
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            list: a list of solidserver records
+        """
+        where = self._name_where(domain_name)
+        self.job.log_info(f"starting to process addresses for {domain_name}")
+        return await self._fetch_actions(list(where), {"limit": LIMIT}, fields, where)
+
+    def iter_solidserver_batch(
+        self, domain_name: str, fields: Iterable[str] | None = None
+    ) -> AsyncIterator[list[Any]]:
+        """Stream pages of addresses matching a single domain name
+
+        Args:
+            domain_name (str): a domain name
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            AsyncIterator: pages of solidserver records
+        """
+        where = self._name_where(domain_name)
+        return self._iter_actions(list(where), {"limit": LIMIT}, fields, where)
+
+    async def get_addresses_by_name(
+        self, domain_list: list[str], fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """Query each domain in a list, all domains at once
+
+        Args:
+            domain_list (list): list of domain filters
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            list: a list of solidserver records, in domain_list order
+        """
+        results = await asyncio.gather(
+            *(
+                self.get_solidserver_batch(f"{each_domain}", fields)
+                for each_domain in domain_list
+            )
+        )
+        return [record for result in results for record in result]
+
+    async def iter_addresses_by_name(
+        self, domain_list: list[str], fields: Iterable[str] | None = None
+    ) -> AsyncIterator[list[Any]]:
+        """Stream pages of addresses matching each domain in a list, one domain
+        after another
+
+        Args:
+            domain_list (list): list of domain filters
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Yields:
+            list: a page of solidserver records
+        """
+        for each_domain in domain_list:
+            async for page in self.iter_solidserver_batch(f"{each_domain}", fields):
+                yield page
+
+    @staticmethod
+    def _addresses_in(addresses: list[Any], cidr: netaddr.IPNetwork) -> list[Any]:
+        """the address records inside a CIDR"""
+        contained = vectorized.CidrSet([cidr]).contains_addresses(addresses)
+        return [
+            each
+            for each, inside in zip(addresses, contained)
+            if inside or (inside is None and each.get("hostaddr") in cidr)
+        ]
+
+    async def get_addresses_by_network(
+        self, cidr: netaddr.IPNetwork, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """Run queries for each address in a CIDR
+
+        Args:
+            cidr (netaddr.IPNetwork): a cidr
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            list: a list of address records
+        """
+        return [
+            record
+            async for page in self.iter_addresses_by_network(cidr, fields)
+            for record in page
+        ]
+
+    async def iter_addresses_by_network(
+        self, cidr: netaddr.IPNetwork, fields: Iterable[str] | None = None
+    ) -> AsyncIterator[list[Any]]:
+        """Stream pages of the addresses in a CIDR
+
+        Args:
+            cidr (netaddr.IPNetwork): a cidr
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Yields:
+            list: a page of address records
+        """
+        if cidr.version == 4:
+            action = "ip_address_list"
+            query_str = ssutils.generate_ip4_where_clause(cidr)
+        else:
+            action = "ip6_address6_list"
+            query_str = ssutils.generate_ip6_where_clause(cidr)
+        self.job.log_debug(f"fetching Solidserver address for {query_str}")
+        params = self._project(action, {"LIMIT": LIMIT, "WHERE": query_str}, fields)
+        async for page in self._iter_pages(action, params):
+            yield self._addresses_in(page, cidr)
+
+    def _prefixes_in(
+        self, prefixes: list[Any], filter_cidr: netaddr.IPNetwork
+    ) -> list[Any]:
+        """the prefix records that are subnets of a CIDR"""
+        filtered_prefixes = []
+        contained = vectorized.CidrSet([filter_cidr]).contains_prefixes(prefixes)
+        for each_prefix, inside in zip(prefixes, contained):
+            if inside is None:
+                try:
+                    network = ssutils.prefix_to_net(each_prefix)
+                except (ValueError, AddrFormatError):
+                    name = each_prefix.get("subnet_name") or each_prefix.get(
+                        "subnet6_name", ""
+                    )
+                    self.job.log_debug(f"netaddr couldn't convert {name} to a network")
+                    continue
+                inside = network in filter_cidr
+            if inside:
+                filtered_prefixes.append(each_prefix)
+        return filtered_prefixes
+
+    async def get_prefixes_by_network(
+        self, cidr: str, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """Get the prefixes that are subnets of a CIDR
+
+        Args:
+            cidr (str): A CIDR
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            List: a list of prefixes that are subnets of the CIDR
+        """
+        return [
+            record
+            async for page in self.iter_prefixes_by_network(cidr, fields)
+            for record in page
+        ]
+
+    async def iter_prefixes_by_network(
+        self, cidr: str, fields: Iterable[str] | None = None
+    ) -> AsyncIterator[list[Any]]:
+        """Stream pages of the prefixes that are subnets of a CIDR
+
+        Args:
+            cidr (str): A CIDR
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Yields:
+            list: a page of prefixes that are subnets of the CIDR
+        """
+        filter_cidr = netaddr.IPNetwork(cidr)
+        if filter_cidr.version == 4:
+            action = "ip_block_subnet_list"
+            query = ssutils.get_ip4_subnet_start_and_end_hexes_query(filter_cidr)
+        else:
+            action = "ip6_block6_subnet6_list"
+            query = ssutils.get_ip6_subnet_start_and_end_hexes_query(filter_cidr)
+        params = self._project(action, {"LIMIT": LIMIT, "WHERE": query}, fields)
+        initial_count = filtered_count = 0
+        async for page in self._iter_pages(action, params):
+            initial_count += len(page)
+            filtered_page = self._prefixes_in(page, filter_cidr)
+            filtered_count += len(filtered_page)
+            yield filtered_page
+        self.job.log(f"initial result has {initial_count} prefixes")
+        self.job.log(message=f"filtered result has {filtered_count} prefixes")
+
+    async def get_prefixes_enclosing(
+        self, cidr: str | netaddr.IPNetwork, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """Get the prefixes that contain a CIDR, the CIDR itself included
+
+        Args:
+            cidr (str, netaddr.IPNetwork): A CIDR
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            list: a list of prefix resources
+        """
+        return [
+            record
+            async for page in self.iter_prefixes_enclosing(cidr, fields)
+            for record in page
+        ]
+
+    async def iter_prefixes_enclosing(
+        self, cidr: str | netaddr.IPNetwork, fields: Iterable[str] | None = None
+    ) -> AsyncIterator[list[Any]]:
+        """Stream pages of the prefixes that contain a CIDR, the CIDR itself
+        included
+
+        Args:
+            cidr (str, netaddr.IPNetwork): A CIDR
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Yields:
+            list: a page of prefix resources
+        """
+        filter_cidr = netaddr.IPNetwork(cidr)
+        if filter_cidr.version == 4:
+            action = "ip_block_subnet_list"
+            query = ssutils.get_ip4_enclosing_subnets_query(filter_cidr)
+        else:
+            action = "ip6_block6_subnet6_list"
+            query = ssutils.get_ip6_enclosing_subnets_query(filter_cidr)
+        params = self._project(action, {"LIMIT": LIMIT, "WHERE": query}, fields)
+        async for page in self._iter_pages(action, params):
+            yield [each for each in page if ssutils.encloses(each, filter_cidr)]
+
+    async def get_prefixes_by_id(
+        self,
+        subnet_list: list[str],
+        address_filter: str | netaddr.IPNetwork | None = None,
+        fields: Iterable[str] | None = None,
+        subnet6_list: list[str] | None = None,
+    ) -> list[Any]:
+        """take lists of unique ids, fetch them from solidserver in batches
+        using "IN" where clauses, all batches at once
+
+        Args:
+            subnet_list (list): a list of IPv4 subnet IDs
+            address_filter (str, netaddr.IPNetwork, optional): a CIDR (or
+              string representation of a CIDR) the prefixes must be in.
+              Defaults to None, no filter.
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+            subnet6_list (list, optional): a list of IPv6 subnet IDs.
+              Defaults to None.
+
+        Returns:
+            list: a list of prefix resources
+        """
+        parent = None
+        if isinstance(address_filter, str) and address_filter:
+            parent = netaddr.IPNetwork(address_filter)
+        elif isinstance(address_filter, netaddr.IPNetwork):
+            parent = address_filter
+        elif address_filter:
+            self.job.log_warning(
+                f"address filter {address_filter} is not a string or netaddr object"
+            )
+            return []
+        batches = await asyncio.gather(
+            *(
+                self.generic_api_action(
+                    api_action,
+                    "get",
+                    self._project(
+                        api_action, {"LIMIT": LIMIT, "WHERE": where_clause}, fields
+                    ),
+                )
+                for api_action, where_clause in ssutils.generate_prefix_id_queries(
+                    subnet_list, subnet6_list, parent
+                )
+            )
+        )
+        prefixes = [each_prefix for batch in batches for each_prefix in batch]
+        if parent is None:
+            return prefixes
+        contained = vectorized.CidrSet([parent]).contains_prefixes(prefixes)
+        return [
+            each_prefix
+            for each_prefix, inside in zip(prefixes, contained)
+            if inside
+            or (inside is None and ssutils.prefix_to_net(each_prefix) in parent)
+        ]
+
+
+class SolidServerAsyncFacade:
+    """Blocking facade over AsyncSolidServerAPI
+
+    Offers the query methods of SolidServerAPI, including the iter_* methods
+    used by the adapters, by running the async client on a private event loop.
+    The get_* methods fetch every page concurrently before returning.  The
+    iter_* methods stream, running the loop until the next page arrives while
+    up to max_workers further pages are fetched ahead.
+    """
+
+    def __init__(self, job: Job, **kwargs) -> None:
+        self.api = AsyncSolidServerAPI(job, **kwargs)
+        self.job = self.api.job
+        self._loop = asyncio.new_event_loop()
+        self._streams: set[AsyncIterator[list[Any]]] = set()
+
+    def _run(self, coro: Awaitable[T]) -> T:
+        """run a coroutine to completion on the private event loop"""
+        return self._loop.run_until_complete(coro)
+
+    def _stream(self, pages: AsyncIterator[list[Any]]) -> Iterator[Any]:
+        """yield the records of an async page iterator, running the event loop
+        a page at a time.  Closing the generator early cancels the pages
+        still in flight."""
+        self._streams.add(pages)
+        try:
+            while True:
+                try:
+                    page = self._run(pages.__anext__())
+                except StopAsyncIteration:
+                    return
+                yield from page
+        finally:
+            self._streams.discard(pages)
+            if not self._loop.is_closed():
+                self._run(pages.aclose())
+
+    @property
+    def timer(self) -> timing.PhaseTimer:
+        """request and decode timings"""
+        return self.api.timer
+
+    @property
+    def bytes_received(self) -> Counter[str]:
+        """bytes received per api action"""
+        return self.api.bytes_received
+
+    @property
+    def rows_received(self) -> Counter[str]:
+        """rows received per list action"""
+        return self.api.rows_received
+
+    def retry_summary(self) -> str:
+        """summarize request retry statistics for the job log"""
+        return self.api.retry_summary()
+
+    def limiter_summary(self) -> str:
+        """summarize request limiter statistics for the job log"""
+        return self.api.limiter_summary()
+
+    def close(self) -> None:
+        """close any unfinished iter_* streams, the aiohttp session and the
+        event loop, safe to call twice"""
+        if self._loop.is_closed():
+            return
+        try:
+            while self._streams:
+                self._run(self._streams.pop().aclose())
+            self._run(self.api.close())
+        finally:
+            self._loop.close()
+
+    def set_attr(self, **kwargs) -> None:
+        """set arbitrary attribute"""
+        self.api.set_attr(**kwargs)
+
+    def get_attr(self, arg: Any) -> Any | None:
+        """get any one attribute, return value"""
+        return self.api.get_attr(arg)
+
+    def generic_api_action(
+        self,
+        api_action: str,
+        http_action: str = "get",
+        params: dict[str, Any] | None = None,
+        data=None,
+    ) -> list[Any] | Any:
+        """Generic API action, returns json response"""
+        return self._run(
+            self.api.generic_api_action(api_action, http_action, params, data)
+        )
+
+    def get_all_addresses(self, fields: Iterable[str] | None = None) -> list[Any]:
+        """get addresses from solidserver"""
+        return self._run(self.api.get_all_addresses(fields))
+
+    def iter_all_addresses(self, fields: Iterable[str] | None = None) -> Iterator[Any]:
+        """iterate over addresses from solidserver"""
+        yield from self._stream(self.api.iter_all_addresses(fields))
+
+    def get_all_prefixes(self, fields: Iterable[str] | None = None) -> list[Any]:
+        """get prefixes from solidserver"""
+        return self._run(self.api.get_all_prefixes(fields))
+
+    def iter_all_prefixes(self, fields: Iterable[str] | None = None) -> Iterator[Any]:
+        """iterate over prefixes from solidserver"""
+        yield from self._stream(self.api.iter_all_prefixes(fields))
+
+    def check_modified_columns(
+        self, actions: Iterable[str] = tuple(MODIFIED_TIME_COLUMNS)
+    ) -> list[str]:
+        """check the modification time columns used by incremental queries"""
+        return self._run(self.api.check_modified_columns(actions))
+
+    def get_addresses_modified_since(
+        self, since: datetime, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """get addresses modified since a time"""
+        return self._run(self.api.get_addresses_modified_since(since, fields))
+
+    def iter_addresses_modified_since(
+        self, since: datetime, fields: Iterable[str] | None = None
+    ) -> Iterator[Any]:
+        """iterate over addresses modified since a time"""
+        yield from self._stream(self.api.iter_addresses_modified_since(since, fields))
+
+    def get_prefixes_modified_since(
+        self, since: datetime, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """get prefixes modified since a time"""
+        return self._run(self.api.get_prefixes_modified_since(since, fields))
+
+    def iter_prefixes_modified_since(
+        self, since: datetime, fields: Iterable[str] | None = None
+    ) -> Iterator[Any]:
+        """iterate over prefixes modified since a time"""
+        yield from self._stream(self.api.iter_prefixes_modified_since(since, fields))
+
+    def get_solidserver_batch(
+        self, domain_name: str, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """get addresses matching a single domain name"""
+        return self._run(self.api.get_solidserver_batch(domain_name, fields))
+
+    def iter_solidserver_batch(
+        self, domain_name: str, fields: Iterable[str] | None = None
+    ) -> Iterator[Any]:
+        """iterate over addresses matching a single domain name"""
+        yield from self._stream(self.api.iter_solidserver_batch(domain_name, fields))
+
+    def get_addresses_by_name(
+        self, domain_list: list[str], fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """get addresses matching any domain in a list"""
+        return self._run(self.api.get_addresses_by_name(domain_list, fields))
+
+    def iter_addresses_by_name(
+        self, domain_list: list[str], fields: Iterable[str] | None = None
+    ) -> Iterator[Any]:
+        """iterate over addresses matching any domain in a list"""
+        yield from self._stream(self.api.iter_addresses_by_name(domain_list, fields))
+
+    def get_addresses_by_network(
+        self, cidr: netaddr.IPNetwork, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """get addresses in a CIDR"""
+        return self._run(self.api.get_addresses_by_network(cidr, fields))
+
+    def iter_addresses_by_network(
+        self, cidr: netaddr.IPNetwork, fields: Iterable[str] | None = None
+    ) -> Iterator[Any]:
+        """iterate over addresses in a CIDR"""
+        yield from self._stream(self.api.iter_addresses_by_network(cidr, fields))
+
+    def get_prefixes_by_network(
+        self, cidr: str, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """get prefixes that are subnets of a CIDR"""
+        return self._run(self.api.get_prefixes_by_network(cidr, fields))
+
+    def iter_prefixes_by_network(
+        self, cidr: str, fields: Iterable[str] | None = None
+    ) -> Iterator[Any]:
+        """iterate over prefixes that are subnets of a CIDR"""
+        yield from self._stream(self.api.iter_prefixes_by_network(cidr, fields))
+
+    def get_prefixes_enclosing(
+        self, cidr: str | netaddr.IPNetwork, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """get prefixes that contain a CIDR"""
+        return self._run(self.api.get_prefixes_enclosing(cidr, fields))
+
+    def iter_prefixes_enclosing(
+        self, cidr: str | netaddr.IPNetwork, fields: Iterable[str] | None = None
+    ) -> Iterator[Any]:
+        """iterate over prefixes that contain a CIDR"""
+        yield from self._stream(self.api.iter_prefixes_enclosing(cidr, fields))
+
+    def get_prefixes_by_id(
+        self,
+        subnet_list: list[str],
+        address_filter: str | netaddr.IPNetwork | None = None,
+        fields: Iterable[str] | None = None,
+        subnet6_list: list[str] | None = None,
+    ) -> list[Any]:
+        """get prefixes by IPv4 and IPv6 subnet id"""
+        return self._run(
+            self.api.get_prefixes_by_id(
+                subnet_list, address_filter, fields, subnet6_list
+            )
+        )
@@ -0,0 +1,470 @@
+"""Apply a diff to Nautobot for the SSoT plugin for EIP Solidserver
+
+DiffApplier writes the changes in a diff to Nautobot in chunks, each chunk in
+its own savepoint, and records a checkpoint on the SyncRun of the sync after
+every chunk so that an interrupted sync can be resumed.  The changes are
+planned from the diff dict stored on the Sync, in a fixed order, so a resumed
+run applies exactly the changes that were left.
+
+Nautobot 1.x runs the whole job in one transaction, so the chunks and the
+checkpoint are only committed when the job returns.  A soft time limit during
+the apply rolls back the current chunk, the job catches it and returns, and
+the earlier chunks and their checkpoint are committed.  A hard time limit or a
+killed worker rolls back every chunk and the checkpoint, leaving nothing to
+resume.
+
+The job uses it for bulk syncs and to resume an interrupted sync, other syncs
+go through DiffSync's sync_to().  Changes are written one object at a time
+with validated_save(), or in bulk with bulk_create(), bulk_update() and
+batched deletes.  Bulk writes skip save(), full_clean() and change logging.
+Either way the SSoT sync log is written in bulk.
+"""
+import functools
+import itertools
+import operator
+from collections import Counter
+from typing import Any, Iterable, NamedTuple
+
+from django.core.exceptions import ValidationError  # type: ignore
+from django.db import DatabaseError, transaction  # type: ignore
+from django.db.models import Q  # type: ignore
+from nautobot.extras.jobs import Job  # type: ignore
+from nautobot.extras.models import CustomField, Status  # type: ignore
+from nautobot.ipam.models import IPAddress, Prefix  # type: ignore
+from nautobot_ssot.choices import (  # type: ignore
+    SyncLogEntryActionChoices,
+    SyncLogEntryStatusChoices,
+)
+from nautobot_ssot.models import Sync, SyncLogEntry  # type: ignore
+
+from nautobot_plugin_ssot_eip_solidserver.constants import (
+    BULK_BATCH_SIZE,
+    COMMIT_CHUNK_SIZE,
+)
+from nautobot_plugin_ssot_eip_solidserver.diffsync.models.base import (
+    SSoTIPAddress,
+    SSoTIPPrefix,
+)
+from nautobot_plugin_ssot_eip_solidserver.models import SyncRun
+from nautobot_plugin_ssot_eip_solidserver.utils import ssutils
+
+# prefixes first, so addresses are written after their parents
+APPLY_ORDER = ("prefix", "ipaddress")
+ACTIONS = ("create", "update", "delete")
+MODELS = {"ipaddress": IPAddress, "prefix": Prefix}
+IDENTIFIERS = {
+    "ipaddress": SSoTIPAddress._identifiers,
+    "prefix": SSoTIPPrefix._identifiers,
+}
+LOG_ACTIONS = {
+    "create": SyncLogEntryActionChoices.ACTION_CREATE,
+    "update": SyncLogEntryActionChoices.ACTION_UPDATE,
+    "delete": SyncLogEntryActionChoices.ACTION_DELETE,
+}
+
+
+class Change(NamedTuple):
+    """One change from a diff"""
+
+    model_type: str
+    action: str
+    name: str
+    keys: dict[str, Any]
+    diffs: dict[str, dict[str, Any]]
+
+
+def plan_changes(diff_dict: dict[str, Any]) -> list[Change]:
+    """list the changes in a diff dict in the order they are applied: by
+    APPLY_ORDER, then create, update, delete, then by name.  The order does not
+    depend on the dict order, which a database JSON field may not keep.
+
+    Args:
+        diff_dict (dict): a diff in the form returned by Diff.dict()
+
+    Returns:
+        list: the changes
+    """
+    changes = []
+    for model_type in APPLY_ORDER:
+        by_action: dict[str, list[Change]] = {action: [] for action in ACTIONS}
+        elements = diff_dict.get(model_type) or {}
+        for name in sorted(elements):
+            diffs = elements[name]
+            if "+" in diffs and "-" in diffs:
+                action = "update"
+            elif "+" in diffs:
+                action = "create"
+            elif "-" in diffs:
+                action = "delete"
+            else:
+                continue
+            keys = dict(zip(IDENTIFIERS[model_type], name.split("__")))
+            by_action[action].append(Change(model_type, action, name, keys, diffs))
+        for action in ACTIONS:
+            changes.extend(by_action[action])
+    return changes
+
+
+class DiffApplier:
+    """Apply planned changes to Nautobot.
+
+    Each batch of objects is written in its own savepoint.  If a bulk write
+    fails, the batch is retried one object at a time so one bad row only
+    fails itself.
+    """
+
+    def __init__(
+        self,
+        job: Job,
+        sync: Sync,
+        bulk: bool = False,
+        batch_size: int = BULK_BATCH_SIZE,
+    ) -> None:
+        self.job = job
+        self.sync = sync
+        self.bulk = bulk
+        self.batch_size = max(1, int(batch_size))
+        self.stats: Counter[str] = Counter()
+        self._statuses: dict[str, Status] = {}
+        self._custom_fields: dict[str, dict[str, CustomField]] = {}
+        self._log_entries: list[SyncLogEntry] = []
+        address_fields = {field.name for field in IPAddress._meta.concrete_fields}
+        # fields changed when an address prefix length changes
+        self._address_fields = {"prefix_length", "broadcast"} & address_fields
+
+    def _get_status(self, name: str) -> Status:
+        """look up a status by name, once per run"""
+        if name not in self._statuses:
+            self._statuses[name] = Status.objects.get(name=name)
+        return self._statuses[name]
+
+    def _get_custom_fields(self, model_type: str) -> dict[str, CustomField]:
+        """look up the custom fields of a model, once per run, by their key in
+        _custom_field_data: the slug from Nautobot 1.4 and the name before"""
+        if model_type not in self._custom_fields:
+            self._custom_fields[model_type] = {
+                getattr(field, "slug", None) or field.name: field
+                for field in CustomField.objects.get_for_model(MODELS[model_type])
+            }
+        return self._custom_fields[model_type]
+
+    def _set_attrs(self, obj: Any, attrs: dict[str, Any]) -> set[str]:
+        """copy diffsync attributes onto an ORM object
+
+        Args:
+            obj (IPAddress | Prefix): the object to change
+            attrs (dict): diffsync attribute names and values
+
+        Returns:
+            set: the database fields changed
+        """
+        fields = set()
+        for name, value in attrs.items():
+            if name == "status__name":
+                obj.status = self._get_status(value)
+                fields.add("status")
+            elif name == "solidserver_addr_id":
+                obj._custom_field_data["solidserver_addr_id"] = value
+                fields.add("_custom_field_data")
+            elif name == "prefix_length" and isinstance(obj, IPAddress):
+                obj.address = f"{obj.host}/{value}"
+                fields.update(self._address_fields)
+            else:
+                setattr(obj, name, value)
+                fields.add(name)
+        return fields
+
+    def _new_object(self, change: Change) -> Any:
+        """build an unsaved ORM object from a create.  Custom fields start at
+        their defaults, as they would through validated_save(), and missing
+        required ones are reported here, since bulk_create() skips full_clean().
+        """
+        attrs = dict(change.diffs["+"])
+        if change.model_type == "ipaddress":
+            prefix_length = attrs.pop("prefix_length")
+            obj = IPAddress(address=f"{change.keys['host']}/{prefix_length}")
+        else:
+            obj = Prefix(
+                prefix=f"{change.keys['network']}/{change.keys['prefix_length']}"
+            )
+        custom_fields = self._get_custom_fields(change.model_type)
+        obj._custom_field_data = {
+            key: field.default for key, field in custom_fields.items()
+        }
+        self._set_attrs(obj, attrs)
+        missing = [
+            key
+            for key, field in custom_fields.items()
+            if field.required and obj._custom_field_data.get(key) in (None, "")
+        ]
+        if missing:
+            raise ValidationError(f"Missing required custom fields {missing}")
+        return obj
+
+    @staticmethod
+    def _object_key(model_type: str, obj: Any) -> tuple[Any, ...]:
+        """the diffsync identifiers of an ORM object"""
+        if model_type == "ipaddress":
+            return (str(obj.host),)
+        return (str(obj.network), int(obj.prefix_length))
+
+    @staticmethod
+    def _change_key(change: Change) -> tuple[Any, ...]:
+        """the diffsync identifiers of a change"""
+        if change.model_type == "ipaddress":
+            return (str(change.keys["host"]),)
+        return (str(change.keys["network"]), int(change.keys["prefix_length"]))
+
+    def _existing(
+        self, model_type: str, changes: list[Change]
+    ) -> dict[tuple[Any, ...], Any]:
+        """fetch the ORM objects for a batch of changes in one query"""
+        if model_type == "ipaddress":
+            query = Q(host__in=[change.keys["host"] for change in changes])
+        else:
+            query = functools.reduce(
+                operator.or_,
+                (
+                    Q(
+                        network=change.keys["network"],
+                        prefix_length=change.keys["prefix_length"],
+                    )
+                    for change in changes
+                ),
+            )
+        return {
+            self._object_key(model_type, obj): obj
+            for obj in MODELS[model_type].objects.filter(query)
+        }
+
+    def _log(
+        self,
+        change: Change,
+        obj: Any = None,
+        message: str = "",
+        failed: bool = False,
+    ) -> None:
+        """queue a sync log entry and count the outcome.  Only objects that
+        were saved are linked, a failed create was never written."""
+        status = SyncLogEntryStatusChoices.STATUS_SUCCESS
+        if failed:
+            status = SyncLogEntryStatusChoices.STATUS_FAILURE
+            self.stats[f"{change.action}_failed"] += 1
+        else:
+            self.stats[change.action] += 1
+        self._log_entries.append(
+            SyncLogEntry(
+                sync=self.sync,
+                action=LOG_ACTIONS[change.action],
+                status=status,
+                diff=change.diffs,
+                synced_object=(
+                    obj if change.action != "delete" and not failed else None
+                ),
+                object_repr=str(obj) if obj is not None else change.name,
+                message=message,
+            )
+        )
+
+    def flush_log(self) -> None:
+        """write queued sync log entries"""
+        if self._log_entries:
+            SyncLogEntry.objects.bulk_create(
+                self._log_entries, batch_size=self.batch_size
+            )
+            self._log_entries = []
+
+    def _save_one_by_one(self, pairs: Iterable[tuple[Change, Any]]) -> None:
+        """validate and save objects individually"""
+        for change, obj in pairs:
+            try:
+                with transaction.atomic():
+                    obj.validated_save()
+            except (DatabaseError, ValidationError) as err:
+                self._log(change, obj, f"{err}", failed=True)
+            else:
+                self._log(change, obj)
+
+    def _create(self, model_type: str, changes: list[Change]) -> None:
+        """create a batch of objects"""
+        pairs = []
+        for change in changes:
+            try:
+                pairs.append((change, self._new_object(change)))
+            except (Status.DoesNotExist, KeyError, ValueError, ValidationError) as err:
+                self._log(change, message=f"{err}", failed=True)
+        if not pairs:
+            return
+        if not self.bulk:
+            self._save_one_by_one(pairs)
+            return
+        try:
+            with transaction.atomic():
+                MODELS[model_type].objects.bulk_create([obj for _, obj in pairs])
+        except (DatabaseError, ValidationError) as err:
+            self.job.log_warning(
+                f"Bulk create of {len(pairs)} {model_type} failed, saving one at a"
+                f" time. {err}"
+            )
+            self._save_one_by_one(pairs)
+            return
+        for change, obj in pairs:
+            self._log(change, obj)
+
+    def _update(self, model_type: str, changes: list[Change]) -> None:
+        """update a batch of objects"""
+        existing = self._existing(model_type, changes)
+        pairs = []
+        fields: set[str] = set()
+        for change in changes:
+            obj = existing.get(self._change_key(change))
+            if obj is None:
+                self._log(change, message="Object not found", failed=True)
+                continue
+            try:
+                fields |= self._set_attrs(obj, change.diffs.get("+", {}))
+            except Status.DoesNotExist as err:
+                self._log(change, obj, f"{err}", failed=True)
+                continue
+            pairs.append((change, obj))
+        if not pairs or not fields:
+            return
+        if not self.bulk:
+            self._save_one_by_one(pairs)
+            return
+        try:
+            with transaction.atomic():
+                MODELS[model_type].objects.bulk_update(
+                    [obj for _, obj in pairs], sorted(fields)
+                )
+        except (DatabaseError, ValidationError) as err:
+            self.job.log_warning(
+                f"Bulk update of {len(pairs)} {model_type} failed, saving one at a"
+                f" time. {err}"
+            )
+            self._save_one_by_one(pairs)
+            return
+        for change, obj in pairs:
+            self._log(change, obj)
+
+    def _delete(self, model_type: str, changes: list[Change]) -> None:
+        """delete a batch of objects"""
+        existing = self._existing(model_type, changes)
+        pairs = []
+        for change in changes:
+            obj = existing.get(self._change_key(change))
+            if obj is None:
+                self._log(change, message="Object not found", failed=True)
+                continue
+            pairs.append((change, obj))
+        if not pairs:
+            return
+        if not self.bulk:
+            for change, obj in pairs:
+                try:
+                    with transaction.atomic():
+                        obj.delete()
+                except DatabaseError as err:
+                    self._log(change, obj, f"{err}", failed=True)
+                else:
+                    self._log(change, obj)
+            return
+        try:
+            with transaction.atomic():
+                MODELS[model_type].objects.filter(
+                    pk__in=[obj.pk for _, obj in pairs]
+                ).delete()
+        except DatabaseError as err:
+            for change, obj in pairs:
+                self._log(change, obj, f"{err}", failed=True)
+            return
+        for change, obj in pairs:
+            self._log(change, obj)
+
+    def apply_changes(self, changes: list[Change]) -> None:
+        """apply changes in batches of the same model and action, then write
+        their sync log entries
+
+        Args:
+            changes (list): changes, in plan_changes() order
+        """
+        groups = itertools.groupby(
+            changes, key=lambda change: (change.model_type, change.action)
+        )
+        for (model_type, action), group in groups:
+            for batch in ssutils.batched(list(group), self.batch_size):
+                if action == "create":
+                    self._create(model_type, batch)
+                elif action == "update":
+                    self._update(model_type, batch)
+                elif action == "delete":
+                    self._delete(model_type, batch)
+        self.flush_log()
+
+    def _save_checkpoint(self, checkpoint: dict[str, Any]) -> None:
+        """record progress on the SyncRun of the sync"""
+        SyncRun.objects.update_or_create(
+            sync=self.sync, defaults={"checkpoint": dict(checkpoint)}
+        )
+
+    def apply(
+        self,
+        changes: list[Change],
+        chunk_size: int = COMMIT_CHUNK_SIZE,
+        start: int = 0,
+        **details: Any,
+    ) -> Counter[str]:
+        """apply changes in chunks, each in its own savepoint with a
+        checkpoint recording how many changes have been applied.  Both are only
+        committed with the job's transaction, see the module docstring.
+
+        Args:
+            changes (list): every change planned for the sync
+            chunk_size (int, optional): changes per savepoint. Defaults to
+              COMMIT_CHUNK_SIZE.
+            start (int, optional): the number of changes already applied, when
+              resuming. Defaults to 0.
+            details: anything else to keep with the checkpoint, such as the
+              sync scope
+
+        Returns:
+            Counter: objects created, updated and deleted, and failures
+        """
+        chunk_size = max(1, int(chunk_size))
+        checkpoint = {
+            "applied": start,
+            "total": len(changes),
+            "state": "running",
+            **details,
+        }
+        self._save_checkpoint(checkpoint)
+        for chunk_start in range(start, len(changes), chunk_size):
+            chunk_end = chunk_start + chunk_size
+            with transaction.atomic():
+                self.apply_changes(changes[chunk_start:chunk_end])
+                checkpoint["applied"] = min(chunk_end, len(changes))
+                self._save_checkpoint(checkpoint)
+            self.job.log_info(
+                f"Applied {checkpoint['applied']} of {len(changes)} changes"
+            )
+        checkpoint["state"] = "complete"
+        self._save_checkpoint(checkpoint)
+        return self.stats
+
+    @property
+    def failed(self) -> int:
+        """the number of changes that failed"""
+        return sum(
+            count for key, count in self.stats.items() if key.endswith("_failed")
+        )
+
+    def summary(self) -> str:
+        """summarize the applied changes for the job log"""
+        return (
+            ", ".join(
+                f"{key} {self.stats[key]}"
+                for key in sorted(self.stats)
+                if self.stats[key]
+            )
+            or "no changes applied"
+        )
@@ -0,0 +1,113 @@
+"""Interval index over Solidserver subnets
+
+PrefixIntervalIndex answers which loaded subnet contains a host with a
+binary search over the subnet starts.  Subnets are CIDRs, so any two are
+either nested or disjoint, and the innermost subnet containing a host is
+the last one starting at or before it or one of that subnet's enclosing
+subnets.  Each subnet keeps the position of its closest enclosing subnet,
+and a running maximum of the subnet ends rules out hosts past every subnet
+without walking.
+"""
+import bisect
+from typing import Any, NamedTuple
+
+import netaddr  # type: ignore
+from netaddr import AddrFormatError
+
+
+class Subnet(NamedTuple):
+    """A subnet in the index, as the integer range it covers"""
+
+    first: int
+    last: int
+    prefix_length: int
+    key: Any
+
+
+class PrefixIntervalIndex:
+    """Subnets by address range, per IP version.  Subnets can be added at any
+    time, the search arrays are rebuilt on the next lookup after an add."""
+
+    def __init__(self) -> None:
+        self._subnets: dict[int, list[Subnet]] = {4: [], 6: []}
+        self._starts: dict[int, list[int]] = {}
+        self._max_ends: dict[int, list[int]] = {}
+        self._parents: dict[int, list[int]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(subnets) for subnets in self._subnets.values())
+
+    def add(self, network: str, prefix_length: int, key: Any = None) -> None:
+        """add a subnet
+
+        Args:
+            network (str): the subnet address
+            prefix_length (int): the subnet prefix length
+            key (Any, optional): returned with the subnet by find(), eg the
+              Solidserver subnet id. Defaults to None.
+        """
+        cidr = netaddr.IPNetwork(f"{network}/{prefix_length}")
+        self._subnets[cidr.version].append(
+            Subnet(cidr.first, cidr.last, prefix_length, key)
+        )
+        self._starts.pop(cidr.version, None)
+
+    def _build(self, version: int) -> None:
+        """sort the subnets of a version and link each to its closest
+        enclosing subnet"""
+        subnets = self._subnets[version]
+        # on equal starts the larger subnet comes first, so it encloses
+        subnets.sort(key=lambda each: (each.first, -each.last))
+        starts, max_ends, parents = [], [], []
+        enclosing: list[int] = []
+        running_end = -1
+        for position, subnet in enumerate(subnets):
+            while enclosing and subnets[enclosing[-1]].last < subnet.first:
+                enclosing.pop()
+            parents.append(enclosing[-1] if enclosing else -1)
+            enclosing.append(position)
+            starts.append(subnet.first)
+            running_end = max(running_end, subnet.last)
+            max_ends.append(running_end)
+        self._starts[version] = starts
+        self._max_ends[version] = max_ends
+        self._parents[version] = parents
+
+    def find(self, version: int, value: int) -> Subnet | None:
+        """the innermost subnet containing an address
+
+        Args:
+            version (int): the IP version, 4 or 6
+            value (int): the address as an integer
+
+        Returns:
+            Subnet | None: the subnet, None if no subnet contains the address
+        """
+        if version not in self._starts:
+            self._build(version)
+        position = bisect.bisect_right(self._starts[version], value) - 1
+        if position < 0 or self._max_ends[version][position] < value:
+            return None
+        subnets = self._subnets[version]
+        parents = self._parents[version]
+        while position >= 0:
+            if subnets[position].last >= value:
+                return subnets[position]
+            position = parents[position]
+        return None
+
+    def find_address(self, host: Any) -> Subnet | None:
+        """the innermost subnet containing an address given as a string
+
+        Args:
+            host (Any): the address, as a string or netaddr.IPAddress
+
+        Returns:
+            Subnet | None: the subnet, None if no subnet contains the address
+              or it is not an address
+        """
+        try:
+            address = netaddr.IPAddress(host)
+        except (AddrFormatError, TypeError, ValueError):
+            return None
+        return self.find(address.version, int(address))
@@ -0,0 +1,222 @@
+"""Job logging helpers for the SSoT plugin for EIP Solidserver
+
+Nautobot job log methods write to the database, so they should only be called
+from the thread that is running the job.  Every call writes a row, so
+per-record messages are batched or summarized by BufferedJobLogger.
+"""
+import threading
+from collections import deque
+from typing import Any
+
+from nautobot.extras.jobs import Job  # type: ignore
+
+from nautobot_plugin_ssot_eip_solidserver.constants import (
+    LOG_BATCH_SIZE,
+    LOG_SAMPLE_KEYS,
+    LOG_VERBOSITY,
+    LOG_VERBOSITY_LEVELS,
+)
+
+LOG_METHODS = (
+    "log",
+    "log_debug",
+    "log_info",
+    "log_success",
+    "log_warning",
+    "log_failure",
+)
+
+
+class ThreadSafeJobLogger:
+    """Wrap a job so that its log methods can be called from any thread.
+
+    Calls made from the thread that created the wrapper are passed straight
+    through to the job.  Calls made from other threads are queued and written
+    the next time the owning thread logs something or calls flush().  Any
+    other attribute is looked up on the wrapped job.
+    """
+
+    def __init__(self, job: Job) -> None:
+        self.job = job
+        self._owner = threading.get_ident()
+        self._pending: deque[tuple[str, tuple[Any, ...], dict[str, Any]]] = deque()
+
+    def __getattr__(self, name: str) -> Any:
+        if name in LOG_METHODS:
+
+            def _log(*args, **kwargs):
+                self._emit(name, args, kwargs)
+
+            return _log
+        return getattr(self.job, name)
+
+    def _emit(self, method: str, args: tuple[Any, ...], kwargs: dict[str, Any]):
+        """write a log entry now if we are on the owning thread, else queue it"""
+        if threading.get_ident() != self._owner:
+            self._pending.append((method, args, kwargs))
+            return
+        self._flush_pending()
+        self._write(method, args, kwargs)
+
+    def _write(self, method: str, args: tuple[Any, ...], kwargs: dict[str, Any]):
+        """write a log entry to the job, only called on the owning thread"""
+        getattr(self.job, method)(*args, **kwargs)
+
+    def flush(self) -> None:
+        """write any queued log entries, only acts on the owning thread"""
+        if threading.get_ident() != self._owner:
+            return
+        self._flush_pending()
+
+    def _flush_pending(self) -> None:
+        """write the entries queued by other threads"""
+        while self._pending:
+            method, args, kwargs = self._pending.popleft()
+            self._write(method, args, kwargs)
+
+
+def as_job_logger(job: Job | ThreadSafeJobLogger) -> ThreadSafeJobLogger:
+    """wrap a job in a ThreadSafeJobLogger unless it is already wrapped
+
+    Args:
+        job (Job | ThreadSafeJobLogger): a job or job logger
+
+    Returns:
+        ThreadSafeJobLogger: a thread safe logger for the job
+    """
+    if isinstance(job, ThreadSafeJobLogger):
+        return job
+    return ThreadSafeJobLogger(job)
+
+
+class BufferedJobLogger(ThreadSafeJobLogger):
+    """A thread safe job logger that cuts the number of job log rows written.
+
+    Debug messages are joined into one entry per batch_size messages.
+    Per-record debug messages, logged with log_record(), are dropped unless
+    the verbosity is "verbose", and all debug output is dropped when it is
+    "quiet".  Repeated per-record warnings, logged with log_grouped_warning(),
+    are counted per category and written as one summary with sample keys by
+    flush_summaries().  Queued entries are written in order, batches are
+    written before any other entry.
+    """
+
+    def __init__(
+        self,
+        job: Job,
+        verbosity: str = LOG_VERBOSITY,
+        batch_size: int = LOG_BATCH_SIZE,
+        sample_size: int = LOG_SAMPLE_KEYS,
+    ) -> None:
+        if verbosity not in LOG_VERBOSITY_LEVELS:
+            raise ValueError(f"Unknown log verbosity {verbosity}")
+        super().__init__(job)
+        self.level = LOG_VERBOSITY_LEVELS.index(verbosity)
+        self.batch_size = max(1, int(batch_size))
+        self.sample_size = sample_size
+        self._batch: list[str] = []
+        self._lock = threading.Lock()
+        # category -> [count, sample keys, first message]
+        self._groups: dict[str, list[Any]] = {}
+
+    def _emit(self, method: str, args: tuple[Any, ...], kwargs: dict[str, Any]):
+        """drop debug entries when quiet, otherwise as ThreadSafeJobLogger"""
+        if method == "log_debug" and self.level == 0:
+            return
+        super()._emit(method, args, kwargs)
+
+    def _write(self, method: str, args: tuple[Any, ...], kwargs: dict[str, Any]):
+        """add plain debug messages to the batch, write anything else after
+        the batch"""
+        if method == "log_debug" and not kwargs.get("obj") and len(args) < 2:
+            message = kwargs.get("message", args[0] if args else "")
+            self._batch.append(str(message))
+            if len(self._batch) >= self.batch_size:
+                self._flush_batch()
+            return
+        self._flush_batch()
+        super()._write(method, args, kwargs)
+
+    def _flush_batch(self) -> None:
+        """write the batched debug messages as a single entry"""
+        if self._batch:
+            message = "\n".join(self._batch)
+            self._batch = []
+            self.job.log_debug(message=message)
+
+    def flush(self) -> None:
+        """write any queued entries and the current batch, only acts on the
+        owning thread"""
+        if threading.get_ident() != self._owner:
+            return
+        self._flush_pending()
+        self._flush_batch()
+
+    @property
+    def logs_records(self) -> bool:
+        """whether log_record() keeps messages, so callers can skip building
+        them"""
+        return self.level == 2
+
+    def log_record(self, message: str) -> None:
+        """log a per-record debug message, only kept when verbose
+
+        Args:
+            message (str): the message
+        """
+        if self.level < 2:
+            return
+        self._emit("log_debug", (message,), {})
+
+    def log_grouped_warning(self, category: str, key: Any, message: str) -> None:
+        """count a per-record warning, to be summarized by flush_summaries().
+        When verbose the warning is also logged on its own.
+
+        Args:
+            category (str): what went wrong, e.g. "Skipped duplicate addresses"
+            key (Any): the record, a few keys are kept as samples
+            message (str): the full warning
+        """
+        with self._lock:
+            group = self._groups.setdefault(category, [0, [], message])
+            group[0] += 1
+            if len(group[1]) < self.sample_size:
+                group[1].append(str(key))
+        if self.level == 2:
+            self._emit("log_warning", (message,), {})
+
+    def flush_summaries(self) -> None:
+        """log one warning per category of grouped warnings, then write
+        everything still buffered"""
+        with self._lock:
+            groups = self._groups
+            self._groups = {}
+        for category, (count, samples, message) in groups.items():
+            more = ", ..." if count > len(samples) else ""
+            self._emit(
+                "log_warning",
+                (
+                    (
+                        f"{category}: {count} (e.g. {', '.join(samples)}{more}), first:"
+                        f" {message}"
+                    ),
+                ),
+                {},
+            )
+        self.flush()
+
+
+def as_buffered_logger(job: Job | ThreadSafeJobLogger) -> BufferedJobLogger:
+    """wrap a job in a BufferedJobLogger unless it is already wrapped in one
+
+    Args:
+        job (Job | ThreadSafeJobLogger): a job or job logger
+
+    Returns:
+        BufferedJobLogger: a buffered logger for the job
+    """
+    if isinstance(job, BufferedJobLogger):
+        return job
+    if isinstance(job, ThreadSafeJobLogger):
+        return BufferedJobLogger(job.job)
+    return BufferedJobLogger(job)
@@ -0,0 +1,99 @@
+"""Prometheus metrics for Solidserver API calls
+
+Metrics are labelled by Solidserver API action and http verb and are
+registered in the default prometheus_client registry, which Nautobot serves
+at /metrics.  Jobs run in Celery workers, so the worker metrics are only
+served by Nautobot when prometheus_client runs in multiprocess mode
+(PROMETHEUS_MULTIPROC_DIR).  Without prometheus_client every function here
+does nothing.
+"""
+from typing import Any
+
+try:
+    import prometheus_client  # type: ignore
+except ImportError:
+    prometheus_client = None  # pylint: disable=invalid-name
+
+LABELS = ("action", "verb")
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+if prometheus_client is not None:
+    REQUEST_SECONDS: Any = prometheus_client.Histogram(
+        "solidserver_request_seconds",
+        "Solidserver request latency, per attempt",
+        LABELS,
+        buckets=LATENCY_BUCKETS,
+    )
+    RESPONSE_BYTES: Any = prometheus_client.Histogram(
+        "solidserver_response_bytes",
+        "Size of Solidserver response bodies",
+        LABELS,
+        buckets=SIZE_BUCKETS,
+    )
+    PAGES: Any = prometheus_client.Counter(
+        "solidserver_pages", "Solidserver responses decoded", LABELS
+    )
+    ROWS: Any = prometheus_client.Counter(
+        "solidserver_rows", "Rows returned by Solidserver list actions", LABELS
+    )
+    ERRORS: Any = prometheus_client.Counter(
+        "solidserver_errors",
+        "Failed Solidserver request attempts",
+        LABELS + ("reason",),
+    )
+    RETRIES: Any = prometheus_client.Counter(
+        "solidserver_retries", "Retried Solidserver requests", LABELS
+    )
+
+
+def observe_request(action: str, verb: str, seconds: float) -> None:
+    """record the latency of one request attempt
+
+    Args:
+        action (str): the Solidserver API action
+        verb (str): the http verb
+        seconds (float): the time taken
+    """
+    if prometheus_client is not None:
+        REQUEST_SECONDS.labels(action, verb).observe(seconds)
+
+
+def observe_response(action: str, verb: str, size: int, rows: int | None) -> None:
+    """record a decoded response
+
+    Args:
+        action (str): the Solidserver API action
+        verb (str): the http verb
+        size (int): the response body size in bytes
+        rows (int | None): the rows returned, only counted for list actions
+    """
+    if prometheus_client is None:
+        return
+    RESPONSE_BYTES.labels(action, verb).observe(size)
+    PAGES.labels(action, verb).inc()
+    if rows is not None and action.endswith("_list"):
+        ROWS.labels(action, verb).inc(rows)
+
+
+def count_error(action: str, verb: str, reason: str) -> None:
+    """record a failed request attempt
+
+    Args:
+        action (str): the Solidserver API action
+        verb (str): the http verb
+        reason (str): an http status code or exception name
+    """
+    if prometheus_client is not None:
+        ERRORS.labels(action, verb, reason).inc()
+
+
+def count_retry(action: str, verb: str) -> None:
+    """record a retried request
+
+    Args:
+        action (str): the Solidserver API action
+        verb (str): the http verb
+    """
+    if prometheus_client is not None:
+        RETRIES.labels(action, verb).inc()
@@ -0,0 +1,288 @@
+"""Adaptive request limiting for the SSoT plugin for EIP Solidserver
+
+Solidserver also serves DNS and DHCP management traffic, so parallel fetches
+back off when it slows down.  The limiters keep an AIMD (additive increase,
+multiplicative decrease) limit on requests in flight and can also cap the
+request rate.  RequestRetries decides when a failed request is retried, for
+both the thread and asyncio clients.
+"""
+import asyncio
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable
+
+from nautobot_plugin_ssot_eip_solidserver.constants import (
+    LATENCY_TARGET,
+    RATE_DECREASE,
+    RETRY_STATUSES,
+)
+from nautobot_plugin_ssot_eip_solidserver.utils import metrics, ssutils
+
+
+class AimdWindow:
+    """An AIMD limit on requests in flight.
+
+    The limit starts at one and grows by 1/limit for each healthy response,
+    so about one per round of requests, up to the ceiling.  A slow or
+    overloaded response multiplies it by the decrease factor, once per round:
+    responses to requests sent before the last decrease are not counted
+    again.  Not thread safe, the limiters hold a lock around it.
+    """
+
+    def __init__(
+        self,
+        ceiling: int,
+        latency_target: float = LATENCY_TARGET,
+        decrease: float = RATE_DECREASE,
+    ) -> None:
+        self.ceiling = max(1, int(ceiling))
+        self.latency_target = latency_target
+        self.decrease = decrease
+        self.limit = 1.0
+        self.in_flight = 0
+        self.stats: Counter[str] = Counter()
+        self.peak = self.limit
+        self._last_decrease = float("-inf")
+
+    def has_capacity(self) -> bool:
+        """whether another request may be sent now"""
+        return self.in_flight < int(self.limit)
+
+    def on_response(self, started: float, latency: float, overloaded: bool) -> None:
+        """adjust the limit for a finished request
+
+        Args:
+            started (float): time.monotonic() when the request was sent
+            latency (float): seconds the request took
+            overloaded (bool): the server answered 429/5xx or did not answer
+        """
+        self.in_flight -= 1
+        self.stats["requests"] += 1
+        slow = latency > self.latency_target
+        if slow:
+            self.stats["slow"] += 1
+        if overloaded:
+            self.stats["overloaded"] += 1
+        if slow or overloaded:
+            if started >= self._last_decrease:
+                self.limit = max(1.0, self.limit * self.decrease)
+                self._last_decrease = time.monotonic()
+                self.stats["decreases"] += 1
+        else:
+            self.limit = min(float(self.ceiling), self.limit + 1 / self.limit)
+            self.peak = max(self.peak, self.limit)
+
+
+class RateSpacer:
+    """Space requests at least 1/max_rps seconds apart, no limit if max_rps is
+    falsy.  Not thread safe, the limiters hold a lock around it."""
+
+    def __init__(self, max_rps: float | None = None) -> None:
+        self.interval = 1 / max_rps if max_rps else 0.0
+        self._next = 0.0
+
+    def reserve(self) -> float:
+        """reserve the next send slot
+
+        Returns:
+            float: seconds to wait before sending
+        """
+        if not self.interval:
+            return 0.0
+        now = time.monotonic()
+        start = max(now, self._next)
+        self._next = start + self.interval
+        return start - now
+
+
+class _LimiterBase:
+    """state shared by the thread and asyncio limiters"""
+
+    def __init__(
+        self,
+        ceiling: int,
+        max_rps: float | None = None,
+        latency_target: float | None = None,
+        decrease: float | None = None,
+    ) -> None:
+        self.window = AimdWindow(
+            ceiling,
+            latency_target=latency_target or LATENCY_TARGET,
+            decrease=decrease or RATE_DECREASE,
+        )
+        self.spacer = RateSpacer(max_rps)
+        self.max_rps = max_rps
+        self.throttled_seconds = 0.0
+
+    def summary(self) -> str:
+        """summarize limiter statistics for the job log"""
+        stats = self.window.stats
+        rps = f"{self.max_rps} per second" if self.max_rps else "no rate cap"
+        return (
+            f"Solidserver request limit: {self.window.limit:.1f} now,"
+            f" {self.window.peak:.1f} peak, {self.window.ceiling} ceiling, {rps};"
+            f" {stats['requests']} requests, {stats['slow']} slow,"
+            f" {stats['overloaded']} overloaded, {stats['decreases']} decreases,"
+            f" {self.throttled_seconds:.1f}s waiting for the rate cap"
+        )
+
+
+class AdaptiveLimiter(_LimiterBase):
+    """Limit requests from threads.  Call acquire() before each request and
+    release() with its outcome afterwards."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._cond = threading.Condition()
+
+    def acquire(self) -> float:
+        """wait for a free request slot
+
+        Returns:
+            float: time.monotonic() when the request may be sent
+        """
+        with self._cond:
+            while not self.window.has_capacity():
+                self._cond.wait()
+            self.window.in_flight += 1
+            wait = self.spacer.reserve()
+            self.throttled_seconds += wait
+        if wait:
+            time.sleep(wait)
+        return time.monotonic()
+
+    def release(self, started: float, overloaded: bool = False) -> None:
+        """free a request slot and adjust the limit
+
+        Args:
+            started (float): the value returned by acquire()
+            overloaded (bool, optional): the server answered 429/5xx or did not
+              answer. Defaults to False.
+        """
+        latency = time.monotonic() - started
+        with self._cond:
+            self.window.on_response(started, latency, overloaded)
+            self._cond.notify_all()
+
+
+class AsyncAdaptiveLimiter(_LimiterBase):
+    """Limit requests from coroutines, create it inside the running event loop.
+    Await acquire() before each request and call release() afterwards."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> float:
+        """wait for a free request slot
+
+        Returns:
+            float: time.monotonic() when the request may be sent
+        """
+        async with self._cond:
+            await self._cond.wait_for(self.window.has_capacity)
+            self.window.in_flight += 1
+            wait = self.spacer.reserve()
+            self.throttled_seconds += wait
+        if wait:
+            await asyncio.sleep(wait)
+        return time.monotonic()
+
+    async def release(self, started: float, overloaded: bool = False) -> None:
+        """free a request slot and adjust the limit
+
+        Args:
+            started (float): the value returned by acquire()
+            overloaded (bool, optional): the server answered 429/5xx or did not
+              answer. Defaults to False.
+        """
+        latency = time.monotonic() - started
+        async with self._cond:
+            self.window.on_response(started, latency, overloaded)
+            self._cond.notify_all()
+
+
+class RequestRetries:
+    """Retry bookkeeping for one request.  GETs that fail with a connection
+    error, a timeout or a status in RETRY_STATUSES are retried up to retries
+    times with exponential backoff, other methods are not retried.  The
+    client sends the request, reports each attempt with failed() or
+    answered() and waits for the returned delay before sending it again.
+
+    Args:
+        api_action (str): the API action, for logging and metrics
+        http_action (str): the HTTP action
+        retries (int): retries allowed for a GET
+        backoff_factor (float): the delay before the first retry
+        job: a job logger
+        record (callable): adds keyword counts to the client retry statistics
+    """
+
+    def __init__(
+        self,
+        api_action: str,
+        http_action: str,
+        retries: int,
+        backoff_factor: float,
+        job: Any,
+        record: Callable[..., None],
+    ) -> None:
+        self.api_action = api_action
+        self.http_action = http_action
+        self.retries = retries if http_action == "get" else 0
+        self.backoff_factor = backoff_factor
+        self.job = job
+        self.record = record
+        self.attempt = 0
+        record(requests=1)
+
+    def failed(self, error: Exception) -> float | None:
+        """count an attempt that got no response
+
+        Args:
+            error (Exception): the connection error or timeout
+
+        Returns:
+            float | None: seconds to wait before retrying, None if the
+              retries are used up and the error should be raised
+        """
+        metrics.count_error(self.api_action, self.http_action, type(error).__name__)
+        if self.attempt >= self.retries:
+            if self.attempt:
+                self.record(exhausted=1)
+            return None
+        return self._retry(type(error).__name__)
+
+    def answered(self, status: int, retry_after: str | None = None) -> float | None:
+        """count an attempt that got a response
+
+        Args:
+            status (int): the HTTP status
+            retry_after (str, optional): the Retry-After header. Defaults to None.
+
+        Returns:
+            float | None: seconds to wait before retrying, None if the
+              response is final
+        """
+        if status >= 400:
+            metrics.count_error(self.api_action, self.http_action, str(status))
+        if status in RETRY_STATUSES and self.attempt < self.retries:
+            return self._retry(f"HTTP {status}", retry_after)
+        if self.attempt:
+            self.record(**{"exhausted" if status >= 400 else "recovered": 1})
+        return None
+
+    def _retry(self, reason: str, retry_after: str | None = None) -> float:
+        """log and count a retry, returning the delay before it"""
+        delay = ssutils.retry_delay(self.attempt, self.backoff_factor, retry_after)
+        self.job.log_debug(
+            f"retrying {self.api_action} after {reason}, retry {self.attempt + 1} of"
+            f" {self.retries} in {delay:.1f}s"
+        )
+        self.record(
+            retries=1, retried_requests=int(self.attempt == 0), backoff_seconds=delay
+        )
+        metrics.count_retry(self.api_action, self.http_action)
+        self.attempt += 1
+        return delay
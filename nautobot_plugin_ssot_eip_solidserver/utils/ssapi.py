@@ -1,8 +1,13 @@
 """Quick and dirty wrapper for solidserver API"""
 import base64
+import itertools
 import json
-import urllib.parse
-from typing import Any
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Iterable, Iterator
 
 import certifi
 import netaddr  # type: ignore
@@ -10,8 +15,24 @@ import requests
 from nautobot.extras.jobs import Job  # type: ignore
 from netaddr import AddrFormatError
 
-from nautobot_plugin_ssot_eip_solidserver.constants import LIMIT, SOLIDSERVER_URL
-from nautobot_plugin_ssot_eip_solidserver.utils import ssutils
+from nautobot_plugin_ssot_eip_solidserver.constants import (
+    BACKOFF_FACTOR,
+    KEYSET_COLUMNS,
+    LIMIT,
+    MAX_WORKERS,
+    MODIFIED_TIME_COLUMNS,
+    RETRIES,
+    RETRY_STATUSES,
+    SOLIDSERVER_URL,
+)
+from nautobot_plugin_ssot_eip_solidserver.utils import (
+    joblog,
+    metrics,
+    ratelimit,
+    ssutils,
+    timing,
+    vectorized,
+)
 
 
 class SolidServerBaseError(Exception):
@@ -54,25 +75,25 @@ class SolidServerAPI:
         password: str = "",
         base_url: str = SOLIDSERVER_URL,
         sslverify: bool = True,
+        timer: timing.PhaseTimer | None = None,
         **kwargs,
     ) -> None:
         """Constructor.  We'll just store some objects in a dictionary via
-        kwargs"""
+        kwargs.  Request and decode times are added to timer, if given."""
         self.__attributes: dict[Any, Any] = {}
         self.__sslverify: bool = sslverify
-        self.job = job
+        self.timer = timer or timing.PhaseTimer()
+        # worker threads may log, so route job logging through a thread safe wrapper
+        self.job = joblog.as_job_logger(job)
         if kwargs:
             self.__attributes.update(kwargs)
-        try:
-            parsed_url = urllib.parse.urlparse(base_url.removesuffix("/"))
-        except AttributeError as att_err:
-            raise AttributeError(f"{base_url} is not a valid url") from att_err
-        if not parsed_url.scheme:
-            self.base_url = "https://" + parsed_url.geturl()
-        else:
-            self.base_url = parsed_url.geturl()
+        self.base_url = ssutils.normalize_base_url(base_url)
         self.job.log_debug(f"base url is {self.base_url}")
         self.connected = False
+        self._stats_lock = threading.Lock()
+        self.bytes_received: Counter[str] = Counter()
+        self.rows_received: Counter[str] = Counter()
+        self.retry_stats: Counter[str] = Counter()
         self.session = requests.Session()
         if username:
             user64 = base64.b64encode(username.encode("ascii")) or ""
@@ -91,6 +112,47 @@ class SolidServerAPI:
             self.job.log_debug(f"session CA bundle is {self.session.verify}")
         if not self.__attributes.get("timeout"):
             self.__attributes["timeout"] = 60
+        if not self.__attributes.get("max_workers"):
+            self.__attributes["max_workers"] = MAX_WORKERS
+        if self.__attributes.get("retries") is None:
+            self.__attributes["retries"] = RETRIES
+        if self.__attributes.get("backoff_factor") is None:
+            self.__attributes["backoff_factor"] = BACKOFF_FACTOR
+        self._mount_adapter()
+        self.limiter = self._make_limiter()
+
+    def _make_limiter(self) -> ratelimit.AdaptiveLimiter:
+        """create the request limiter from the max_workers, max_rps,
+        latency_target and rate_decrease attributes"""
+        return ratelimit.AdaptiveLimiter(
+            int(self.__attributes.get("max_workers") or MAX_WORKERS),
+            max_rps=self.__attributes.get("max_rps"),
+            latency_target=self.__attributes.get("latency_target"),
+            decrease=self.__attributes.get("rate_decrease"),
+        )
+
+    def _mount_adapter(self) -> None:
+        """mount an http adapter sized from the pool_connections, pool_maxsize
+        and pool_block attributes.  pool_maxsize defaults to enough connections
+        for every worker thread.  keep_alive=False closes each connection after
+        use."""
+        pool_maxsize = self.__attributes.get("pool_maxsize") or max(
+            requests.adapters.DEFAULT_POOLSIZE,
+            int(self.__attributes.get("max_workers") or MAX_WORKERS),
+        )
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self.__attributes.get("pool_connections")
+            or requests.adapters.DEFAULT_POOLSIZE,
+            pool_maxsize=pool_maxsize,
+            pool_block=bool(self.__attributes.get("pool_block")),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if self.__attributes.get("keep_alive") is False:
+            self.session.headers["Connection"] = "close"
+        else:
+            self.session.headers.pop("Connection", None)
+        self.job.log_debug(f"http pool size is {pool_maxsize}")
 
     def close(self) -> None:
         """close requests session"""
@@ -108,6 +170,12 @@ class SolidServerAPI:
         """set arbitrary attribute"""
         for name, value in kwargs.items():
             self.__attributes[name] = value
+        pool_attrs = ("pool_connections", "pool_maxsize", "pool_block", "keep_alive")
+        if any(name in kwargs for name in pool_attrs + ("max_workers",)):
+            self._mount_adapter()
+        limiter_attrs = ("max_workers", "max_rps", "latency_target", "rate_decrease")
+        if any(name in kwargs for name in limiter_attrs):
+            self.limiter = self._make_limiter()
 
     def get_attr(self, arg: Any) -> Any | None:
         """get any one attribute, return value"""
@@ -128,28 +196,26 @@ class SolidServerAPI:
         """returns all attr names and values"""
         return self.__attributes
 
-    def generic_api_action(
+    def _send(
         self,
         api_action: str,
         http_action: str = "get",
         params: dict[str, Any] | None = None,
         data=None,
-    ) -> list[Any] | Any:
-        """Generic API action, returns json response
+    ) -> requests.Response:
+        """Send a single request to Solidserver
 
         Args:
             api_action (str): API action to perform
             http_action (str, optional): HTTP action to perform. Defaults to "get".
             params (dict, optional): Parameters to pass to API. Defaults to None.
             data (dict, optional): Data to pass to API. Defaults to None.
-            debug (bool, optional): Print debug info. Defaults to False.
 
         Raises:
             SolidServerBaseError: [description]
-            SolidServerReturnedError: [description]
 
         Returns:
-            dict: json response in dict form
+            requests.Response: the response
         """
         url = self.url(api_action)
 
@@ -207,6 +273,70 @@ class SolidServerAPI:
             )
         else:
             raise SolidServerBaseError("Not yet implemented")
+        return response
+
+    def _record_retry(self, **counts: float) -> None:
+        """add to the retry statistics"""
+        with self._stats_lock:
+            self.retry_stats.update(counts)
+
+    def _request(
+        self,
+        api_action: str,
+        http_action: str = "get",
+        params: dict[str, Any] | None = None,
+        data=None,
+    ) -> requests.Response:
+        """Send a request to Solidserver, retrying GETs that fail with a
+        connection error, a timeout or a status in RETRY_STATUSES.  Retries and
+        backoff are set by the retries and backoff_factor attributes.  Every
+        attempt waits for a slot from the adaptive limiter.
+
+        Args:
+            api_action (str): API action to perform
+            http_action (str, optional): HTTP action to perform. Defaults to "get".
+            params (dict, optional): Parameters to pass to API. Defaults to None.
+            data (dict, optional): Data to pass to API. Defaults to None.
+
+        Raises:
+            SolidServerBaseError: [description]
+            SolidServerReturnedError: [description]
+
+        Returns:
+            requests.Response: the response
+        """
+        retry = ratelimit.RequestRetries(
+            api_action,
+            http_action,
+            int(self.__attributes.get("retries") or 0),
+            float(self.__attributes.get("backoff_factor") or 0),
+            self.job,
+            self._record_retry,
+        )
+        while True:
+            overloaded = False
+            started = self.limiter.acquire()
+            try:
+                with self.timer.phase("solidserver_http"):
+                    response = self._send(api_action, http_action, params, data)
+                overloaded = response.status_code in RETRY_STATUSES
+            except (requests.ConnectionError, requests.Timeout) as req_err:
+                overloaded = True
+                delay = retry.failed(req_err)
+                if delay is None:
+                    raise
+            else:
+                delay = retry.answered(
+                    response.status_code, response.headers.get("Retry-After")
+                )
+            finally:
+                metrics.observe_request(
+                    api_action, http_action, time.monotonic() - started
+                )
+                self.limiter.release(started, overloaded)
+            if delay is None:
+                break
+            time.sleep(delay)
 
         if not response.ok:
             self.job.log_debug(f"response ok {response.ok}")
@@ -215,201 +345,609 @@ class SolidServerAPI:
             self.job.log_debug(f"response raw {response.raw}")
             self.job.log_debug(f"response url {response.url}")
             raise SolidServerReturnedError(response.text)
+        return response
+
+    def generic_api_action(
+        self,
+        api_action: str,
+        http_action: str = "get",
+        params: dict[str, Any] | None = None,
+        data=None,
+    ) -> list[Any] | Any:
+        """Generic API action, returns json response
+
+        Args:
+            api_action (str): API action to perform
+            http_action (str, optional): HTTP action to perform. Defaults to "get".
+            params (dict, optional): Parameters to pass to API. Defaults to None.
+            data (dict, optional): Data to pass to API. Defaults to None.
+
+        Raises:
+            SolidServerBaseError: [description]
+            SolidServerReturnedError: [description]
+
+        Returns:
+            dict: json response in dict form
+        """
+        response = self._request(api_action, http_action, params, data)
+        with self._stats_lock:
+            self.bytes_received[api_action] += len(response.content)
 
-        if response.status_code == 204 or response.text == " ":
+        # decode from the raw bytes, response.text would build (and guess the
+        # encoding of) a str copy of the whole body on every access
+        content = response.content
+        if response.status_code == 204 or content == b" ":
             return []
         try:
-            r_text = json.loads(response.text)
+            with self.timer.phase("json_decode"):
+                r_text = ssutils.decode_json(content)
         except json.decoder.JSONDecodeError as json_err:
             raise SolidServerBaseError(
                 f"Error decoding json {response.text}"
             ) from json_err
+        metrics.observe_response(
+            api_action,
+            http_action,
+            len(content),
+            len(r_text) if isinstance(r_text, list) else None,
+        )
         return r_text
 
+    def retry_summary(self) -> str:
+        """summarize request retry statistics for the job log"""
+        with self._stats_lock:
+            return ssutils.format_retry_stats(self.retry_stats)
+
+    def limiter_summary(self) -> str:
+        """summarize request limiter statistics for the job log"""
+        return self.limiter.summary()
+
+    def count_records(self, action: str, params: dict[str, Any] | None = None) -> int:
+        """Run the count action that matches a list action
+
+        Args:
+            action (str): a list action, eg ip_address_list
+            params (dict, optional): Parameters to pass to API, only WHERE is
+            used. Defaults to None.
+
+        Returns:
+            int: the number of records the list action will return
+        """
+        count_action, count_params = ssutils.count_request(action, params)
+        count = self.generic_api_action(count_action, "get", count_params)
+        total = ssutils.parse_count(count)
+        if total is None:
+            self.job.log_debug(f"unable to read count for {action} from {count}")
+            return 0
+        return total
+
+    def _fetch_page(
+        self, action: str, params: dict[str, Any], offset: int
+    ) -> list[Any]:
+        """fetch a single page of a list action, safe to run in a worker thread"""
+        page_params = dict(params)
+        page_params["offset"] = offset
+        page = self.generic_api_action(action, "get", page_params)
+        if isinstance(page, dict):
+            page = [page]
+        with self._stats_lock:
+            self.rows_received[action] += len(page)
+        return page
+
+    def _project(
+        self,
+        action: str,
+        params: dict[str, Any],
+        fields: Iterable[str] | None = None,
+    ) -> dict[str, Any]:
+        """Add a SELECT to list action parameters so only some columns are
+        returned
+
+        Args:
+            action (str): a list action, eg ip_address_list
+            params (dict): Parameters to pass to API
+            fields (iterable, optional): columns to return.  None uses the
+              default columns for the action, an empty iterable returns every
+              column. Defaults to None.
+
+        Returns:
+            dict: a copy of params, with SELECT set if columns are restricted
+        """
+        return ssutils.project_params(
+            action,
+            params,
+            fields,
+            projection=self.__attributes.get("projection") is not False,
+            keyset=bool(self.__attributes.get("keyset_pagination")),
+        )
+
+    def _log_transfer(self, action: str) -> None:
+        """Log the bytes and rows received for an action"""
+        with self._stats_lock:
+            received = self.bytes_received[action]
+            rows = self.rows_received[action]
+        if rows:
+            self.job.log_debug(f"{action} transferred {received} bytes for {rows} rows")
+
+    def _iter_pages(self, action: str, params: dict[str, Any]) -> Iterator[list[Any]]:
+        """Walk a list action one page at a time
+
+        Args:
+            action (str): a list action, eg ip_address_list
+            params (dict): Parameters to pass to API
+
+        Yields:
+            list: one page of records
+        """
+        if self.__attributes.get("keyset_pagination") and action in KEYSET_COLUMNS:
+            yield from self._iter_pages_keyset(action, params)
+            return
+        offset = 0
+        total = 0
+        while True:
+            page = self._fetch_page(action, params, offset)
+            total += len(page)
+            self.job.log_debug(f"got {len(page)} objects, offset is {offset}")
+            if page:
+                yield page
+            if len(page) < LIMIT:
+                break
+            offset += LIMIT
+        self.job.log_debug(f"done iterating {action}, {total} records found")
+        self._log_transfer(action)
+
+    def _iter_pages_keyset(
+        self, action: str, params: dict[str, Any]
+    ) -> Iterator[list[Any]]:
+        """Walk a list action one page at a time, ordering by id and asking for
+        records after the last one seen instead of sending a growing offset
+
+        Args:
+            action (str): a list action, eg ip_address_list
+            params (dict): Parameters to pass to API
+
+        Yields:
+            list: one page of records
+        """
+        id_field, tiebreak_field = KEYSET_COLUMNS[action]
+        base_where = params.get("WHERE")
+        page_params = dict(params)
+        page_params["ORDERBY"] = (
+            f"{id_field},{tiebreak_field}" if tiebreak_field else id_field
+        )
+        total = 0
+        while True:
+            page = self._fetch_page(action, page_params, 0)
+            total += len(page)
+            self.job.log_debug(f"got {len(page)} objects, {total} so far")
+            if page:
+                yield page
+            if len(page) < LIMIT:
+                break
+            last = page[-1]
+            seek = ssutils.generate_keyset_where_clause(
+                id_field,
+                int(last.get(id_field) or 0),
+                tiebreak_field,
+                last.get(tiebreak_field) if tiebreak_field else None,
+            )
+            page_params["WHERE"] = f"({base_where}) and {seek}" if base_where else seek
+        self.job.log_debug(f"done iterating {action}, {total} records found")
+        self._log_transfer(action)
+
+    def _iter_pages_concurrently(
+        self, action_params: dict[str, dict[str, Any]]
+    ) -> Iterator[list[Any]]:
+        """Fetch every page of one or more list actions on a thread pool
+
+        Page offsets are worked out up front from the count actions, then pages
+        for all actions are fetched in parallel, keeping at most two pages per
+        worker in memory.  Pages are yielded in the same order as a sequential
+        walk would return them (by action, then by offset).  If a count was
+        stale and the last page is full, the remaining pages are fetched
+        sequentially.
+
+        Args:
+            action_params (dict): list actions to fetch, eg ip_address_list,
+              mapped to the parameters to pass to API for that action
+
+        Yields:
+            list: one page of records
+        """
+        workers = int(self.__attributes.get("max_workers") or MAX_WORKERS)
+        actions = list(action_params)
+        offsets: dict[str, list[int]] = {}
+        for action, params in action_params.items():
+            total = self.count_records(action, params)
+            self.job.log_debug(f"Expecting {total} records from {action}")
+            offsets[action] = list(range(0, max(total, 1), LIMIT))
+        plan = iter(
+            [(action, offset) for action in actions for offset in offsets[action]]
+        )
+        self.job.log_info(
+            f"fetching {sum(len(each) for each in offsets.values())} pages of"
+            f" {', '.join(actions)} with {workers} workers"
+        )
+        in_flight: deque[tuple[str, int, Future]] = deque()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                for action, offset in itertools.islice(plan, workers * 2):
+                    in_flight.append(
+                        (
+                            action,
+                            offset,
+                            pool.submit(
+                                self._fetch_page, action, action_params[action], offset
+                            ),
+                        )
+                    )
+                while in_flight:
+                    action, offset, future = in_flight.popleft()
+                    page = future.result()
+                    self.job.flush()
+                    next_page = next(plan, None)
+                    if next_page:
+                        in_flight.append(
+                            (
+                                *next_page,
+                                pool.submit(
+                                    self._fetch_page,
+                                    next_page[0],
+                                    action_params[next_page[0]],
+                                    next_page[1],
+                                ),
+                            )
+                        )
+                    if page:
+                        yield page
+                    if offset != offsets[action][-1]:
+                        continue
+                    while len(page) >= LIMIT:
+                        offset += LIMIT
+                        self.job.log_debug(
+                            f"count was stale, fetching {action} {offset}"
+                        )
+                        page = self._fetch_page(action, action_params[action], offset)
+                        if page:
+                            yield page
+                    self.job.log_debug(f"done fetching {action}")
+                    self._log_transfer(action)
+            finally:
+                for _, _, future in in_flight:
+                    future.cancel()
+        self.job.flush()
+
+    def _iter_action_pages(
+        self,
+        actions: list[str],
+        params: dict[str, Any],
+        fields: Iterable[str] | None = None,
+        where: dict[str, str] | None = None,
+    ) -> Iterator[list[Any]]:
+        """walk one or more list actions, concurrently if configured to.  where
+        optionally maps actions to their own WHERE clause."""
+        action_params = {
+            action: self._project(action, params, fields) for action in actions
+        }
+        for action, where_clause in (where or {}).items():
+            action_params[action]["WHERE"] = where_clause
+        if self.__attributes.get("concurrent"):
+            yield from self._iter_pages_concurrently(action_params)
+            return
+        for action in actions:
+            self.job.log_info(f"starting to process {action}")
+            yield from self._iter_pages(action, action_params[action])
+
+    def _modified_since_where(
+        self, actions: list[str], since: datetime
+    ) -> dict[str, str]:
+        """WHERE clauses selecting records of each action modified since a time,
+        using the modified_columns attribute or MODIFIED_TIME_COLUMNS"""
+        return ssutils.generate_modified_since_wheres(
+            actions, since, self.__attributes.get("modified_columns")
+        )
+
+    def check_modified_columns(
+        self, actions: Iterable[str] = tuple(MODIFIED_TIME_COLUMNS)
+    ) -> list[str]:
+        """Fetch a record of each list action and check that its modification
+        time column holds a unix timestamp, before trusting incremental queries
+
+        Args:
+            actions (iterable, optional): list actions to check. Defaults to
+              every action in MODIFIED_TIME_COLUMNS.
+
+        Returns:
+            list: the problems found, empty if incremental queries can be used
+        """
+        problems = []
+        for action in actions:
+            column = ssutils.modified_time_column(
+                action, self.__attributes.get("modified_columns")
+            )
+            params = self._project(action, {"limit": 1}, [column])
+            try:
+                records = self.generic_api_action(action, "get", params)
+            except SolidServerBaseError as ss_err:
+                problems.append(f"{action} could not be read with {column}: {ss_err}")
+                continue
+            problem = ssutils.check_modified_time_column(action, column, records)
+            if problem:
+                problems.append(problem)
+        return problems
+
     def get_prefixes_by_id(
         self,
         subnet_list: list[str],
-        address_filter: str | netaddr.IPNetwork,
+        address_filter: str | netaddr.IPNetwork | None = None,
+        fields: Iterable[str] | None = None,
+        subnet6_list: list[str] | None = None,
     ) -> list[Any]:
-        """take a list of unique ids, fetch them from solidserver
+        """take lists of unique ids, fetch them from solidserver in batches
+        using "IN" where clauses against the subnet list actions
 
         Args:
-            subnet_list (list): a list of subnet IDs
-            address_filter (str, netaddr.IPNetwork): a CIDR (or string representation of a CIDR)
+            subnet_list (list): a list of IPv4 subnet IDs
+            address_filter (str, netaddr.IPNetwork, optional): a CIDR (or
+              string representation of a CIDR) the prefixes must be in.
+              Defaults to None, no filter.
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+            subnet6_list (list, optional): a list of IPv6 subnet IDs.
+              Defaults to None.
 
         Returns:
             list: a list of prefix resources
         """
-        prefixes = []
-        parent = netaddr.IPNetwork("0.0.0.0/0")
-        subnet_name = "subnet_id"
-        api_action = "ip_block_subnet_info"
-        if isinstance(address_filter, str):
+        prefixes: list[Any] = []
+        parent = None
+        if isinstance(address_filter, str) and address_filter:
             parent = netaddr.IPNetwork(address_filter)
         elif isinstance(address_filter, netaddr.IPNetwork):
             parent = address_filter
-        else:
+        elif address_filter:
             self.job.log_warning(
                 f"address filter {address_filter} is not a string or netaddr object"
             )
             return prefixes
-        if parent.version == 6:
-            subnet_name = "subnet6_id"
-            api_action = "ip6_block6_subnet6_info"
-        self.job.log_debug(f"parent is {parent} (ipv{parent.version})")
-        params: dict[str, int | str] = {"LIMIT": LIMIT}
-        for each_id in subnet_list:
-            self.job.log_debug(f"fetching Solidserver prefix id {each_id}")
-            params[subnet_name] = each_id
-            this_prefix = self.generic_api_action(
+        parents = None if parent is None else vectorized.CidrSet([parent])
+        for api_action, where_clause in ssutils.generate_prefix_id_queries(
+            subnet_list, subnet6_list, parent
+        ):
+            params = self._project(
+                api_action, {"LIMIT": LIMIT, "WHERE": where_clause}, fields
+            )
+            batch = self.generic_api_action(
                 api_action=api_action, http_action="get", params=params
             )
-            if this_prefix:
-                if ssutils.prefix_to_net(this_prefix[0]) in parent:
-                    prefixes.append(this_prefix)
+            self.job.log_debug(f"fetched {len(batch)} Solidserver prefixes by id")
+            if parents is None:
+                prefixes.extend(batch)
+                continue
+            for each_prefix, contained in zip(batch, parents.contains_prefixes(batch)):
+                if contained is None:
+                    contained = ssutils.prefix_to_net(each_prefix) in parent
+                if contained:
+                    prefixes.append(each_prefix)
         return prefixes
 
-    def get_all_addresses(self) -> list[Any]:
-        """get addresses from solidserver (by version and batched)
-        load address data into nnnrecord objects, load nnnrecord
-        objects into dictionary with unique ID as key
+    def iter_all_addresses(self, fields: Iterable[str] | None = None) -> Iterator[Any]:
+        """Stream all addresses from solidserver (by version and batched)
 
-        Returns:
-            dict: solidserver unique ID as key, nnnRecord object
-            as value
+        Args:
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Yields:
+            dict: a solidserver address record
         """
-        addrs = []
         params = {"limit": LIMIT}
-        count_action = {
-            "ip_address_list": "ip_address_count",
-            "ip6_address6_list": "ip6_address6_count",
-        }
-        for action in ["ip_address_list", "ip6_address6_list"]:
-            offset = 0
-            params["offset"] = offset
-            self.job.log_info("starting to process %s", action)
-            not_done = True
-            count = self.generic_api_action(
-                count_action.get(action, "ip_address_count"), "get", {}
-            )
-            self.job.log_debug(f"Expecting {count[0].get('total')} total addresses")
-            result: list[Any] = []
-            while not_done:
-                partial_result = self.generic_api_action(action, "get", params)
-                if len(partial_result) < LIMIT:
-                    not_done = False
-                offset += LIMIT
-                params["offset"] = offset
-                result.extend(partial_result)
+        actions = ["ip_address_list", "ip6_address6_list"]
+        if not self.__attributes.get("concurrent"):
+            for action in actions:
                 self.job.log_debug(
-                    f"got {len(partial_result)} objects, offset is {offset}"
+                    f"Expecting {self.count_records(action)} total addresses"
                 )
-                self.job.log_debug(f"result has {len(result)} objects")
-            self.job.log_debug(f"done iterating {action}, {len(result)} records found")
-            addrs.extend(result)
+        for page in self._iter_action_pages(actions, params, fields):
+            yield from page
+
+    def get_all_addresses(self, fields: Iterable[str] | None = None) -> list[Any]:
+        """get addresses from solidserver (by version and batched)
+
+        Args:
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            list: a list of all address resources
+        """
+        addrs = list(self.iter_all_addresses(fields))
         self.job.log_debug(f"total addr count for all addresses is {len(addrs)}")
         return addrs
 
-    def get_all_prefixes(self) -> list[Any]:
+    def iter_all_prefixes(self, fields: Iterable[str] | None = None) -> Iterator[Any]:
+        """Stream all IP prefixes from solidserver
+
+        Args:
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Yields:
+            dict: a solidserver prefix record
+        """
+        params = {"LIMIT": LIMIT}
+        actions = ["ip_block_subnet_list", "ip6_block6_subnet6_list"]
+        for page in self._iter_action_pages(actions, params, fields):
+            yield from page
+
+    def get_all_prefixes(self, fields: Iterable[str] | None = None) -> list[Any]:
         """Get all IP prefixes from solidserver
 
+        Args:
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
         Returns:
             list: a list of all prefix resources
         """
-        prefixes: list[Any] = []
-        params = {"LIMIT": LIMIT}
-        for action in ["ip_block_subnet_list", "ip6_block6_subnet6_list"]:
-            offset = 0
-            params["offset"] = offset
-            not_done = True
-            while not_done:
-                partial_result = self.generic_api_action(action, "get", params)
-                if len(partial_result) < LIMIT:
-                    not_done = False
-                offset = params.get("offset") or 0
-                offset += LIMIT
-                params["offset"] = offset
-                prefixes.extend(partial_result)
-                self.job.log_debug(
-                    f"got {len(partial_result)} objects, offset is {offset}"
-                )
-                self.job.log_debug(f"result has {len(prefixes)}")
-            self.job.log_debug(
-                f"done iterating {action}, {len(prefixes)} records found"
-            )
+        prefixes = list(self.iter_all_prefixes(fields))
+        self.job.log_debug(f"total count for all prefixes is {len(prefixes)}")
         return prefixes
 
-    def get_solidserver_batch(self, domain_name: str) -> list[Any]:
-        """Run a query for all addresses matching a single domain nname
+    def iter_addresses_modified_since(
+        self, since: datetime, fields: Iterable[str] | None = None
+    ) -> Iterator[Any]:
+        """Stream addresses modified since a time, for incremental syncs
 
         Args:
-            domain_name (str): a domain name
+            since (datetime): the earliest modification time to return
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Yields:
+            dict: a solidserver address record
+        """
+        actions = ["ip_address_list", "ip6_address6_list"]
+        where = self._modified_since_where(actions, since)
+        self.job.log_debug(f"WHERE clauses are {where}")
+        for page in self._iter_action_pages(actions, {"limit": LIMIT}, fields, where):
+            yield from page
+
+    def get_addresses_modified_since(
+        self, since: datetime, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """Get addresses modified since a time, for incremental syncs
+
+        Args:
+            since (datetime): the earliest modification time to return
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
 
         Returns:
-            list: a list of solidserver records
+            list: a list of address resources
         """
-        params: dict[str, str | int] = {"limit": LIMIT}
-        result: list[Any] = []
-        count_action: dict[str, tuple[str, str]] = {
-            "ip_address_list": ("ip_address_count", "name"),
-            "ip6_address6_list": ("ip6_address6_count", "ip6_name"),
-        }
+        return list(self.iter_addresses_modified_since(since, fields))
 
-        for action in ["ip_address_list", "ip6_address6_list"]:
-            offset = 0
-            params["offset"] = offset
-            params["WHERE"] = (
-                f"{count_action.get(action, ('not found', 'not found'))[1]} LIKE"
-                f" '%.{domain_name}'"
-            )
+    def iter_prefixes_modified_since(
+        self, since: datetime, fields: Iterable[str] | None = None
+    ) -> Iterator[Any]:
+        """Stream prefixes modified since a time, for incremental syncs
+
+        Args:
+            since (datetime): the earliest modification time to return
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Yields:
+            dict: a solidserver prefix record
+        """
+        actions = ["ip_block_subnet_list", "ip6_block6_subnet6_list"]
+        where = self._modified_since_where(actions, since)
+        self.job.log_debug(f"WHERE clauses are {where}")
+        for page in self._iter_action_pages(actions, {"LIMIT": LIMIT}, fields, where):
+            yield from page
+
+    def get_prefixes_modified_since(
+        self, since: datetime, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """Get prefixes modified since a time, for incremental syncs
+
+        Args:
+            since (datetime): the earliest modification time to return
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            list: a list of prefix resources
+        """
+        return list(self.iter_prefixes_modified_since(since, fields))
+
+    def iter_solidserver_batch(
+        self, domain_name: str, fields: Iterable[str] | None = None
+    ) -> Iterator[Any]:
+        """Stream all addresses matching a single domain name
+
+        Args:
+            domain_name (str): a domain name
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Yields:
+            dict: a solidserver address record
+        """
+        name_fields = {
+            "ip_address_list": "name",
+            "ip6_address6_list": "ip6_name",
+        }
+        for action, name_field in name_fields.items():
+            params: dict[str, str | int] = {"limit": LIMIT}
+            params["WHERE"] = f"{name_field} LIKE '%.{domain_name}'"
             self.job.log_info(f"starting to process {action} for {domain_name}")
             self.job.log_debug(f"WHERE clause is {params.get('WHERE')}")
-            not_done = True
-            while not_done:
-                partial_result = self.generic_api_action(action, "get", params)
-                if len(partial_result) < LIMIT:
-                    not_done = False
-                offset += LIMIT
-                params["offset"] = offset
-                result.extend(partial_result)
-                self.job.log_debug(
-                    f"got {len(partial_result)} objects, offset is {offset}"
-                )
-                self.job.log_debug(f"result has {len(result)} total objects")
-            self.job.log_debug(f"done iterating {action}, {len(result)} records found")
-        return result
+            for page in self._iter_pages(action, self._project(action, params, fields)):
+                yield from page
 
-    def get_addresses_by_name(self, domain_list: list[str]) -> list[Any]:
-        """Iterate through list of domains, running query once per list
+    def get_solidserver_batch(
+        self, domain_name: str, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """Run a query for all addresses matching a single domain nname
 
         Args:
-            domain_list (list): list of domain filters
+            domain_name (str): a domain name
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
 
         Returns:
             list: a list of solidserver records
         """
-        ss_addrs = []
+        return list(self.iter_solidserver_batch(domain_name, fields))
+
+    def iter_addresses_by_name(
+        self, domain_list: list[str], fields: Iterable[str] | None = None
+    ) -> Iterator[Any]:
+        """Stream addresses for each domain in a list, one query per domain
+
+        Args:
+            domain_list (list): list of domain filters
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Yields:
+            dict: a solidserver address record
+        """
         for each_domain in domain_list:
             each_domain = f"{each_domain}"
             self.job.log_debug(f"fetching Solidserver address batch for {each_domain}")
-            these_addrs = self.get_solidserver_batch(each_domain)
-            if these_addrs:
-                if isinstance(these_addrs, list):
-                    ss_addrs.extend(these_addrs)
-                else:
-                    ss_addrs.append(these_addrs)
-        return ss_addrs
-
-    def get_addresses_by_network(self, cidr: netaddr.IPNetwork) -> list[Any]:
-        """Run queries for each address in a CIDR
+            yield from self.iter_solidserver_batch(each_domain, fields)
+
+    def get_addresses_by_name(
+        self, domain_list: list[str], fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """Iterate through list of domains, running query once per list
 
         Args:
-            cidr (str): a cidr
+            domain_list (list): list of domain filters
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
 
         Returns:
-            list: a list of address models
+            list: a list of solidserver records
+        """
+        return list(self.iter_addresses_by_name(domain_list, fields))
+
+    def iter_addresses_by_network(
+        self, cidr: netaddr.IPNetwork, fields: Iterable[str] | None = None
+    ) -> Iterator[Any]:
+        """Stream the addresses in a CIDR
+
+        Args:
+            cidr (netaddr.IPNetwork): a cidr
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Yields:
+            dict: a solidserver address record
         """
-        ss_addrs: list[Any] = []
         query_str = ""
         self.job.log_debug("Starting get addresses by network")
         action = "unset"
@@ -422,62 +960,117 @@ class SolidServerAPI:
         params: dict[str, str | int] = {"LIMIT": LIMIT}
         self.job.log_debug(f"fetching Solidserver address for {query_str}")
         params["WHERE"] = query_str
-        addresses = self.generic_api_action(
-            api_action=action, http_action="get", params=params
-        )
-        if addresses:
-            if isinstance(addresses, list):
-                for each_addr in addresses:
-                    if each_addr.get("hostaddr") in cidr:
-                        ss_addrs.append(each_addr)
-            else:
-                if addresses.get("hostaddr") in cidr:
-                    ss_addrs.append(addresses)
-        return ss_addrs
+        cidrs = vectorized.CidrSet([cidr])
+        for page in self._iter_pages(action, self._project(action, params, fields)):
+            for each_addr, contained in zip(page, cidrs.contains_addresses(page)):
+                if contained is None:
+                    contained = each_addr.get("hostaddr") in cidr
+                if contained:
+                    yield each_addr
 
-    def get_prefixes_by_network(self, cidr: str) -> list[Any]:
-        """Test a list of prefixes from the NNN session against a CIDR to see if
-        the prefix is contained within the CIDR
+    def get_addresses_by_network(
+        self, cidr: netaddr.IPNetwork, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """Run queries for each address in a CIDR
 
         Args:
-            nnn (SolidServerAPI): Connected API session to SolidServer
-            cidr (str): A CIDR
+            cidr (str): a cidr
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
 
         Returns:
-            List: a list of prefixes that are subnets of the CIDR
+            list: a list of address models
+        """
+        return list(self.iter_addresses_by_network(cidr, fields))
+
+    def iter_prefixes_by_network(
+        self, cidr: str, fields: Iterable[str] | None = None
+    ) -> Iterator[Any]:
+        """Stream the prefixes that are subnets of a CIDR
+
+        Args:
+            cidr (str): A CIDR
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Yields:
+            dict: a solidserver prefix record
         """
-        filtered_prefixes, initial_result = [], []
+        filter_cidr = netaddr.IPNetwork(cidr)
         params: dict[str, Any] = {"LIMIT": LIMIT}
-        if netaddr.IPNetwork(cidr).version == 4:
-            query = ssutils.get_ip4_subnet_start_and_end_hexes_query(
-                netaddr.IPNetwork(cidr)
+        action = "ip_block_subnet_list"
+        if filter_cidr.version == 4:
+            params["WHERE"] = ssutils.get_ip4_subnet_start_and_end_hexes_query(
+                filter_cidr
             )
-            params["WHERE"] = query
-            initial_result = self.generic_api_action(
-                api_action="ip_block_subnet_list", params=params
-            )
-        elif netaddr.IPNetwork(cidr).version == 6:
-            query = ssutils.get_ip6_subnet_start_and_end_hexes_query(
-                netaddr.IPNetwork(cidr)
-            )
-            params["WHERE"] = query
-            initial_result = self.generic_api_action(
-                api_action="ip6_block6_subnet6_list", params=params
+        elif filter_cidr.version == 6:
+            action = "ip6_block6_subnet6_list"
+            params["WHERE"] = ssutils.get_ip6_subnet_start_and_end_hexes_query(
+                filter_cidr
             )
+        initial_count, filtered_count = 0, 0
+        cidrs = vectorized.CidrSet([filter_cidr])
+        for page in self._iter_pages(action, self._project(action, params, fields)):
+            initial_count += len(page)
+            # belt and suspenders
+            for each_prefix, contained in zip(page, cidrs.contains_prefixes(page)):
+                if contained is None:
+                    network = None
+                    try:
+                        network = ssutils.prefix_to_net(each_prefix)
+                    except (ValueError, AddrFormatError):
+                        name = each_prefix.get("subnet_name", "")
+                        if not name:
+                            name = each_prefix.get("subnet6_name", "")
+                        self.job.log_debug(
+                            f"netaddr couldn't convert {name} to a network"
+                        )
+                        continue
+                    contained = network in filter_cidr
+                if contained:
+                    filtered_count += 1
+                    yield each_prefix
+        self.job.log(f"initial result has {initial_count} prefixes")
+        self.job.log(message=f"filtered result has {filtered_count} prefixes")
+
+    def iter_prefixes_enclosing(
+        self, cidr: str | netaddr.IPNetwork, fields: Iterable[str] | None = None
+    ) -> Iterator[Any]:
+        """Stream the prefixes that contain a CIDR, the CIDR itself included
+
+        Args:
+            cidr (str, netaddr.IPNetwork): A CIDR
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Yields:
+            dict: a solidserver prefix record
+        """
         filter_cidr = netaddr.IPNetwork(cidr)
-        self.job.log(f"initial result has {len(initial_result)} prefixes")
-        # belt and suspenders
-        for each_prefix in initial_result:
-            network = None
-            try:
-                network = ssutils.prefix_to_net(each_prefix)
-            except (ValueError, AddrFormatError):
-                name = each_prefix.get("subnet_name", "")
-                if not name:
-                    name = each_prefix.get("subnet6_name", "")
-                self.job.log_debug(f"netaddr couldn't convert {name} to a network")
-                continue
-            if network in filter_cidr:
-                filtered_prefixes.append(each_prefix)
-        self.job.log(message=f"filtered result has {len(initial_result)} prefixes")
-        return filtered_prefixes
+        params: dict[str, Any] = {"LIMIT": LIMIT}
+        if filter_cidr.version == 4:
+            action = "ip_block_subnet_list"
+            params["WHERE"] = ssutils.get_ip4_enclosing_subnets_query(filter_cidr)
+        else:
+            action = "ip6_block6_subnet6_list"
+            params["WHERE"] = ssutils.get_ip6_enclosing_subnets_query(filter_cidr)
+        for page in self._iter_pages(action, self._project(action, params, fields)):
+            for each_prefix in page:
+                if ssutils.encloses(each_prefix, filter_cidr):
+                    yield each_prefix
+
+    def get_prefixes_by_network(
+        self, cidr: str, fields: Iterable[str] | None = None
+    ) -> list[Any]:
+        """Test a list of prefixes from the NNN session against a CIDR to see if
+        the prefix is contained within the CIDR
+
+        Args:
+            cidr (str): A CIDR
+            fields (iterable, optional): columns to return. Defaults to None,
+              the columns used by the adapters.
+
+        Returns:
+            List: a list of prefixes that are subnets of the CIDR
+        """
+        return list(self.iter_prefixes_by_network(cidr, fields))
@@ -6,21 +6,178 @@ Raises:
     SolidServerReturnedError: _description_
     SolidServerBaseError: _description_
 """
+import itertools
+import json
 import urllib.parse
-from typing import Any
+from datetime import datetime
+from typing import Any, Iterable, Iterator
 
 import netaddr  # type: ignore
 import validators  # type: ignore
-from diffsync import Diff, DiffSync  # , DiffElement
+from diffsync import DiffSync  # , DiffElement
 from diffsync.exceptions import ObjectNotFound
 from validators import ValidationError
 
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None  # pylint: disable=invalid-name
+
+from nautobot_plugin_ssot_eip_solidserver.constants import (
+    COUNT_ACTIONS,
+    DEFAULT_FIELDS,
+    KEYSET_COLUMNS,
+    LIMIT,
+    MAX_BACKOFF,
+    MAX_WHERE_LENGTH,
+    MODIFIED_TIME_COLUMNS,
+)
 from nautobot_plugin_ssot_eip_solidserver.diffsync.models.base import (
     SSoTIPAddress,
     SSoTIPPrefix,
 )
 
 
+def decode_json(content: bytes) -> Any:
+    """decode a json response body straight from bytes, using orjson if it
+    is installed and the standard library if not
+
+    Args:
+        content (bytes): the raw response body
+
+    Raises:
+        json.JSONDecodeError: the body is not valid json
+
+    Returns:
+        Any: the decoded json
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def normalize_base_url(base_url: str) -> str:
+    """strip any trailing slash from a url and default the scheme to https
+
+    Args:
+        base_url (str): the Solidserver url from the plugin configuration
+
+    Raises:
+        AttributeError: base_url is not a string
+
+    Returns:
+        str: the normalized url
+    """
+    try:
+        parsed_url = urllib.parse.urlparse(base_url.removesuffix("/"))
+    except AttributeError as att_err:
+        raise AttributeError(f"{base_url} is not a valid url") from att_err
+    if not parsed_url.scheme:
+        return "https://" + parsed_url.geturl()
+    return parsed_url.geturl()
+
+
+def retry_delay(
+    attempt: int,
+    backoff_factor: float,
+    retry_after: str | None = None,
+    max_delay: float = MAX_BACKOFF,
+) -> float:
+    """work out how long to wait before retrying a request
+
+    Args:
+        attempt (int): the number of retries already made
+        backoff_factor (float): the delay before the first retry
+        retry_after (str, optional): the Retry-After header from the failed
+          response, used if it asks for a longer wait. Defaults to None.
+        max_delay (float, optional): the longest delay. Defaults to MAX_BACKOFF.
+
+    Returns:
+        float: seconds to wait
+    """
+    delay = backoff_factor * (2**attempt)
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+    return min(delay, max_delay)
+
+
+def format_retry_stats(stats: dict[str, Any]) -> str:
+    """summarize request retry statistics for the job log
+
+    Args:
+        stats (dict): retry counters kept by the Solidserver client
+
+    Returns:
+        str: a one line summary
+    """
+    return (
+        f"Solidserver requests: {stats.get('requests', 0)}, retried requests:"
+        f" {stats.get('retried_requests', 0)} ({stats.get('retries', 0)} retries,"
+        f" {stats.get('backoff_seconds', 0):.1f}s backoff), recovered:"
+        f" {stats.get('recovered', 0)}, failed after retries:"
+        f" {stats.get('exhausted', 0)}"
+    )
+
+
+def format_adapter_stats(name: str, stats: dict[str, int]) -> str:
+    """summarize the load statistics of a diffsync adapter for the job log
+
+    Args:
+        name (str): the adapter name to report
+        stats (dict): load counters kept by the adapter
+
+    Returns:
+        str: a one line summary
+    """
+    message = (
+        f"{name} loaded {stats.get('ipaddress', 0)} addresses and"
+        f" {stats.get('prefix', 0)} prefixes, skipped"
+        f" {stats.get('duplicates', 0)} duplicates and"
+        f" {stats.get('invalid', 0)} invalid records"
+    )
+    if stats.get("outside_subnets"):
+        message += (
+            f", {stats['outside_subnets']} addresses were outside the loaded subnets"
+        )
+    if stats.get("bytes_fetched"):
+        message += f", fetched {stats['bytes_fetched']} bytes"
+    return message
+
+
+def batched(items: list[Any], size: int) -> Iterator[list[Any]]:
+    """yield successive slices of a list
+
+    Args:
+        items (list): the list to slice
+        size (int): the largest slice
+
+    Yields:
+        list: a slice of items
+    """
+    for start in range(0, len(items), size):
+        end = start + size
+        yield items[start:end]
+
+
+def iter_batches(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    """yield successive lists of up to size items from any iterable, without
+    reading more of it than one batch ahead
+
+    Args:
+        items (iterable): the items to batch
+        size (int): the largest batch
+
+    Yields:
+        list: a batch of items
+    """
+    iterator = iter(items)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
 def unpack_class_params(params):
     """convert class parameters into a dictionary
 
@@ -33,6 +190,62 @@ def unpack_class_params(params):
     return dict(urllib.parse.parse_qsl(params, keep_blank_values=True))
 
 
+def get_class_param(params: str, name: str) -> str | None:
+    """read one class parameter without decoding the others.  Like
+    unpack_class_params, the last value wins and names and values are
+    unquoted with unquote_plus.
+
+    Args:
+        params (str): the url encoded class parameters
+        name (str): the parameter to read, eg __eip_description
+
+    Returns:
+        str | None: the unencoded value, None if the parameter is not set
+    """
+    for pair in reversed(params.split("&")):
+        key, _, value = pair.partition("=")
+        if key == name or (
+            ("%" in key or "+" in key) and urllib.parse.unquote_plus(key) == name
+        ):
+            return urllib.parse.unquote_plus(value)
+    return None
+
+
+def is_zero_host(host: Any) -> bool:
+    """check for the all zeros address, 0.0.0.0 or ::, without parsing
+    addresses that cannot be it
+
+    Args:
+        host (Any): an address, as a string or netaddr.IPAddress
+
+    Returns:
+        bool: whether the address is all zeros
+    """
+    text = str(host)
+    if not text or text.strip("0.:"):
+        return False
+    try:
+        return int(netaddr.IPAddress(text)) == 0
+    except (ValueError, netaddr.AddrFormatError):
+        return False
+
+
+def address_status(addr_id: str, addr_type: str) -> tuple[str, str]:
+    """the status and id to give a Solidserver address.  Free addresses have
+    an id of 0 and are unassigned.
+
+    Args:
+        addr_id (str): the Solidserver address id
+        addr_type (str): the Solidserver address type
+
+    Returns:
+        tuple[str, str]: the status name and the address id to use
+    """
+    if addr_id == "0" and addr_type == "free":
+        return ("Unassigned", "unassigned")
+    return ("Active", addr_id)
+
+
 def generate_ip4_where_clause(cidr: netaddr.IPNetwork) -> str:
     """Take an IPv4 CIDR and return a where statements to find all addresses within a
     given CIDR (where >= first and <= last)
@@ -93,6 +306,304 @@ def get_ip6_subnet_start_and_end_hexes_query(cidr: netaddr.IPNetwork) -> str:
     return f"start_ip6_addr >= '{first_addr}' and end_ip6_addr <= '{last_addr}'"
 
 
+def get_ip4_enclosing_subnets_query(cidr: netaddr.IPNetwork) -> str:
+    """return a query string for the subnets that contain every address in a
+    CIDR, including a subnet equal to it
+
+    Args:
+        cidr (netaddr.IPNetwork): a CIDR
+
+    Returns:
+        str: a query string for all subnets enclosing a CIDR
+    """
+    first_addr = str(hex(cidr.first)).lstrip("0x").rjust(8, "0")
+    last_addr = str(hex(cidr.last)).lstrip("0x").rjust(8, "0")
+    return f"start_ip_addr <= '{first_addr}' and end_ip_addr >= '{last_addr}'"
+
+
+def get_ip6_enclosing_subnets_query(cidr: netaddr.IPNetwork) -> str:
+    """return a query string for the subnets that contain every address in a
+    CIDR, including a subnet equal to it
+
+    Args:
+        cidr (netaddr.IPNetwork): a CIDR
+
+    Returns:
+        str: a query string for all subnets enclosing a CIDR
+    """
+    first_addr = str(hex(cidr.first)).lstrip("0x").rjust(32, "0")
+    last_addr = str(hex(cidr.last)).lstrip("0x").rjust(32, "0")
+    return f"start_ip6_addr <= '{first_addr}' and end_ip6_addr >= '{last_addr}'"
+
+
+def encloses(prefix: dict[str, Any], cidr: netaddr.IPNetwork) -> bool:
+    """whether a solidserver prefix record contains every address in a CIDR
+
+    Args:
+        prefix (dict): a solidserver prefix record
+        cidr (netaddr.IPNetwork): a CIDR
+
+    Returns:
+        bool: False if the record can't be converted to a network
+    """
+    try:
+        network = prefix_to_net(prefix)
+    except (ValueError, TypeError, netaddr.AddrFormatError):
+        return False
+    return network is not None and cidr in network
+
+
+def generate_where_in_clauses(
+    field: str,
+    values: Iterable[Any],
+    max_length: int = MAX_WHERE_LENGTH,
+    max_values: int = LIMIT,
+) -> Iterator[str]:
+    """Split a list of values into one or more "field IN (...)" where clauses,
+    each short enough to send in a single query
+
+    Args:
+        field (str): the field to match, eg subnet_id
+        values (iterable): the values to match
+        max_length (int, optional): longest url encoded clause to generate.
+          Defaults to MAX_WHERE_LENGTH.
+        max_values (int, optional): most values in a single clause.
+          Defaults to LIMIT.
+
+    Yields:
+        str: a where clause
+    """
+    prefix = f"{field} IN ("
+    length = len(urllib.parse.quote(prefix)) + len(urllib.parse.quote(")"))
+    chunk: list[str] = []
+    chunk_length = length
+    for each_value in values:
+        value = str(each_value)
+        value_length = len(urllib.parse.quote(value + ","))
+        if chunk and (
+            chunk_length + value_length > max_length or len(chunk) >= max_values
+        ):
+            yield prefix + ",".join(chunk) + ")"
+            chunk = []
+            chunk_length = length
+        chunk.append(value)
+        chunk_length += value_length
+    if chunk:
+        yield prefix + ",".join(chunk) + ")"
+
+
+def generate_prefix_id_queries(
+    subnet_list: Iterable[Any] | None = None,
+    subnet6_list: Iterable[Any] | None = None,
+    parent: netaddr.IPNetwork | None = None,
+) -> Iterator[tuple[str, str]]:
+    """Plan the queries that fetch subnets by id, IPv4 ids from
+    ip_block_subnet_list and IPv6 ids from ip6_block6_subnet6_list.  The two
+    are separate tables, so the same id can name an IPv4 and an IPv6 subnet.
+
+    Args:
+        subnet_list (iterable, optional): IPv4 subnet ids. Defaults to None.
+        subnet6_list (iterable, optional): IPv6 subnet ids. Defaults to None.
+        parent (netaddr.IPNetwork, optional): a CIDR the subnets must be in,
+          the other address family is not queried. Defaults to None.
+
+    Yields:
+        tuple: a list action and an "IN" where clause
+    """
+    families = (
+        (4, "ip_block_subnet_list", "subnet_id", subnet_list),
+        (6, "ip6_block6_subnet6_list", "subnet6_id", subnet6_list),
+    )
+    for version, action, id_field, ids in families:
+        if parent is not None and parent.version != version:
+            continue
+        unique_ids = dict.fromkeys(str(each_id) for each_id in ids or ())
+        for where_clause in generate_where_in_clauses(id_field, unique_ids):
+            yield action, where_clause
+
+
+def generate_keyset_where_clause(
+    id_field: str,
+    last_id: int,
+    tiebreak_field: str | None = None,
+    last_tiebreak: str | None = None,
+) -> str:
+    """return a where clause that selects every record after the last one seen
+    when ordering by id_field (and tiebreak_field, if given)
+
+    Args:
+        id_field (str): the numeric id field, eg ip_id
+        last_id (int): the id of the last record seen
+        tiebreak_field (str, optional): a unique field to order records that
+          share an id. Defaults to None.
+        last_tiebreak (str, optional): the tiebreak value of the last record
+          seen. Defaults to None.
+
+    Returns:
+        str: a where clause
+    """
+    if tiebreak_field is None or last_tiebreak is None:
+        return f"{id_field} > {int(last_id)}"
+    return (
+        f"({id_field} > {int(last_id)} or ({id_field} = {int(last_id)} and"
+        f" {tiebreak_field} > '{last_tiebreak}'))"
+    )
+
+
+def generate_modified_since_where_clause(column: str, since: datetime) -> str:
+    """return a where clause that selects records modified after a time
+
+    Args:
+        column (str): the modification time column, eg ip_mod_time
+        since (datetime): the earliest modification time to return
+
+    Returns:
+        str: a where clause
+    """
+    return f"{column} >= {int(since.timestamp())}"
+
+
+def generate_modified_since_wheres(
+    actions: Iterable[str],
+    since: datetime,
+    modified_columns: dict[str, str] | None = None,
+) -> dict[str, str]:
+    """return a where clause per list action that selects records modified
+    after a time
+
+    Args:
+        actions (iterable): list actions, eg ip_address_list
+        since (datetime): the earliest modification time to return
+        modified_columns (dict, optional): modification time columns by
+          action, overriding MODIFIED_TIME_COLUMNS. Defaults to None.
+
+    Returns:
+        dict: where clauses by action
+    """
+    return {
+        action: generate_modified_since_where_clause(
+            modified_time_column(action, modified_columns), since
+        )
+        for action in actions
+    }
+
+
+def modified_time_column(
+    action: str, modified_columns: dict[str, str] | None = None
+) -> str:
+    """return the modification time column of a list action
+
+    Args:
+        action (str): a list action, eg ip_address_list
+        modified_columns (dict, optional): modification time columns by
+          action, overriding MODIFIED_TIME_COLUMNS. Defaults to None.
+
+    Returns:
+        str: the column name
+    """
+    return {**MODIFIED_TIME_COLUMNS, **(modified_columns or {})}[action]
+
+
+def check_modified_time_column(action: str, column: str, records: Any) -> str | None:
+    """check that sample records of a list action hold a unix timestamp in
+    their modification time column, which incremental queries compare against
+
+    Args:
+        action (str): a list action, eg ip_address_list
+        column (str): the modification time column, eg ip_mod_time
+        records (list or dict): records returned by the action
+
+    Returns:
+        str | None: the problem found, or None if the column holds timestamps
+        or there were no records to check
+    """
+    if isinstance(records, dict):
+        records = [records]
+    for record in records or []:
+        value = record.get(column) if isinstance(record, dict) else None
+        if value is None:
+            return f"{action} records have no {column} column"
+        if not str(value).strip().isdigit():
+            return f"{action} {column} holds {value!r}, not a unix timestamp"
+    return None
+
+
+def project_params(
+    action: str,
+    params: dict[str, Any],
+    fields: Iterable[str] | None = None,
+    projection: bool = True,
+    keyset: bool = False,
+) -> dict[str, Any]:
+    """Add a SELECT to list action parameters so only some columns are
+    returned
+
+    Args:
+        action (str): a list action, eg ip_address_list
+        params (dict): Parameters to pass to API
+        fields (iterable, optional): columns to return.  None uses the
+          default columns for the action, an empty iterable returns every
+          column. Defaults to None.
+        projection (bool, optional): whether None restricts columns to the
+          defaults. Defaults to True.
+        keyset (bool, optional): add the columns keyset pagination orders by.
+          Defaults to False.
+
+    Returns:
+        dict: a copy of params, with SELECT set if columns are restricted
+    """
+    if fields is None:
+        if not projection:
+            return dict(params)
+        fields = DEFAULT_FIELDS.get(action, ())
+    columns = list(dict.fromkeys(fields))
+    if not columns:
+        return dict(params)
+    if keyset:
+        columns.extend(
+            each
+            for each in KEYSET_COLUMNS.get(action, ())
+            if each and each not in columns
+        )
+    projected = dict(params)
+    projected["SELECT"] = ",".join(columns)
+    return projected
+
+
+def count_request(
+    action: str, params: dict[str, Any] | None = None
+) -> tuple[str, dict[str, Any]]:
+    """the count action and parameters that count the records of a list action
+
+    Args:
+        action (str): a list action, eg ip_address_list
+        params (dict, optional): the list action parameters, only WHERE is
+          used. Defaults to None.
+
+    Returns:
+        tuple: the count action and its parameters
+    """
+    count_params = {}
+    if params and params.get("WHERE"):
+        count_params["WHERE"] = params["WHERE"]
+    return COUNT_ACTIONS.get(action, "ip_address_count"), count_params
+
+
+def parse_count(count: Any) -> int | None:
+    """read the total from a count action response
+
+    Args:
+        count (Any): the decoded response
+
+    Returns:
+        int | None: the total, None if the response has no readable total
+    """
+    try:
+        return int(count[0].get("total", 0))
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
 def domain_name_prep(domain_filter: str) -> tuple[list, list]:
     """ensure correct formatting in domain name filter(s)
 
@@ -177,14 +688,10 @@ def is_addr_valid(
     """
     addr_is_valid = True
     err = " "
-    if addr.solidserver_addr_id == "0" and addr_type == "free":
-        addr.status__name = "Unassigned"
-        addr.solidserver_addr_id = "unassigned"
-    else:
-        addr.status__name = "Active"
-    if addr.host == netaddr.IPAddress("::0") or addr.host == netaddr.IPAddress(
-        "0.0.0.0"
-    ):
+    addr.status__name, addr.solidserver_addr_id = address_status(
+        addr.solidserver_addr_id, addr_type
+    )
+    if is_zero_host(addr.host):
         err = f"Skipping {addr} as it is invalid.  "
         err = err + f"addr_id {addr.solidserver_addr_id}, "
         err = err + f"host {addr.host}"
@@ -192,34 +699,29 @@ def is_addr_valid(
     return (addr_is_valid, addr)
 
 
-def filter_diff_for_status(
-    diff: Diff, source_adapter: DiffSync, target_adapter: DiffSync
-) -> DiffSync:
-    """filter diff for status changes
+def normalize_status(source_adapter: DiffSync, target_adapter: DiffSync) -> int:
+    """give source objects the status of their Nautobot counterparts, so that
+    status differences are not synced, in one walk over the source objects
 
     Args:
-        diff (dict): a diffsync diff
+        source_adapter (DiffSync): the Solidserver adapter
+        target_adapter (DiffSync): the Nautobot adapter
 
     Returns:
-        dict: a filtered diff
+        int: the number of objects whose only difference was their status
     """
+    status_only = 0
     for resource_type in ("ipaddress", "prefix"):
-        if resource_type in diff.dict().keys():
-            for key, value in diff.dict()[resource_type].items():
-                try:
-                    this_obj = source_adapter.get(obj=resource_type, identifier=key)
-                except ObjectNotFound:
-                    continue
-                if "status__name" in value["+"].keys():
-                    if len(value["+"].keys()) == 1:
-                        source_adapter.remove(this_obj)
-                    try:
-                        if "status__name" in value["-"].keys():
-                            matching_obj = target_adapter.get(
-                                obj=resource_type, identifier=key
-                            )
-                            this_obj.status__name = matching_obj.status__name
-                            source_adapter.update(this_obj)
-                    except KeyError:
-                        pass
-    return source_adapter
+        for this_obj in source_adapter.get_all(resource_type):
+            try:
+                matching_obj = target_adapter.get(
+                    obj=resource_type, identifier=this_obj.get_unique_id()
+                )
+            except ObjectNotFound:
+                continue
+            if this_obj.status__name == matching_obj.status__name:
+                continue
+            this_obj.status__name = matching_obj.status__name
+            if this_obj.get_attrs() == matching_obj.get_attrs():
+                status_only += 1
+    return status_only
@@ -0,0 +1,72 @@
+"""Phase timing for the SSoT plugin for EIP Solidserver
+
+PhaseTimer adds up wall clock time and a count per named phase, so that a slow
+sync can be broken down into Solidserver requests, json decoding, model
+building, ORM loading, diffing and applying changes.  Phases nest, e.g.
+solidserver_http is part of load_solidserver, and parallel requests overlap,
+so phase times do not add up to the job run time.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+
+class PhaseTimer:
+    """Wall clock time and a count per phase, safe to share between threads"""
+
+    def __init__(self) -> None:
+        self.seconds: Counter[str] = Counter()
+        self.counts: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, seconds: float, count: int = 1) -> None:
+        """add time spent in a phase
+
+        Args:
+            phase (str): the phase name
+            seconds (float): the time spent
+            count (int, optional): how many times the phase ran, or how many
+              records it handled. Defaults to 1.
+        """
+        with self._lock:
+            self.seconds[phase] += seconds
+            self.counts[phase] += count
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """time the body of a with block as one run of a phase
+
+        Args:
+            name (str): the phase name
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """the seconds and count of every phase, in the order they first ran
+
+        Returns:
+            dict: phase name -> {"seconds": float, "count": int}
+        """
+        with self._lock:
+            return {
+                phase: {"seconds": round(seconds, 3), "count": self.counts[phase]}
+                for phase, seconds in self.seconds.items()
+            }
+
+    def format(self) -> str:
+        """summarize the phases for the job log
+
+        Returns:
+            str: a one line summary
+        """
+        phases = ", ".join(
+            f"{phase} {values['seconds']:.2f}s ({values['count']})"
+            for phase, values in self.summary().items()
+        )
+        return f"Timings: {phases or 'nothing timed'}"
@@ -0,0 +1,478 @@
+"""Page at a time conversion and CIDR filtering of Solidserver records
+
+Solidserver returns hosts and subnet starts as fixed width hex (ip_addr,
+ip6_addr, start_ip_addr, start_ip6_addr) and IPv4 subnet sizes as address
+counts.  AddressPage and PrefixPage convert a whole page of records into
+integer arrays in one pass, and CidrSet tests those arrays for containment
+in any number of CIDRs at once, without building netaddr objects.  numpy is
+used when it is installed, otherwise a per-record loop gives the same
+results.  IPv6 values are split into two 64 bit halves so that they fit in
+numpy integer arrays, IPv4 values are the low half.
+"""
+import bisect
+from typing import Any, Iterable, Iterator
+
+import netaddr  # type: ignore
+
+from nautobot_plugin_ssot_eip_solidserver.constants import IPV4_SUBNET_SIZE_MAP
+
+try:
+    import numpy  # type: ignore
+except ImportError:
+    numpy = None  # pylint: disable=invalid-name
+
+# hex digits in ip_addr and ip6_addr
+IP4_HEX_WIDTH = 8
+IP6_HEX_WIDTH = 32
+LOW_MASK = (1 << 64) - 1
+
+
+def _decode_hex(text: Any, width: int) -> int | None:
+    """a fixed width hex value as an int, None if it is not one"""
+    if not isinstance(text, str) or len(text) != width:
+        return None
+    try:
+        return int(text, 16)
+    except ValueError:
+        return None
+
+
+def _to_int(value: Any, default: int) -> int:
+    """int(value), or default if value is not a number"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _join(high: int, low: int) -> int:
+    """a value from its 64 bit halves"""
+    return (int(high) << 64) | int(low)
+
+
+def _hex_halves(texts: list[Any], ip6: Any) -> tuple[Any, Any, Any]:
+    """decode fixed width hex values into 64 bit halves with numpy
+
+    Args:
+        texts (list): the hex values, 8 digits for IPv4 and 32 for IPv6
+        ip6 (array): whether each value is IPv6
+
+    Returns:
+        tuple: whether each value was decoded, the high and the low halves,
+          0 where a value was not decoded
+    """
+    count = len(texts)
+    widths = numpy.where(ip6, IP6_HEX_WIDTH, IP4_HEX_WIDTH).tolist()
+    decoded = numpy.fromiter(
+        (
+            isinstance(text, str) and len(text) == width
+            for text, width in zip(texts, widths)
+        ),
+        dtype=bool,
+        count=count,
+    )
+    # every value left padded to 128 bits, decoded as big endian halves
+    padded = "".join(
+        text.rjust(IP6_HEX_WIDTH, "0") if ok else "0" * IP6_HEX_WIDTH
+        for text, ok in zip(texts, decoded.tolist())
+    )
+    try:
+        halves = numpy.frombuffer(bytes.fromhex(padded), dtype=">u8")
+        halves = halves.reshape(count, 2).astype(numpy.uint64)
+    except ValueError:
+        # a value with non hex digits, decode one value at a time
+        values = [
+            _decode_hex(text, width) if ok else None
+            for text, width, ok in zip(texts, widths, decoded.tolist())
+        ]
+        decoded = numpy.array([value is not None for value in values], dtype=bool)
+        halves = numpy.array(
+            [((value or 0) >> 64, (value or 0) & LOW_MASK) for value in values],
+            dtype=numpy.uint64,
+        ).reshape(count, 2)
+    return decoded, halves[:, 0], halves[:, 1]
+
+
+def _int_array(values: list[Any], default: int) -> Any:
+    """values as an int64 array, with default for missing or bad values"""
+    try:
+        return numpy.array(
+            [default if value is None else value for value in values],
+            dtype=numpy.int64,
+        )
+    except (TypeError, ValueError, OverflowError):
+        return numpy.array(
+            [_to_int(value, default) for value in values], dtype=numpy.int64
+        )
+
+
+def _host_masks(host_bits: Any) -> tuple[Any, Any]:
+    """the high and low halves of a host mask with host_bits bits set"""
+    one = numpy.uint64(1)
+    low_bits = numpy.clip(host_bits, 0, 63).astype(numpy.uint64)
+    high_bits = numpy.clip(host_bits - 64, 0, 63).astype(numpy.uint64)
+    low = numpy.where(host_bits >= 64, numpy.uint64(LOW_MASK), (one << low_bits) - one)
+    high = numpy.where(
+        host_bits >= 128, numpy.uint64(LOW_MASK), (one << high_bits) - one
+    )
+    return high.astype(numpy.uint64), low.astype(numpy.uint64)
+
+
+def _ip4_prefix_length(size: int) -> int:
+    """the prefix length ssutils.prefix_to_net() gives an IPv4 subnet size:
+    32 less the zero bits of the size"""
+    return 32 - (size.bit_length() - bin(size).count("1"))
+
+
+def _popcount(values: Any) -> Any:
+    """the set bits of each non negative int64"""
+    if hasattr(numpy, "bitwise_count"):
+        return numpy.bitwise_count(values).astype(numpy.int64)
+    bits = values.astype(numpy.uint64)
+    bits = bits - ((bits >> numpy.uint64(1)) & numpy.uint64(0x5555555555555555))
+    bits = (bits & numpy.uint64(0x3333333333333333)) + (
+        (bits >> numpy.uint64(2)) & numpy.uint64(0x3333333333333333)
+    )
+    bits = (bits + (bits >> numpy.uint64(4))) & numpy.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((bits * numpy.uint64(0x0101010101010101)) >> numpy.uint64(56)).astype(
+        numpy.int64
+    )
+
+
+class AddressPage:
+    """A page of Solidserver address records converted to arrays.  Arrays
+    are numpy arrays when numpy is installed and lists otherwise, in record
+    order.
+
+    Args:
+        records (list): Solidserver address records, IPv4 and IPv6 may be mixed
+
+    Attributes:
+        records (list): the records
+        ip6: whether each record is IPv6, the adapter treats records with an
+          ip_id as IPv4
+        hosts_high: the upper 64 bits of each host, 0 for IPv4
+        hosts_low: the lower 64 bits of each host
+        prefix_lengths: the prefix length of each record's subnet
+        decoded: whether the host was decoded from its hex column
+        zero_hosts: whether the host is the all zeros address
+    """
+
+    def __init__(self, records: list[dict[str, Any]]) -> None:
+        self.records = records
+        self.ip6: Any = [not each.get("ip_id") for each in records]
+        if numpy is None:
+            self._convert_records()
+        else:
+            self._convert_arrays()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _convert_records(self) -> None:
+        """convert one record at a time, without numpy"""
+        hosts = [
+            _decode_hex(
+                each.get("ip6_addr" if ip6 else "ip_addr"),
+                IP6_HEX_WIDTH if ip6 else IP4_HEX_WIDTH,
+            )
+            for each, ip6 in zip(self.records, self.ip6)
+        ]
+        self.decoded: Any = [host is not None for host in hosts]
+        self.hosts_high: Any = [(host or 0) >> 64 for host in hosts]
+        self.hosts_low: Any = [(host or 0) & LOW_MASK for host in hosts]
+        self.zero_hosts: Any = [host == 0 for host in hosts]
+        self.prefix_lengths: Any = [
+            (
+                _to_int(each.get("subnet6_prefix", 128), 128)
+                if ip6
+                else IPV4_SUBNET_SIZE_MAP.get(
+                    _to_int(each.get("subnet_size", 1), 1), 32
+                )
+            )
+            for each, ip6 in zip(self.records, self.ip6)
+        ]
+
+    def _convert_arrays(self) -> None:
+        """convert the page with numpy"""
+        self.ip6 = numpy.array(self.ip6, dtype=bool)
+        texts = [
+            each.get("ip6_addr" if ip6 else "ip_addr")
+            for each, ip6 in zip(self.records, self.ip6.tolist())
+        ]
+        self.decoded, self.hosts_high, self.hosts_low = _hex_halves(texts, self.ip6)
+        self.zero_hosts = self.decoded & (self.hosts_high == 0) & (self.hosts_low == 0)
+
+        sizes = _int_array([each.get("subnet_size", 1) for each in self.records], 1)
+        keys = numpy.array(sorted(IPV4_SUBNET_SIZE_MAP), dtype=numpy.int64)
+        values = numpy.array(
+            [IPV4_SUBNET_SIZE_MAP[key] for key in keys.tolist()], dtype=numpy.int64
+        )
+        index = numpy.minimum(numpy.searchsorted(keys, sizes), len(keys) - 1)
+        ip4_lengths = numpy.where(keys[index] == sizes, values[index], 32)
+        ip6_lengths = _int_array(
+            [each.get("subnet6_prefix", 128) for each in self.records], 128
+        )
+        self.prefix_lengths = numpy.where(self.ip6, ip6_lengths, ip4_lengths)
+
+    def rows(self) -> Iterator[tuple[dict[str, Any], int, bool | None, int | None]]:
+        """the records with their prefix length, whether their host is zero
+        and the host as an integer, both None when the host could not be
+        decoded
+
+        Yields:
+            tuple: the record, the prefix length, the zero host flag and the host
+        """
+        lengths = self.prefix_lengths
+        zero_hosts = self.zero_hosts
+        decoded = self.decoded
+        high, low = self.hosts_high, self.hosts_low
+        if numpy is not None:
+            lengths = lengths.tolist()
+            zero_hosts = zero_hosts.tolist()
+            decoded = decoded.tolist()
+            high, low = high.tolist(), low.tolist()
+        for record, length, zero, ok, host_high, host_low in zip(
+            self.records, lengths, zero_hosts, decoded, high, low
+        ):
+            if ok:
+                yield record, length, zero, (host_high << 64) | host_low
+            else:
+                yield record, length, None, None
+
+
+class PrefixPage:
+    """A page of Solidserver subnet records converted to address ranges,
+    with the prefix lengths ssutils.prefix_to_net() gives them.  Arrays are
+    numpy arrays when numpy is installed and lists otherwise, in record
+    order.
+
+    Args:
+        records (list): Solidserver subnet records, IPv4 and IPv6 may be mixed
+
+    Attributes:
+        records (list): the records
+        ip6: whether each record is IPv6, records with a subnet_id are IPv4
+        first_high, first_low: the halves of the first address of each subnet
+        last_high, last_low: the halves of the last address of each subnet
+        decoded: whether the range was decoded, False for records that
+          prefix_to_net() cannot convert or that lack the hex start column
+    """
+
+    def __init__(self, records: list[dict[str, Any]]) -> None:
+        self.records = records
+        self.ip6: Any = [not each.get("subnet_id") for each in records]
+        if numpy is None:
+            self._convert_records()
+        else:
+            self._convert_arrays()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _convert_records(self) -> None:
+        """convert one record at a time, without numpy"""
+        ranges = []
+        for each, ip6 in zip(self.records, self.ip6):
+            start, length, bits = None, -1, 128 if ip6 else 32
+            if ip6 and each.get("subnet6_id"):
+                start = _decode_hex(each.get("start_ip6_addr"), IP6_HEX_WIDTH)
+                length = _to_int(each.get("subnet6_prefix", 128), -1)
+            elif not ip6:
+                start = _decode_hex(each.get("start_ip_addr"), IP4_HEX_WIDTH)
+                size = _to_int(each.get("subnet_size", 32), -1)
+                length = _ip4_prefix_length(size) if size >= 0 else -1
+            if start is None or not 0 <= length <= bits:
+                ranges.append(None)
+                continue
+            host_mask = (1 << (bits - length)) - 1
+            ranges.append((start & ~host_mask, (start & ~host_mask) | host_mask))
+        self.decoded: Any = [each is not None for each in ranges]
+        firsts = [each[0] if each else 0 for each in ranges]
+        lasts = [each[1] if each else 0 for each in ranges]
+        self.first_high: Any = [value >> 64 for value in firsts]
+        self.first_low: Any = [value & LOW_MASK for value in firsts]
+        self.last_high: Any = [value >> 64 for value in lasts]
+        self.last_low: Any = [value & LOW_MASK for value in lasts]
+
+    def _convert_arrays(self) -> None:
+        """convert the page with numpy"""
+        self.ip6 = numpy.array(self.ip6, dtype=bool)
+        texts = [
+            each.get("start_ip6_addr" if ip6 else "start_ip_addr")
+            for each, ip6 in zip(self.records, self.ip6.tolist())
+        ]
+        decoded, start_high, start_low = _hex_halves(texts, self.ip6)
+        has_id = numpy.array(
+            [bool(each.get("subnet6_id")) for each in self.records], dtype=bool
+        )
+
+        sizes = _int_array([each.get("subnet_size", 32) for each in self.records], -1)
+        positive = numpy.maximum(sizes, 1)
+        bit_lengths = numpy.frexp(positive.astype(numpy.float64))[1].astype(numpy.int64)
+        zero_bits = numpy.where(sizes > 0, bit_lengths - _popcount(positive), 0)
+        # frexp gives exact bit lengths below 2**53, larger sizes are left to
+        # prefix_to_net()
+        ip4_lengths = numpy.where((sizes >= 0) & (sizes < 2**53), 32 - zero_bits, -1)
+        ip6_lengths = _int_array(
+            [each.get("subnet6_prefix", 128) for each in self.records], -1
+        )
+        lengths = numpy.where(self.ip6, ip6_lengths, ip4_lengths)
+        bits = numpy.where(self.ip6, 128, 32)
+        self.decoded = (
+            decoded & (has_id | ~self.ip6) & (lengths >= 0) & (lengths <= bits)
+        )
+
+        mask_high, mask_low = _host_masks(numpy.where(self.decoded, bits - lengths, 0))
+        self.first_high = start_high & ~mask_high
+        self.first_low = start_low & ~mask_low
+        self.last_high = self.first_high | mask_high
+        self.last_low = self.first_low | mask_low
+
+
+def _ranks(starts_high: Any, starts_low: Any, high: Any, low: Any) -> Any:
+    """for each (high, low) value, the number of sorted starts at or below it,
+    found with one sort of the starts and values together"""
+    count = len(starts_high)
+    is_value = numpy.concatenate(
+        [numpy.zeros(count, dtype=bool), numpy.ones(len(high), dtype=bool)]
+    )
+    # sorted by high, then low, with starts before values they equal
+    order = numpy.lexsort(
+        (
+            is_value,
+            numpy.concatenate([starts_low, low]),
+            numpy.concatenate([starts_high, high]),
+        )
+    )
+    sorted_is_value = is_value[order]
+    starts_so_far = numpy.cumsum(~sorted_is_value)
+    ranks = numpy.empty(len(high), dtype=numpy.int64)
+    ranks[order[sorted_is_value] - count] = starts_so_far[sorted_is_value]
+    return ranks
+
+
+class CidrSet:
+    """CIDRs to test hosts and subnets against, any number at once.  Nested
+    CIDRs are reduced to the outermost one, so the ranges are disjoint and
+    each value has at most one candidate range, found by a sorted search.
+
+    Args:
+        cidrs (iterable): CIDRs, as strings or netaddr.IPNetwork
+    """
+
+    def __init__(self, cidrs: Iterable[Any]) -> None:
+        by_version: dict[int, list[tuple[int, int]]] = {4: [], 6: []}
+        for each in cidrs:
+            network = netaddr.IPNetwork(each)
+            by_version[network.version].append((network.first, network.last))
+        self.ranges: dict[int, list[tuple[int, int]]] = {}
+        for version, ranges in by_version.items():
+            outermost: list[tuple[int, int]] = []
+            for first, last in sorted(ranges, key=lambda each: (each[0], -each[1])):
+                if not outermost or last > outermost[-1][1]:
+                    outermost.append((first, last))
+            self.ranges[version] = outermost
+        self._starts = {
+            version: [first for first, _ in ranges]
+            for version, ranges in self.ranges.items()
+        }
+
+    def _contains_range(self, version: int, first: int, last: int) -> bool:
+        index = bisect.bisect_right(self._starts[version], first) - 1
+        return index >= 0 and last <= self.ranges[version][index][1]
+
+    def _contains_arrays(
+        self, version: int, first_high, first_low, last_high, last_low
+    ):
+        ranges = self.ranges[version]
+        if not ranges:
+            return numpy.zeros(len(first_high), dtype=bool)
+        starts = [first for first, _ in ranges]
+        ends = [last for _, last in ranges]
+        ranks = _ranks(
+            numpy.array([each >> 64 for each in starts], dtype=numpy.uint64),
+            numpy.array([each & LOW_MASK for each in starts], dtype=numpy.uint64),
+            first_high,
+            first_low,
+        )
+        index = numpy.maximum(ranks - 1, 0)
+        end_high = numpy.array([each >> 64 for each in ends], dtype=numpy.uint64)[index]
+        end_low = numpy.array([each & LOW_MASK for each in ends], dtype=numpy.uint64)[
+            index
+        ]
+        within = (last_high < end_high) | (
+            (last_high == end_high) & (last_low <= end_low)
+        )
+        return (ranks > 0) & within
+
+    def contains(self, ip6, first_high, first_low, last_high, last_low) -> list[bool]:
+        """whether each range of addresses is inside one of the CIDRs
+
+        Args:
+            ip6: whether each range is IPv6
+            first_high, first_low: the halves of the first address of each range
+            last_high, last_low: the halves of the last address of each range
+
+        Returns:
+            list: a bool for each range
+        """
+        if numpy is None:
+            return [
+                self._contains_range(
+                    6 if version6 else 4,
+                    _join(high, low),
+                    _join(end_high, end_low),
+                )
+                for version6, high, low, end_high, end_low in zip(
+                    ip6, first_high, first_low, last_high, last_low
+                )
+            ]
+        ip6 = numpy.asarray(ip6, dtype=bool)
+        result = numpy.zeros(len(ip6), dtype=bool)
+        for version, selected in ((4, ~ip6), (6, ip6)):
+            if selected.any():
+                result[selected] = self._contains_arrays(
+                    version,
+                    first_high[selected],
+                    first_low[selected],
+                    last_high[selected],
+                    last_low[selected],
+                )
+        return result.tolist()
+
+    def contains_addresses(self, records: list[dict[str, Any]]) -> list[bool | None]:
+        """whether each Solidserver address record's host is inside one of the
+        CIDRs, as `hostaddr in cidr` for any of them
+
+        Args:
+            records (list): Solidserver address records
+
+        Returns:
+            list: a bool for each record, None where the host could not be
+              decoded from its hex column and needs checking on its own
+        """
+        page = AddressPage(records)
+        contained = self.contains(
+            page.ip6, page.hosts_high, page.hosts_low, page.hosts_high, page.hosts_low
+        )
+        decoded = page.decoded if numpy is None else page.decoded.tolist()
+        return [each if ok else None for each, ok in zip(contained, decoded)]
+
+    def contains_prefixes(self, records: list[dict[str, Any]]) -> list[bool | None]:
+        """whether each Solidserver subnet record is inside one of the CIDRs,
+        as `ssutils.prefix_to_net(record) in cidr` for any of them
+
+        Args:
+            records (list): Solidserver subnet records
+
+        Returns:
+            list: a bool for each record, None where the subnet could not be
+              decoded and needs checking on its own
+        """
+        page = PrefixPage(records)
+        contained = self.contains(
+            page.ip6, page.first_high, page.first_low, page.last_high, page.last_low
+        )
+        decoded = page.decoded if numpy is None else page.decoded.tolist()
+        return [each if ok else None for each, ok in zip(contained, decoded)]
@@ -0,0 +1,24 @@
+"""Shared fixtures for the plugin tests"""
+import random
+
+import pytest
+
+from nautobot_plugin_ssot_eip_solidserver.utils import vectorized
+
+
+@pytest.fixture(params=["numpy", "python"])
+def array_backend(request, monkeypatch):
+    """run a test with numpy, if it is installed, and with the per-record
+    fallback"""
+    if request.param == "numpy":
+        if vectorized.numpy is None:
+            pytest.skip("numpy is not installed")
+    else:
+        monkeypatch.setattr(vectorized, "numpy", None)
+    return request.param
+
+
+@pytest.fixture
+def rng():
+    """a seeded random generator, so failures can be reproduced"""
+    return random.Random(20261017)
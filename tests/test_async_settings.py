@@ -0,0 +1,47 @@
+"""Apply settings changed after the first request to the async client"""
+import pytest
+
+from nautobot_plugin_ssot_eip_solidserver.utils import aiossapi
+
+from .test_prefixes_by_id import NullJob
+
+
+@pytest.fixture
+def facade():
+    """a facade that has not sent any request yet"""
+    if aiossapi.aiohttp is None:
+        pytest.skip("aiohttp is not installed")
+    conn = aiossapi.SolidServerAsyncFacade(
+        NullJob(), username="user", password="pass", max_workers=2
+    )
+    yield conn
+    conn.close()
+
+
+def session_and_limiter(conn):
+    """the session and limiter the next request would use"""
+
+    async def build():
+        return conn.api._get_session(), conn.api._get_limiter()
+
+    return conn._run(build())
+
+
+def test_set_attr_rebuilds_session_and_limiter(facade):
+    """timeout and concurrency changes replace the session and limiter"""
+    session, limiter = session_and_limiter(facade)
+    facade.set_attr(timeout=5, max_workers=7)
+    new_session, new_limiter = session_and_limiter(facade)
+    assert new_session is not session
+    assert new_session.timeout.total == 5
+    assert new_limiter is not limiter
+    assert new_limiter.window.ceiling == 7
+    facade.close()
+    assert session.closed and new_session.closed
+
+
+def test_set_attr_keeps_session_for_other_settings(facade):
+    """settings the session and limiter do not use leave them in place"""
+    session, limiter = session_and_limiter(facade)
+    facade.set_attr(projection=False)
+    assert session_and_limiter(facade) == (session, limiter)
@@ -0,0 +1,54 @@
+"""Stream pages through the blocking facade over the async client"""
+import itertools
+
+import pytest
+
+from nautobot_plugin_ssot_eip_solidserver.constants import LIMIT
+from nautobot_plugin_ssot_eip_solidserver.utils import aiossapi
+
+from .test_prefixes_by_id import NullJob
+
+PAGES = 6
+
+
+@pytest.fixture
+def facade(monkeypatch):
+    """a facade fetching ahead two pages of PAGES full IPv4 address pages"""
+    if aiossapi.aiohttp is None:
+        pytest.skip("aiohttp is not installed")
+    conn = aiossapi.SolidServerAsyncFacade(
+        NullJob(), username="user", password="pass", max_workers=2
+    )
+    conn.offsets = []
+
+    async def generic_api_action(api_action, http_action="get", params=None, data=None):
+        if api_action.endswith("_count"):
+            total = PAGES * LIMIT if api_action.startswith("ip_") else 0
+            return [{"total": str(total)}]
+        offset = int(params["offset"])
+        if api_action.startswith("ip6_") or offset >= PAGES * LIMIT:
+            return []
+        conn.offsets.append(offset)
+        return [{"ip_id": str(offset + each)} for each in range(LIMIT)]
+
+    monkeypatch.setattr(conn.api, "generic_api_action", generic_api_action)
+    yield conn
+    conn.close()
+
+
+def test_iter_yields_before_fetching_every_page(facade):
+    """the first records arrive while at most max_workers pages are fetched"""
+    records = facade.iter_all_addresses()
+    assert next(records)["ip_id"] == "0"
+    assert len(facade.offsets) <= 2
+    assert len(list(records)) == PAGES * LIMIT - 1
+    assert facade.offsets == [page * LIMIT for page in range(PAGES)]
+
+
+def test_closing_the_iterator_stops_fetching(facade):
+    """records not consumed are not fetched once the iterator is closed"""
+    records = facade.iter_all_addresses()
+    assert len(list(itertools.islice(records, 3))) == 3
+    records.close()
+    assert len(facade.offsets) < PAGES
+    assert len(facade.get_all_addresses()) == PAGES * LIMIT
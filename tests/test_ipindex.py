@@ -0,0 +1,111 @@
+"""Compare PrefixIntervalIndex lookups with a brute force search"""
+import netaddr
+import pytest
+
+from nautobot_plugin_ssot_eip_solidserver.utils import ipindex, vectorized
+
+
+def random_subnets(rng, version, count=300):
+    """subnets in a small range, so that many are nested, several share a
+    start and some are added twice"""
+    bits = 32 if version == 4 else 128
+    base = 10 << (bits - 8)
+    subnets = []
+    for _ in range(count):
+        length = rng.randrange(bits - 16, bits + 1)
+        cidr = netaddr.IPNetwork(
+            (base + rng.randrange(1 << 16), length), version=version
+        ).cidr
+        subnets.append(cidr)
+        if rng.random() < 0.2:
+            # a subnet of it sharing its start
+            subnets.append(next(cidr.subnet(min(bits, length + rng.randrange(0, 3)))))
+    return subnets
+
+
+def innermost(subnets, version, value):
+    """the longest prefix containing value, by brute force"""
+    containing = [
+        cidr
+        for cidr in subnets
+        if cidr.version == version and cidr.first <= value <= cidr.last
+    ]
+    return max(containing, key=lambda cidr: cidr.prefixlen, default=None)
+
+
+def build_index(subnets):
+    """an index of netaddr networks, keyed by position"""
+    index = ipindex.PrefixIntervalIndex()
+    for position, cidr in enumerate(subnets):
+        index.add(str(cidr.network), cidr.prefixlen, position)
+    return index
+
+
+def assert_found(subnet, expected):
+    """a find() result is the expected network"""
+    if expected is None:
+        assert subnet is None
+        return
+    assert subnet is not None
+    assert (subnet.first, subnet.last, subnet.prefix_length) == (
+        expected.first,
+        expected.last,
+        expected.prefixlen,
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_find_matches_brute_force(rng, seed):
+    """find() returns the innermost subnet for both versions"""
+    rng.seed(seed)
+    subnets = random_subnets(rng, 4) + random_subnets(rng, 6)
+    index = build_index(subnets)
+    assert len(index) == len(subnets)
+    for version, bits in ((4, 32), (6, 128)):
+        base = 10 << (bits - 8)
+        values = [base + rng.randrange(-16, (1 << 16) + 16) for _ in range(500)]
+        values += [cidr.first for cidr in subnets if cidr.version == version]
+        values += [cidr.last + 1 for cidr in subnets if cidr.version == version]
+        for value in values:
+            assert_found(index.find(version, value), innermost(subnets, version, value))
+
+
+def test_find_equal_starts_and_adds_after_lookup():
+    """subnets sharing a start resolve to the innermost, and subnets added
+    after a lookup are found"""
+    index = ipindex.PrefixIntervalIndex()
+    index.add("10.0.0.0", 16, "outer")
+    index.add("10.0.0.0", 24, "inner")
+    index.add("10.0.0.0", 8, "outermost")
+    assert index.find_address("10.0.0.5").key == "inner"
+    assert index.find_address("10.0.1.5").key == "outer"
+    assert index.find_address("10.1.0.0").key == "outermost"
+    assert index.find_address("11.0.0.0") is None
+    index.add("10.0.0.0", 28, "innermost")
+    assert index.find_address("10.0.0.5").key == "innermost"
+    assert index.find_address("10.0.0.16").key == "inner"
+    # versions are kept apart
+    assert index.find(6, int(netaddr.IPAddress("10.0.0.5"))) is None
+    assert index.find_address("not an address") is None
+
+
+def test_find_page_hosts(array_backend, rng):
+    """hosts decoded by AddressPage find the same subnets as hostaddr"""
+    subnets = random_subnets(rng, 4) + random_subnets(rng, 6)
+    index = build_index(subnets)
+    records = []
+    for _ in range(500):
+        version = rng.choice((4, 6))
+        bits = 32 if version == 4 else 128
+        host = (10 << (bits - 8)) + rng.randrange(1 << 16)
+        records.append(
+            {"ip_id": "1", "ip_addr": f"{host:08x}"}
+            if version == 4
+            else {"ip6_id": "1", "ip6_addr": f"{host:032x}"}
+        )
+        records[-1]["hostaddr"] = str(netaddr.IPAddress(host, version))
+    for record, _, _, host in vectorized.AddressPage(records).rows():
+        version = 4 if record.get("ip_id") else 6
+        found = index.find(version, host)
+        assert found == index.find_address(record["hostaddr"])
+        assert_found(found, innermost(subnets, version, host))
@@ -0,0 +1,167 @@
+"""Fetch the parent subnets of name filtered addresses by id"""
+import re
+
+import pytest
+
+from nautobot_plugin_ssot_eip_solidserver.diffsync.adapters.solidserver import (
+    SolidserverAdapter,
+)
+from nautobot_plugin_ssot_eip_solidserver.utils import aiossapi, ssapi
+
+ADDRESSES = {
+    "ip_address_list": [
+        {
+            "ip_id": "11",
+            "hostaddr": "10.1.2.3",
+            "ip_addr": "0a010203",
+            "name": "a.example.com",
+            "type": "ip",
+            "subnet_id": "7",
+            "subnet_size": "256",
+            "ip_class_parameters": "",
+        },
+    ],
+    "ip6_address6_list": [
+        {
+            "ip6_id": "11",
+            "hostaddr": "2001:db8::5",
+            "ip6_addr": "20010db8000000000000000000000005",
+            "ip6_name": "b.example.com",
+            "type": "ip6",
+            "subnet6_id": "7",
+            "subnet6_prefix": "64",
+            "ip6_class_parameters": "",
+        },
+    ],
+}
+# the IPv4 and IPv6 subnet tables both have an id 7
+SUBNETS = {
+    "ip_block_subnet_list": {
+        "7": {
+            "subnet_id": "7",
+            "subnet_name": "v4 seven",
+            "start_hostaddr": "10.1.2.0",
+            "start_ip_addr": "0a010200",
+            "end_ip_addr": "0a0102ff",
+            "subnet_size": "256",
+            "is_terminal": "1",
+            "ip_class_parameters": "",
+        },
+        "8": {
+            "subnet_id": "8",
+            "subnet_name": "v4 eight",
+            "start_hostaddr": "192.168.0.0",
+            "start_ip_addr": "c0a80000",
+            "end_ip_addr": "c0a800ff",
+            "subnet_size": "256",
+            "is_terminal": "1",
+            "ip_class_parameters": "",
+        },
+    },
+    "ip6_block6_subnet6_list": {
+        "7": {
+            "subnet6_id": "7",
+            "subnet6_name": "v6 seven",
+            "start_hostaddr": "2001:db8::",
+            "start_ip6_addr": "20010db8000000000000000000000000",
+            "end_ip6_addr": "20010db80000000000000000ffffffff",
+            "subnet6_prefix": "64",
+            "is_terminal": "1",
+            "ip6_class_parameters": "",
+        },
+    },
+}
+IN_WHERE = re.compile(r"^\w+ IN \(([^)]*)\)$")
+
+
+class NullJob:
+    """Stands in for a Nautobot job, discarding log messages"""
+
+    def __getattr__(self, name):
+        if name.startswith("log"):
+            return lambda *args, **kwargs: None
+        raise AttributeError(name)
+
+
+class FakeSolidserver:
+    """Answers list actions from ADDRESSES and SUBNETS, recording each one"""
+
+    def __init__(self):
+        self.actions = []
+
+    def answer(self, api_action, params):
+        """the records a GET of a list or count action returns"""
+        self.actions.append(api_action)
+        params = params or {}
+        if api_action.endswith("_count"):
+            return [{"total": "1"}]
+        if int(params.get("offset", 0)):
+            return []
+        if api_action in ADDRESSES:
+            return ADDRESSES[api_action]
+        ids = IN_WHERE.match(params["WHERE"]).group(1).split(",")
+        table = SUBNETS[api_action]
+        return [table[each_id] for each_id in ids if each_id in table]
+
+
+@pytest.fixture(params=["sync", "async"])
+def client(request, monkeypatch):
+    """a blocking or async client answered by a FakeSolidserver"""
+    fake = FakeSolidserver()
+    kwargs = {"username": "user", "password": "pass", "base_url": "solidserver"}
+    if request.param == "sync":
+        conn = ssapi.SolidServerAPI(NullJob(), **kwargs)
+
+        def generic_api_action(api_action, http_action="get", params=None, data=None):
+            return fake.answer(api_action, params)
+
+        monkeypatch.setattr(conn, "generic_api_action", generic_api_action)
+    else:
+        if aiossapi.aiohttp is None:
+            pytest.skip("aiohttp is not installed")
+        conn = aiossapi.SolidServerAsyncFacade(NullJob(), **kwargs)
+
+        async def async_api_action(
+            api_action, http_action="get", params=None, data=None
+        ):
+            return fake.answer(api_action, params)
+
+        monkeypatch.setattr(conn.api, "generic_api_action", async_api_action)
+    conn.fake = fake
+    yield conn
+    conn.close()
+
+
+def names(prefixes):
+    """the subnet names of prefix records"""
+    return sorted(each.get("subnet_name") or each["subnet6_name"] for each in prefixes)
+
+
+def test_ids_of_both_families(client):
+    """IPv4 and IPv6 ids are looked up in their own list actions"""
+    prefixes = client.get_prefixes_by_id(["7"], None, subnet6_list=["7"])
+    assert names(prefixes) == ["v4 seven", "v6 seven"]
+    assert sorted(client.fake.actions) == [
+        "ip6_block6_subnet6_list",
+        "ip_block_subnet_list",
+    ]
+
+
+def test_address_filter_limits_family_and_network(client):
+    """a CIDR filter skips the other family and subnets outside it"""
+    prefixes = client.get_prefixes_by_id(["7", "8"], "10.0.0.0/8", None, ["7"])
+    assert names(prefixes) == ["v4 seven"]
+    assert client.fake.actions == ["ip_block_subnet_list"]
+
+
+def test_name_filter_loads_parent_subnets(client):
+    """a name filtered load fetches the parent subnets of its addresses"""
+    adapter = SolidserverAdapter(job=NullJob(), conn=client, sync=None)
+    adapter.load(domain_filter=["example.com"])
+    assert sorted(
+        (str(each.network), each.prefix_length) for each in adapter.get_all("prefix")
+    ) == [("10.1.2.0", 24), ("2001:db8::", 64)]
+    assert sorted(each.host for each in adapter.get_all("ipaddress")) == [
+        "10.1.2.3",
+        "2001:db8::5",
+    ]
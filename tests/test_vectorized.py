@@ -0,0 +1,190 @@
+"""Compare vectorized page conversion with the per-record netaddr logic"""
+import netaddr
+import pytest
+
+from nautobot_plugin_ssot_eip_solidserver.constants import IPV4_SUBNET_SIZE_MAP
+from nautobot_plugin_ssot_eip_solidserver.utils import ssutils, vectorized
+
+IP4_SIZES = sorted(IPV4_SUBNET_SIZE_MAP)
+
+
+def random_host(rng, version):
+    """a host, often 0, the last address or in a small range"""
+    bits = 32 if version == 4 else 128
+    choice = rng.random()
+    if choice < 0.05:
+        return 0
+    if choice < 0.1:
+        return (1 << bits) - 1
+    if choice < 0.4:
+        return (10 << (bits - 8)) + rng.randrange(4096)
+    return rng.getrandbits(bits)
+
+
+def address_record(rng, version, host):
+    """a Solidserver address record for a host"""
+    if version == 4:
+        record = {
+            "ip_id": str(rng.randrange(1, 10**6)),
+            "ip_addr": f"{host:08x}",
+            "hostaddr": str(netaddr.IPAddress(host, 4)),
+            "subnet_size": str(rng.choice(IP4_SIZES + [3, 0])),
+        }
+    else:
+        record = {
+            "ip6_id": str(rng.randrange(1, 10**6)),
+            "ip6_addr": f"{host:032x}",
+            "hostaddr": str(netaddr.IPAddress(host, 6)),
+            "subnet6_prefix": str(rng.randrange(0, 129)),
+        }
+    return record
+
+
+def broken_address_record(rng):
+    """an address record whose hex host can't be decoded"""
+    record = address_record(rng, rng.choice((4, 6)), 1)
+    column = "ip_addr" if "ip_id" in record else "ip6_addr"
+    record[column] = rng.choice(["", "xyz", "0a00", None, "g" * len(record[column])])
+    return record
+
+
+def random_address_records(rng, count=400):
+    """address records, IPv4 and IPv6 mixed with a few broken ones"""
+    records = []
+    for _ in range(count):
+        if rng.random() < 0.05:
+            records.append(broken_address_record(rng))
+            continue
+        version = rng.choice((4, 6))
+        records.append(address_record(rng, version, random_host(rng, version)))
+    return records
+
+
+def subnet_record(rng, version, start, length):
+    """a Solidserver subnet record starting at start, which need not be the
+    network address"""
+    if version == 4:
+        size = 1 << (32 - length)
+        if rng.random() < 0.1:
+            # sizes that are not powers of two still give a prefix length
+            size += rng.randrange(1, size + 1)
+        return {
+            "subnet_id": str(rng.randrange(1, 10**6)),
+            "start_ip_addr": f"{start:08x}",
+            "start_hostaddr": str(netaddr.IPAddress(start, 4)),
+            "subnet_size": str(size),
+        }
+    return {
+        "subnet6_id": str(rng.randrange(1, 10**6)),
+        "start_ip6_addr": f"{start:032x}",
+        "start_hostaddr": str(netaddr.IPAddress(start, 6)),
+        "subnet6_prefix": str(length),
+    }
+
+
+def random_subnet_records(rng, count=400):
+    """subnet records, IPv4 and IPv6 mixed, mostly aligned to their prefix
+    length, with a few that can't be decoded"""
+    records = []
+    for _ in range(count):
+        version = rng.choice((4, 6))
+        bits = 32 if version == 4 else 128
+        length = rng.randrange(0, bits + 1)
+        start = random_host(rng, version)
+        if rng.random() < 0.8:
+            start &= ~((1 << (bits - length)) - 1)
+        record = subnet_record(rng, version, start, length)
+        if rng.random() < 0.03:
+            column = "start_ip_addr" if version == 4 else "start_ip6_addr"
+            record[column] = "zz"
+            record["start_hostaddr"] = "not an address"
+        records.append(record)
+    return records
+
+
+def random_cidrs(rng, count=6):
+    """CIDRs of both versions around 10/8, some nested in each other"""
+    cidrs = []
+    for _ in range(count):
+        version = rng.choice((4, 6))
+        bits = 32 if version == 4 else 128
+        cidr = netaddr.IPNetwork(
+            (random_host(rng, version), rng.randrange(4, bits + 1)), version=version
+        ).cidr
+        cidrs.append(cidr)
+        if rng.random() < 0.5 and cidr.prefixlen < bits:
+            cidrs.append(next(cidr.subnet(cidr.prefixlen + rng.randrange(1, 3))))
+    return cidrs
+
+
+def expected_network(record):
+    """ssutils.prefix_to_net() for a record, None if it raises"""
+    try:
+        return ssutils.prefix_to_net(record)
+    except (ValueError, TypeError, netaddr.AddrFormatError):
+        return None
+
+
+def test_address_page_rows(array_backend, rng):
+    """rows() matches decoding each record with netaddr"""
+    records = random_address_records(rng)
+    rows = list(vectorized.AddressPage(records).rows())
+    assert [row[0] for row in rows] == records
+    for record, prefix_length, zero_host, host in rows:
+        if "ip_id" in record:
+            column, width = "ip_addr", 8
+            expected_length = IPV4_SUBNET_SIZE_MAP.get(int(record["subnet_size"]), 32)
+        else:
+            column, width = "ip6_addr", 32
+            expected_length = int(record["subnet6_prefix"])
+        assert prefix_length == expected_length
+        text = record[column]
+        if not isinstance(text, str) or len(text) != width or text.startswith("g"):
+            assert host is None and zero_host is None
+            continue
+        expected = int(netaddr.IPAddress(record["hostaddr"]))
+        assert host == expected
+        assert zero_host == (expected == 0)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_cidr_set_contains_addresses(array_backend, rng, seed):
+    """contains_addresses() matches `hostaddr in cidr` for any CIDR"""
+    rng.seed(seed)
+    cidrs = random_cidrs(rng)
+    records = random_address_records(rng)
+    contained = vectorized.CidrSet(cidrs).contains_addresses(records)
+    decoded = vectorized.AddressPage(records).rows()
+    for record, inside, (_, _, _, host) in zip(records, contained, decoded):
+        if host is None:
+            assert inside is None
+            continue
+        assert inside == any(record["hostaddr"] in cidr for cidr in cidrs)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_cidr_set_contains_prefixes(array_backend, rng, seed):
+    """contains_prefixes() matches `prefix_to_net(record) in cidr` for any CIDR"""
+    rng.seed(seed)
+    cidrs = random_cidrs(rng)
+    records = random_subnet_records(rng)
+    contained = vectorized.CidrSet(cidrs).contains_prefixes(records)
+    for record, inside in zip(records, contained):
+        network = expected_network(record)
+        if network is None:
+            assert inside is None
+            continue
+        assert inside == any(network in cidr for cidr in cidrs)
+
+
+def test_cidr_set_nested_and_empty(array_backend):
+    """nested CIDRs reduce to the outermost, a version without CIDRs
+    contains nothing"""
+    cidrs = vectorized.CidrSet(["10.0.0.0/8", "10.1.0.0/16", "10.1.2.0/24"])
+    assert cidrs.ranges[4] == [(167772160, 184549375)]
+    records = [
+        {"ip_id": "1", "ip_addr": "0a010203", "hostaddr": "10.1.2.3"},
+        {"ip_id": "2", "ip_addr": "0b000000", "hostaddr": "11.0.0.0"},
+        {"ip6_id": "3", "ip6_addr": "0" * 31 + "1", "hostaddr": "::1"},
+    ]
+    assert cidrs.contains_addresses(records) == [True, False, False]